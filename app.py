@@ -15,13 +15,13 @@ from PySide6.QtWidgets import (
 from PySide6.QtCore import Qt
 from core.tree_loader import load_virtual_tree_from_db
 
-from openai import OpenAI
 from core.backend.centralLogic.pipline import run_pipeline
 from core.backend.setting.qdrantCollectionSet import create_qdrant_collection
 from core.backend.setting.mysqlSet import get_connection, clear_all_data, create_tables
 from core.backend.clustering.runClustering import run_workflow
 from core.backend.clustering.inputMysql import category
-from core.config import SOLAR_API_KEY, MYSQL_DB, MYSQL_HOST, MYSQL_PASSWORD, MYSQL_USER
+from core.backend.common.upstageClient import get_upstage_client
+from core.config import MYSQL_DB, MYSQL_HOST, MYSQL_PASSWORD, MYSQL_USER
 
 
 
@@ -195,7 +195,7 @@ class MainWindow(QMainWindow):
             
             create_tables()
             create_qdrant_collection()
-            run_pipeline(unique_files)
+            run_pipeline(unique_files, abs_path)
             run_workflow()
             category()
             self.refresh_ui_from_db()
@@ -320,19 +320,11 @@ class MainWindow(QMainWindow):
             # -------------------------------------------------------
             # (A) Solar (Upstage) API로 텍스트 -> 벡터 변환
             # -------------------------------------------------------
-            client = OpenAI(
-                api_key=SOLAR_API_KEY,
-                base_url="https://api.upstage.ai/v1"
-            )
+            # 공용 클라이언트 (검색마다 새로 만들지 않고 연결을 재사용)
+            client = get_upstage_client()
             
-            # Solar 임베딩 모델 호출
-            response = client.embeddings.create(
-                input=query_text,
-                model="embedding-query" 
-            )
-            
-            # 결과 벡터 추출 (이게 핵심 데이터!)
-            query_vector = response.data[0].embedding
+            # Solar 임베딩 모델 호출 및 결과 벡터 추출 (이게 핵심 데이터!)
+            query_vector = client.embed([query_text], "embedding-query", timeout=30)[0]
             
             # -------------------------------------------------------
             # (B) 결과 확인 (Qdrant 팀원에게 넘겨줄 데이터)
@@ -0,0 +1,232 @@
+"""
+코드 파일 수집 필터 (저장소 인식).
+
+코드 전처리(codetype1) 대상 파일 중 요약/임베딩할 가치가 없는 파일을 미리 걸러냅니다.
+- 저장소 루트(.git)를 찾아 루트부터 파일 위치까지의 .gitignore 규칙을 적용
+- node_modules, dist, 가상환경 등 외부 의존성/빌드 산출물 디렉토리
+- protobuf stub, *.min.js 등 생성 파일 (파일명 패턴 + 상단 주석의 "Code generated ... DO NOT EDIT" / "@generated" / "<auto-generated>" 표시)
+- 줄 길이로 판단한 minified 파일
+
+체크아웃이 여러 개라 내용이 같은 파일은 파이프라인의 파일 해시 중복 제거(dedup.py)에서 한 번만 처리됩니다.
+"""
+
+import fnmatch
+import os
+import re
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+# 외부 의존성/빌드 산출물/도구 캐시 디렉토리 (저장소 루트 또는 스캔 폴더 아래 경로 중 하나라도 일치하면 제외)
+VENDORED_DIR_NAMES = {
+    "node_modules", "bower_components", "jspm_packages", "vendor", "third_party", "thirdparty",
+    "dist", "build", "target", "coverage", ".next", ".nuxt",
+    "venv", ".venv", "site-packages", "__pycache__", ".tox", ".nox",
+    ".mypy_cache", ".pytest_cache", ".gradle", ".idea", ".vscode", ".git",
+}
+
+# 생성 파일 이름 패턴
+GENERATED_FILE_PATTERNS = (
+    "*_pb2.py", "*_pb2_grpc.py", "*.pb.go", "*.pb.cc", "*.pb.h", "*_grpc.pb.go",
+    "*.min.js", "*.bundle.js", "*.chunk.js", "*.generated.*", "*.g.dart", "*.designer.cs",
+)
+
+# 파일 상단 주석 줄에 이 표시가 있으면 생성 파일로 간주 (본문/문자열 속 "auto-generated" 같은 단어는 제외)
+GENERATED_MARKER_PATTERN = re.compile(
+    r"^\s*(?:#+|//+|/\*+|\*|--|;+|<!--)\s*"
+    r"(?:.*?@generated\b|<auto-generated\b|(?:Code )?[Gg]enerated\b.*\bDO NOT EDIT\b)",
+    re.MULTILINE,
+)
+GENERATED_MARKER_SCAN_LINES = 10
+
+# minified 판단 기준 (파일 앞부분 MINIFIED_SCAN_BYTES만 검사)
+MINIFIED_SCAN_BYTES = 64 * 1024
+MINIFIED_MAX_LINE_LENGTH = 1000      # 이보다 긴 줄이 있으면 minified
+MINIFIED_AVG_LINE_LENGTH = 300       # 평균 줄 길이가 이보다 길면 minified
+
+
+# -----------------------------
+# 1. .gitignore 규칙
+# -----------------------------
+
+def _translate_gitignore_pattern(pattern: str) -> str:
+    """gitignore 글롭(**, *, ?, [...])을 정규식으로 변환합니다."""
+    regex = ""
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            regex += "(?:.*/)?"
+            i += 3
+        elif pattern.startswith("/**", i) and i + 3 == len(pattern):
+            regex += "/.*"
+            i += 3
+        elif pattern.startswith("**", i):
+            regex += ".*"
+            i += 2
+        else:
+            char = pattern[i]
+            if char == "*":
+                regex += "[^/]*"
+            elif char == "?":
+                regex += "[^/]"
+            elif char == "[":
+                end = pattern.find("]", i + 1)
+                if end == -1:
+                    regex += re.escape(char)
+                else:
+                    regex += "[" + pattern[i + 1:end].replace("\\", "\\\\") + "]"
+                    i = end
+            else:
+                regex += re.escape(char)
+            i += 1
+    return regex
+
+
+class GitignoreRule:
+    def __init__(self, base_dir: str, line: str):
+        self.base_dir = base_dir
+        self.negated = line.startswith("!")
+        if self.negated:
+            line = line[1:]
+        self.dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        # 중간/앞에 "/"가 있으면 .gitignore 위치 기준, 없으면 모든 깊이의 이름과 일치
+        anchored = "/" in line
+        line = line.lstrip("/")
+        prefix = "" if anchored else "(?:.*/)?"
+        self.regex = re.compile(prefix + _translate_gitignore_pattern(line) + "$")
+
+    def matches(self, path: str, is_dir: bool) -> bool:
+        """path는 base_dir 기준 상대 경로 ('/' 구분)"""
+        if self.dir_only and not is_dir:
+            return False
+        return bool(self.regex.match(path))
+
+
+@lru_cache(maxsize=None)
+def load_gitignore_rules(directory: str) -> Tuple[GitignoreRule, ...]:
+    gitignore_path = os.path.join(directory, ".gitignore")
+    if not os.path.isfile(gitignore_path):
+        return ()
+    rules = []
+    with open(gitignore_path, encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            line = line.rstrip("\n").rstrip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("\\"):
+                line = line[1:]
+            rules.append(GitignoreRule(directory, line))
+    return tuple(rules)
+
+
+@lru_cache(maxsize=None)
+def find_repo_root(directory: str) -> Optional[str]:
+    """directory부터 상위로 올라가며 .git이 있는 저장소 루트를 찾습니다."""
+    parent = os.path.dirname(directory)
+    if os.path.exists(os.path.join(directory, ".git")):
+        return directory
+    if parent == directory:
+        return None
+    return find_repo_root(parent)
+
+
+def _is_ignored(path: str, is_dir: bool, rule_dirs: List[str]) -> bool:
+    """루트부터 가까운 .gitignore 순서로 규칙을 적용합니다. (마지막으로 일치한 규칙이 우선)"""
+    ignored = False
+    for directory in rule_dirs:
+        if not (path == directory or path.startswith(directory + os.sep)):
+            continue
+        relative = os.path.relpath(path, directory).replace(os.sep, "/")
+        for rule in load_gitignore_rules(directory):
+            if rule.matches(relative, is_dir):
+                ignored = not rule.negated
+    return ignored
+
+
+def is_gitignored(file_path: str) -> bool:
+    """저장소 안의 파일이 .gitignore 규칙에 의해 제외되는지 판단합니다. (무시된 상위 디렉토리 포함)"""
+    file_path = os.path.abspath(file_path)
+    repo_root = find_repo_root(os.path.dirname(file_path))
+    if repo_root is None:
+        return False
+
+    # 저장소 루트부터 파일의 디렉토리까지 경로를 한 단계씩 내려가며 검사
+    relative_parts = os.path.relpath(file_path, repo_root).split(os.sep)
+    current = repo_root
+    rule_dirs = [repo_root]
+    for part in relative_parts[:-1]:
+        current = os.path.join(current, part)
+        if _is_ignored(current, True, rule_dirs):
+            return True    # git은 무시된 디렉토리 안의 파일을 다시 포함할 수 없음
+        rule_dirs.append(current)
+    return _is_ignored(file_path, False, rule_dirs)
+
+
+# -----------------------------
+# 2. 외부 의존성 / 생성 / minified 판단
+# -----------------------------
+
+def vendored_dir_in_path(file_path: str, scan_root: Optional[str] = None) -> Optional[str]:
+    """
+    저장소 안의 파일은 저장소 루트 아래 경로만, 저장소 밖의 파일은 스캔 폴더(scan_root) 아래 경로만 검사합니다.
+    (저장소나 스캔 폴더 자체가 build/, target/ 아래에 있어도 제외되지 않도록. 기준을 알 수 없으면 검사하지 않음)
+    """
+    file_path = os.path.abspath(file_path)
+    base_dir = find_repo_root(os.path.dirname(file_path))
+    if base_dir is None and scan_root is not None:
+        scan_root = os.path.abspath(scan_root)
+        if file_path.startswith(scan_root.rstrip(os.sep) + os.sep):
+            base_dir = scan_root
+    if base_dir is None:
+        return None
+    parts = os.path.relpath(file_path, base_dir).split(os.sep)[:-1]
+    for part in parts:
+        if part.lower() in VENDORED_DIR_NAMES:
+            return part
+    return None
+
+
+def _read_head(file_path: str) -> str:
+    with open(file_path, "rb") as f:
+        return f.read(MINIFIED_SCAN_BYTES).decode("utf-8", errors="ignore")
+
+
+def is_generated(file_path: str, head: str) -> bool:
+    name = os.path.basename(file_path)
+    if any(fnmatch.fnmatch(name, pattern) for pattern in GENERATED_FILE_PATTERNS):
+        return True
+    top_lines = "\n".join(head.splitlines()[:GENERATED_MARKER_SCAN_LINES])
+    return bool(GENERATED_MARKER_PATTERN.search(top_lines))
+
+
+def is_minified(head: str) -> bool:
+    lines = [line for line in head.splitlines() if line.strip()]
+    if not lines:
+        return False
+    # 마지막 줄은 읽기 경계에서 잘렸을 수 있으므로 최대 길이 판단에서 제외
+    complete_lines = lines[:-1] if len(head) >= MINIFIED_SCAN_BYTES else lines
+    if any(len(line) > MINIFIED_MAX_LINE_LENGTH for line in complete_lines):
+        return True
+    return sum(len(line) for line in lines) / len(lines) > MINIFIED_AVG_LINE_LENGTH
+
+
+def code_skip_reason(file_path: str, scan_root: Optional[str] = None) -> Optional[str]:
+    """
+    코드 파일을 수집에서 제외해야 하면 그 이유를, 아니면 None을 반환합니다.
+    (경로 기반 검사를 먼저 하고, 필요한 경우에만 파일 앞부분을 읽음. scan_root는 사용자가 스캔한 폴더)
+    """
+    vendored = vendored_dir_in_path(file_path, scan_root)
+    if vendored:
+        return f"외부 의존성/빌드 디렉토리 ({vendored})"
+    if is_gitignored(file_path):
+        return ".gitignore 제외 대상"
+
+    try:
+        head = _read_head(file_path)
+    except OSError:
+        return None
+    if is_generated(file_path, head):
+        return "생성 파일"
+    if is_minified(head):
+        return "minified 파일"
+    return None
@@ -0,0 +1,253 @@
+"""
+임베딩 전 중복 제거 단계.
+
+- 파일 단위: 원본 바이트의 SHA-256이 같은 파일은 전처리/임베딩 없이 기존 문서에 연결합니다.
+- 청크 단위: 정규화 텍스트 해시(정확 중복) + SimHash(근사 중복)로 이미 색인된 청크를 찾고,
+  중복 청크는 한 번만 임베딩한 뒤 모든 소유 문서(owner_doc_ids)에 연결합니다.
+
+연결 정보는 CACHE_DIR/dedup_links.json 으로 저장되어 Clustering.py의 파일 투표에 사용됩니다.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from core.config import DEDUP_LINKS_FILE
+
+# --- SimHash 설정 ---
+SIMHASH_BITS = 64
+SIMHASH_BANDS = 4               # 64비트를 16비트 4구간으로 나눠 후보 검색 (해밍거리 3 이하는 한 구간이 반드시 일치)
+SIMHASH_MAX_DISTANCE = 3        # 이 거리 이하면 근사 중복으로 판단
+SHINGLE_SIZE = 3                # 단어 3-gram
+MIN_CHARS_FOR_NEAR_DUP = 200    # 짧은 청크는 SimHash 오탐이 많으므로 정확 중복만 검사
+
+FILE_HASH_BLOCK_SIZE = 1024 * 1024
+
+# 전처리 스크립트가 붙이는 "파일 제목: ..." 헤더는 중복 판단에서 제외
+TITLE_HEADER_PATTERN = re.compile(r"^파일 제목:[^\n]*\n+")
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+# -----------------------------
+# 1. 해시 함수
+# -----------------------------
+
+def file_sha256(file_path: str) -> str:
+    """파일 바이트 전체의 SHA-256 (블록 단위로 읽어 메모리 사용을 제한)"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(FILE_HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def normalize_chunk_text(text: str) -> str:
+    """제목 헤더 제거 + 공백 정규화 + 소문자화"""
+    text = TITLE_HEADER_PATTERN.sub("", text or "", count=1)
+    return " ".join(text.split()).lower()
+
+
+def exact_hash(normalized_text: str) -> str:
+    return hashlib.sha1(normalized_text.encode("utf-8")).hexdigest()
+
+
+def simhash(normalized_text: str) -> int:
+    """단어 shingle 기반 64비트 SimHash"""
+    tokens = TOKEN_PATTERN.findall(normalized_text)
+    if len(tokens) >= SHINGLE_SIZE:
+        shingles = [" ".join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)]
+    else:
+        shingles = tokens
+
+    weights = [0] * SIMHASH_BITS
+    for shingle, count in Counter(shingles).items():
+        h = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(SIMHASH_BITS):
+            if (h >> bit) & 1:
+                weights[bit] += count
+            else:
+                weights[bit] -= count
+
+    value = 0
+    for bit in range(SIMHASH_BITS):
+        if weights[bit] > 0:
+            value |= 1 << bit
+    return value
+
+
+def _bands(value: int) -> List[int]:
+    band_bits = SIMHASH_BITS // SIMHASH_BANDS
+    mask = (1 << band_bits) - 1
+    return [(value >> (i * band_bits)) & mask for i in range(SIMHASH_BANDS)]
+
+
+# -----------------------------
+# 2. 중복 인덱스
+# -----------------------------
+
+@dataclass
+class ChunkPlan:
+    """unique_chunks가 기록하는 새 포인트/소유 문서 연결. 임베딩 실패 시 rollback에 사용합니다."""
+    new_point_ids: List[int] = field(default_factory=list)
+    linked: List[Tuple[int, str]] = field(default_factory=list)  # (기존 point_id, 추가된 owner doc_id)
+
+
+class DedupIndex:
+    """한 번의 파이프라인 실행 동안 유지되는 파일/청크 중복 인덱스"""
+
+    def __init__(self):
+        self.file_hashes: Dict[str, str] = {}        # sha256 -> canonical doc_id
+        self.duplicate_files: Dict[str, str] = {}    # 중복 doc_id -> canonical doc_id
+        self.chunk_hashes: Dict[str, int] = {}       # exact hash -> point_id
+        self.point_keys: Dict[int, Tuple[str, Optional[int]]] = {}  # point_id -> (exact hash, simhash)
+        self.simhash_bands: List[Dict[int, List[Tuple[int, int]]]] = [defaultdict(list) for _ in range(SIMHASH_BANDS)]
+        self.point_owners: Dict[int, List[str]] = {}  # point_id -> [doc_id, ...]
+        self._pending_file_hash: Dict[str, str] = {}
+        self.stats = Counter()
+
+    # --- 파일 단위 ---
+
+    def find_duplicate_file(self, file_path: str) -> Optional[str]:
+        """이미 처리된 동일 파일이 있으면 그 doc_id를 반환하고 연결을 기록합니다."""
+        doc_id = os.path.abspath(file_path)
+        try:
+            digest = file_sha256(file_path)
+        except OSError as e:
+            print(f"  [Dedup] 파일 해시 계산 실패: {e}", file=sys.stderr)
+            return None
+
+        canonical = self.file_hashes.get(digest)
+        if canonical and canonical != doc_id:
+            self.duplicate_files[doc_id] = canonical
+            self.stats["duplicate_files"] += 1
+            return canonical
+
+        self._pending_file_hash[doc_id] = digest
+        return None
+
+    def register_file(self, file_path: str):
+        """전처리/임베딩이 끝난 파일을 canonical 파일로 등록합니다."""
+        doc_id = os.path.abspath(file_path)
+        digest = self._pending_file_hash.pop(doc_id, None)
+        if digest:
+            self.file_hashes.setdefault(digest, doc_id)
+
+    # --- 청크 단위 ---
+
+    def _find_near_duplicate(self, value: int) -> Optional[int]:
+        for band_index, band_value in enumerate(_bands(value)):
+            for candidate, point_id in self.simhash_bands[band_index].get(band_value, []):
+                if bin(candidate ^ value).count("1") <= SIMHASH_MAX_DISTANCE:
+                    return point_id
+        return None
+
+    def _link_owner(self, point_id: int, doc_id: str, plan: ChunkPlan):
+        owners = self.point_owners[point_id]
+        if doc_id not in owners:
+            owners.append(doc_id)
+            plan.linked.append((point_id, doc_id))
+
+    def unique_chunks(self, chunks: Iterable[dict], starting_point_id: int, plan: ChunkPlan) -> Iterator[dict]:
+        """
+        이미 색인된(또는 같은 파일 안에서 앞서 나온) 청크를 제외하고 새 청크만 차례로 반환합니다. (변경 내용은 plan에 기록)
+        남은 청크는 starting_point_id부터 순서대로 Qdrant ID가 부여된다고 가정합니다. (runEmbed.py와 동일)
+        """
+        for chunk in chunks:
+            doc_id = chunk["doc_id"]
+            normalized = normalize_chunk_text(chunk.get("text_for_embedding", ""))
+            key = exact_hash(normalized)
+
+            point_id = self.chunk_hashes.get(key)
+            if point_id is not None:
+                self._link_owner(point_id, doc_id, plan)
+                self.stats["exact_duplicate_chunks"] += 1
+                continue
+
+            value = None
+            if len(normalized) >= MIN_CHARS_FOR_NEAR_DUP:
+                value = simhash(normalized)
+                point_id = self._find_near_duplicate(value)
+                if point_id is not None:
+                    self._link_owner(point_id, doc_id, plan)
+                    self.stats["near_duplicate_chunks"] += 1
+                    continue
+
+            # 신규 청크 등록
+            point_id = starting_point_id + len(plan.new_point_ids)
+            self.chunk_hashes[key] = point_id
+            self.point_keys[point_id] = (key, value)
+            if value is not None:
+                for band_index, band_value in enumerate(_bands(value)):
+                    self.simhash_bands[band_index][band_value].append((value, point_id))
+            self.point_owners[point_id] = [doc_id]
+
+            plan.new_point_ids.append(point_id)
+            self.stats["unique_chunks"] += 1
+            yield chunk
+
+    def rollback(self, plan: ChunkPlan):
+        """임베딩에 실패한 청크를 인덱스에서 제거합니다. (존재하지 않는 포인트에 연결되지 않도록)"""
+        for point_id, doc_id in plan.linked:
+            owners = self.point_owners.get(point_id, [])
+            if doc_id in owners:
+                owners.remove(doc_id)
+
+        removed = set(plan.new_point_ids)
+        for point_id in plan.new_point_ids:
+            key, value = self.point_keys.pop(point_id, (None, None))
+            self.chunk_hashes.pop(key, None)
+            self.point_owners.pop(point_id, None)
+            if value is not None:
+                for band_index, band_value in enumerate(_bands(value)):
+                    bucket = self.simhash_bands[band_index].get(band_value, [])
+                    bucket[:] = [entry for entry in bucket if entry[1] not in removed]
+
+        self.stats["unique_chunks"] -= len(plan.new_point_ids)
+
+    # --- 결과 저장 ---
+
+    def shared_points(self) -> Dict[int, List[str]]:
+        """소유 문서가 2개 이상인 포인트만 반환"""
+        return {pid: owners for pid, owners in self.point_owners.items() if len(owners) > 1}
+
+    def save_links(self, links_path: str = DEDUP_LINKS_FILE):
+        """파일/청크 연결 정보를 저장하고, 공유 청크의 Qdrant payload에 owner_doc_ids를 기록합니다."""
+        shared = self.shared_points()
+
+        os.makedirs(os.path.dirname(links_path), exist_ok=True)
+        with open(links_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "duplicate_files": self.duplicate_files,
+                "chunk_owners": {str(pid): owners for pid, owners in shared.items()},
+            }, f, ensure_ascii=False, indent=2)
+
+        if shared:
+            try:
+                from qdrant_client import QdrantClient
+                from core.config import COLLECTION_NAME, QDRANT_API_KEY, QDRANT_URL
+
+                qdrant_client = QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY)
+                indexed_at = time.time()  # 클러스터링 벡터 스냅샷이 바뀐 포인트로 인식하도록 함께 갱신
+                for point_id, owners in shared.items():
+                    qdrant_client.set_payload(
+                        collection_name=COLLECTION_NAME,
+                        payload={"owner_doc_ids": owners, "indexed_at": indexed_at},
+                        points=[point_id],
+                    )
+            except Exception as e:
+                print(f"  [Dedup] Qdrant owner_doc_ids 갱신 실패: {e}", file=sys.stderr)
+
+    def report(self):
+        saved = self.stats["exact_duplicate_chunks"] + self.stats["near_duplicate_chunks"]
+        print(
+            f"[Dedup] 중복 파일 {self.stats['duplicate_files']}개 연결, "
+            f"중복 청크 {saved}개 제거 (정확 {self.stats['exact_duplicate_chunks']}, 근사 {self.stats['near_duplicate_chunks']}), "
+            f"임베딩 청크 {self.stats['unique_chunks']}개",
+            file=sys.stderr,
+        )
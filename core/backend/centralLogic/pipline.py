@@ -3,6 +3,17 @@ import subprocess
 import json
 import tempfile
 import sys
+import threading
+import time
+from collections import Counter
+
+from core.backend.centralLogic.codeFilter import code_skip_reason
+from core.backend.centralLogic.dedup import DedupIndex, ChunkPlan
+from core.backend.common.chunkFilter import ChunkFilter
+from core.backend.common.streamOutput import iter_json_array
+from core.backend.common.upstageClient import summarize_metrics_since
+from core.backend.common.ocrPack import IMAGE_EXTENSIONS
+from core.config import ASYNC_DOCUMENT_PARSE, CODE_REPO_FILTER, LOCAL_TEXT_LAYER, BOILERPLATE_FILTER, OCR_PACK
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 # --- 설정 (스크립트 파일 경로) ---
 # 전처리 스크립트가 있는 디렉토리 (상대 경로: ../typeJson)
@@ -22,6 +33,7 @@ EMBED_SCRIPT = os.path.join(EMBEDDING_DIR, "runEmbed.py")
 # --- 파일 확장자별 스크립트 매핑 ---
 FILE_TYPE_MAP = {
     ('.pdf', '.docx', '.pptx', '.doc'): DOCTYPE1_SCRIPT,
+    IMAGE_EXTENSIONS: DOCTYPE1_SCRIPT, # 이미지(스캔/스크린샷)는 document-parse OCR
     ('.txt'): DOCTYPE2_SCRIPT,
     ('.py', '.js', '.java', '.c', '.cpp', '.go', '.rb', '.ts'): CODETYPE1_SCRIPT,
     ('.html', '.htm'): CODETYPE2_SCRIPT,
@@ -36,42 +48,103 @@ def get_processor_script(file_path):
             return script
     return None
 
-def execute_preprocess_script(script_path, file_path):
+def needs_remote_document_parse(file_path):
+    """doctype1에서 문서 전체를 원격 파싱하게 될 파일인지 판단합니다. (로컬 텍스트 레이어 미지원 형식 등)"""
+    if get_processor_script(file_path) != DOCTYPE1_SCRIPT:
+        return False
+    ext = os.path.splitext(file_path)[1].lower()
+    return not LOCAL_TEXT_LAYER or ext not in ('.pdf', '.docx')
+
+def iter_files_in_processing_order(file_paths):
     """
-    외부 전처리 스크립트를 실행하고, stdout에서 JSON 텍스트(청크 리스트)를 파싱합니다.
+    처리할 파일 순서를 결정합니다.
+    비동기 파싱 모드에서는 원격 파싱 대상 문서를 먼저 모두 제출해 두고, 나머지 파일을 처리하는 동안 상태를 조회한 뒤
+    파싱이 끝난 문서부터 전처리에 넘깁니다. (결과는 파싱 캐시에 저장되어 doctype1이 API 호출 없이 사용)
+    이미지/작은 스캔 PDF는 그보다 먼저 여러 파일을 한 요청으로 묶어 파싱해 둡니다.
     """
-    print(f"\n  🚀 전처리 실행: {os.path.basename(script_path)}", file=sys.stderr)
-    try:
-        # 전처리 스크립트 실행 및 stdout 캡처
-        process = subprocess.Popen(
+    if OCR_PACK:
+        from core.backend.common.ocrPack import prefetch_packed_ocr
+        prefetch_packed_ocr([path for path in file_paths if get_processor_script(path) == DOCTYPE1_SCRIPT])
+
+    if not ASYNC_DOCUMENT_PARSE:
+        yield from file_paths
+        return
+
+    from core.backend.common.asyncParse import AsyncParseQueue
+
+    async_targets = [path for path in file_paths if needs_remote_document_parse(path)]
+    async_target_set = set(async_targets)
+    print(f"[Async Parse] 원격 파싱 대상 {len(async_targets)}개 문서 비동기 제출 시작.", file=sys.stderr)
+    parse_queue = AsyncParseQueue(async_targets)
+
+    for file_path in file_paths:
+        if file_path in async_target_set:
+            continue
+        yield file_path
+        parse_queue.poll()
+        # 다른 파일 처리 중에 끝난 문서는 바로 처리
+        for job in parse_queue.drain_finished():
+            yield job.file_path
+
+    for job in parse_queue.iter_completed():
+        yield job.file_path
+
+class PreprocessRun:
+    """
+    외부 전처리 스크립트 실행. stdout의 JSON 배열(청크 리스트)을 읽는 대로 청크 단위로 넘기므로
+    큰 표/텍스트 파일도 전체 출력을 메모리에 모으지 않습니다. stderr(로그)는 별도 스레드에서 모읍니다.
+    """
+
+    def __init__(self, script_path, file_path):
+        self.script_name = os.path.basename(script_path)
+        self.chunk_count = 0
+        print(f"\n  🚀 전처리 실행: {self.script_name}", file=sys.stderr)
+        self.process = subprocess.Popen(
             ["python", script_path, file_path],
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE, # 전처리 스크립트의 로그는 stderr로 출력되도록 설계
             text=True,
             encoding='utf-8'
         )
-        stdout, stderr = process.communicate()
+        # stderr 파이프가 가득 차 스크립트가 멈추지 않도록 stdout을 읽는 동안 함께 비움
+        self._stderr_lines = []
+        self._stderr_reader = threading.Thread(target=lambda: self._stderr_lines.extend(self.process.stderr), daemon=True)
+        self._stderr_reader.start()
+
+    def iter_chunks(self):
+        """stdout의 청크를 차례로 반환합니다. (출력이 유효한 JSON 배열이 아니면 ValueError)"""
+        for chunk in iter_json_array(self.process.stdout):
+            self.chunk_count += 1
+            yield chunk
+
+    def finish(self):
+        """스크립트 종료를 기다리고 (성공 여부, 실패 메시지)를 반환합니다."""
+        self.process.stdout.read() # 읽지 않은 출력이 남아 있어도 종료될 수 있도록 비움
+        self.process.wait()
+        self._stderr_reader.join()
+        stderr = "".join(self._stderr_lines)
         
-        # 전처리 스크립트가 0이 아닌 코드를 반환하거나, stdout이 비어있으면 오류
-        if process.returncode != 0:
-            print(f"  ❌ 전처리 오류 (Code: {process.returncode}): {os.path.basename(script_path)}", file=sys.stderr)
+        # 전처리 스크립트가 0이 아닌 코드를 반환하면 오류
+        if self.process.returncode != 0:
+            print(f"  ❌ 전처리 오류 (Code: {self.process.returncode}): {self.script_name}", file=sys.stderr)
             print(f"  --- STDERR LOG --- \n{stderr}", file=sys.stderr)
             return False, f"전처리 실패: {stderr}"
         
-        if not stdout.strip():
-             return True, [] # 청크가 0개인 경우 (정상 종료)
+        print(f"  ✅ 전처리 성공: {self.script_name} (청크 {self.chunk_count}개)", file=sys.stderr)
+        return True, None
 
-        # stdout에서 JSON 파싱
-        print(f"  ✅ 전처리 성공: {os.path.basename(script_path)}", file=sys.stderr)
-        return True, json.loads(stdout.strip())
-            
-    except json.JSONDecodeError:
-        print("  ❌ 오류: 전처리 스크립트 출력이 유효한 JSON 형식이 아닙니다.", file=sys.stderr)
-        print(f"  파싱 실패 원본 출력 (일부): {stdout[:500]}...", file=sys.stderr)
-        return False, "JSON 파싱 오류"
-    except Exception as e:
-        print(f"  ❌ 오류: 실행 중 예외 발생: {e}", file=sys.stderr)
-        return False, str(e)
+    def abort(self):
+        """출력 파싱 등에 실패했을 때 스크립트를 종료합니다."""
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.wait()
+        self._stderr_reader.join()
+
+def count_items(items, counter, key):
+    """items를 그대로 넘기면서 개수를 counter[key]에 기록합니다."""
+    for item in items:
+        counter[key] += 1
+        yield item
 
 def execute_embed_script(temp_json_path, starting_global_id):
     """
@@ -103,17 +176,25 @@ def execute_embed_script(temp_json_path, starting_global_id):
         return False, str(e)
 
 
-def run_pipeline(file_paths):
+def run_pipeline(file_paths, scan_root=None):
     """
     중앙 파이프라인 로직: 파일별로 전처리 -> 임베딩을 순차적으로 수행합니다.
+    scan_root는 사용자가 스캔한 폴더로, 저장소 밖 코드 파일의 빌드/의존성 디렉토리 판단 기준입니다. (없으면 파일들의 공통 상위 폴더)
     """
     print("--- RAG 데이터 전처리 및 임베딩 파이프라인 시작 ---", file=sys.stderr)
+    started_at = time.time()
     
     overall_status = {}
     # 2. 연속적인 Qdrant ID 관리를 위한 카운터 (Qdrant ID는 1부터 시작)
     current_qdrant_id = 1 
+    # 3. 파일/청크 중복 제거 인덱스 (이번 실행 동안 유지)
+    dedup_index = DedupIndex()
+    # 4. 반복 문구/정보량 부족 청크 필터 (문서 간 반복 줄 기록은 실행 간 유지)
+    chunk_filter = ChunkFilter() if BOILERPLATE_FILTER else None
+    if scan_root is None and file_paths:
+        scan_root = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in file_paths])
     
-    for file_path in file_paths:
+    for file_path in iter_files_in_processing_order(file_paths):
         file_name = os.path.basename(file_path)
         print(f"\n=======================================================", file=sys.stderr)
         print(f"  [파일 처리] {file_name} (다음 Qdrant 시작 ID: {current_qdrant_id})", file=sys.stderr)
@@ -125,22 +206,66 @@ def run_pipeline(file_paths):
             print(f"⚠️ 경고: 지원하지 않는 파일 형식. 건너뜀.", file=sys.stderr)
             overall_status[file_name] = {"status": "SKIP", "message": "지원하지 않는 형식"}
             continue
+
+        # 0-1. 코드 파일 중 외부 의존성/생성/minified/.gitignore 대상은 요약/임베딩하지 않음
+        if CODE_REPO_FILTER and processor_script == CODETYPE1_SCRIPT:
+            skip_reason = code_skip_reason(file_path, scan_root)
+            if skip_reason:
+                print(f"  > 코드 수집 제외: {skip_reason}", file=sys.stderr)
+                overall_status[file_name] = {"status": "SKIP", "message": f"코드 수집 제외: {skip_reason}"}
+                continue
+
+        # 0. 동일 파일(바이트 해시 일치)은 전처리/임베딩 없이 기존 문서에 연결
+        canonical_doc_id = dedup_index.find_duplicate_file(file_path)
+        if canonical_doc_id:
+            print(f"  > 동일 파일 발견. 재처리 없이 연결: {os.path.basename(canonical_doc_id)}", file=sys.stderr)
+            overall_status[file_name] = {"status": "DUPLICATE", "message": f"동일 파일 연결: {canonical_doc_id}"}
+            continue
             
-        # 1. 파일 전처리 (JSON 문자열을 메모리(result_data)로 획득)
-        preprocess_success, result_data = execute_preprocess_script(processor_script, file_path)
-        
-        # 전처리 성공 및 청크가 존재하는 경우
-        if preprocess_success and isinstance(result_data, list) and result_data:
-            chunks = result_data
-            num_chunks = len(chunks)
-            temp_json_path = None
-            
-            try:
-                # 2. 전처리된 청크 리스트를 임시 파일에 저장
-                with tempfile.NamedTemporaryFile(mode='w', delete=False, encoding='utf-8', suffix='.json') as tmp_file:
-                    json.dump(chunks, tmp_file, ensure_ascii=False, indent=2)
-                    temp_json_path = tmp_file.name
-                
+        # 1. 파일 전처리 -> 1-0. 필터 -> 1-1. 중복 제거를 청크 단위로 이어서 수행하고, 남은 청크는 바로 임시 파일(JSON Lines)에 기록
+        #    (전처리 출력 전체를 메모리에 모으지 않음. 임베딩 스크립트도 이 파일을 배치 단위로 읽음)
+        preprocess = PreprocessRun(processor_script, file_path)
+        dedup_plan = ChunkPlan()
+        counts = Counter()
+        temp_json_path = None
+        try:
+            with tempfile.NamedTemporaryFile(mode='w', delete=False, encoding='utf-8', suffix='.jsonl') as tmp_file:
+                temp_json_path = tmp_file.name
+                chunks = preprocess.iter_chunks()
+                # 1-0. 여러 문서에 반복되는 줄(PDF/DOCX/PPTX)을 제거하고 정보량이 낮은 청크는 임베딩하지 않음
+                if chunk_filter:
+                    chunks = chunk_filter.filter_chunks(chunks, strip_boilerplate=processor_script == DOCTYPE1_SCRIPT)
+                chunks = count_items(chunks, counts, "kept")
+                # 1-1. 이미 색인된 청크(정확/근사 중복)는 제외하고 소유 문서만 연결
+                for chunk in dedup_index.unique_chunks(chunks, current_qdrant_id, dedup_plan):
+                    tmp_file.write(json.dumps(chunk, ensure_ascii=False) + "\n")
+            preprocess_success, preprocess_error = preprocess.finish()
+        except ValueError as e:
+            preprocess.abort()
+            print(f"  ❌ 오류: 전처리 스크립트 출력이 유효한 JSON 형식이 아닙니다: {e}", file=sys.stderr)
+            preprocess_success, preprocess_error = False, "JSON 파싱 오류"
+        except Exception as e:
+            preprocess.abort()
+            print(f"  ❌ 오류: 실행 중 예외 발생: {e}", file=sys.stderr)
+            preprocess_success, preprocess_error = False, str(e)
+
+        num_raw_chunks = preprocess.chunk_count
+        num_chunks = len(dedup_plan.new_point_ids)
+        try:
+            if not preprocess_success:
+                dedup_index.rollback(dedup_plan)
+                overall_status[file_name] = {"status": "FAIL", "message": preprocess_error}
+            elif num_raw_chunks == 0:
+                print(f"  > 전처리 성공했으나, 생성된 청크가 0개입니다. 건너뜁니다.", file=sys.stderr)
+                overall_status[file_name] = {"status": "SKIP", "message": "생성된 청크 0개"}
+            elif counts["kept"] == 0:
+                print(f"  > 모든 청크({num_raw_chunks}개)의 정보량이 낮아 건너뜁니다.", file=sys.stderr)
+                overall_status[file_name] = {"status": "SKIP", "message": f"정보량이 낮은 청크만 생성됨 ({num_raw_chunks}개)"}
+            elif num_chunks == 0:
+                dedup_index.register_file(file_path)
+                print(f"  > 모든 청크({counts['kept']}개)가 기존 청크와 중복되어 연결만 수행합니다.", file=sys.stderr)
+                overall_status[file_name] = {"status": "SUCCESS", "message": f"중복 청크 연결 완료 (총 {counts['kept']}개 청크)"}
+            else:
                 print(f"  > 임시 JSON 생성: {temp_json_path} (청크 {num_chunks}개)", file=sys.stderr)
                 
                 # 3. 임베딩 및 Qdrant 색인
@@ -149,24 +274,32 @@ def run_pipeline(file_paths):
                 if embed_success:
                     # ✅ 임베딩 성공 시, 다음 파일의 시작 ID 업데이트
                     current_qdrant_id += num_chunks
-                    overall_status[file_name] = {"status": "SUCCESS", "message": f"전처리 및 임베딩 완료 (총 {num_chunks}개 청크)"}
+                    dedup_index.register_file(file_path)
+                    overall_status[file_name] = {"status": "SUCCESS", "message": f"전처리 및 임베딩 완료 (총 {num_chunks}개 청크, 중복 {counts['kept'] - num_chunks}개 연결)"}
                 else:
+                    dedup_index.rollback(dedup_plan)
                     overall_status[file_name] = {"status": "FAIL", "message": embed_message}
                     
-            except Exception as e:
-                 overall_status[file_name] = {"status": "FAIL", "message": f"임시 파일 또는 임베딩 처리 중 예외 발생: {e}"}
-            finally:
-                # 4. 임시 파일 삭제
-                if temp_json_path and os.path.exists(temp_json_path):
-                    os.remove(temp_json_path)
-                    print(f"  > 임시 파일 삭제: {temp_json_path}", file=sys.stderr)
-
-        elif preprocess_success and not result_data:
-             print(f"  > 전처리 성공했으나, 생성된 청크가 0개입니다. 건너뜁니다.", file=sys.stderr)
-             overall_status[file_name] = {"status": "SKIP", "message": "생성된 청크 0개"}
-        else:
-            # 전처리 실패 시, result_data는 에러 메시지 문자열
-            overall_status[file_name] = {"status": "FAIL", "message": result_data}
+        except Exception as e:
+             dedup_index.rollback(dedup_plan)
+             overall_status[file_name] = {"status": "FAIL", "message": f"임시 파일 또는 임베딩 처리 중 예외 발생: {e}"}
+        finally:
+            # 4. 임시 파일 삭제
+            if temp_json_path and os.path.exists(temp_json_path):
+                os.remove(temp_json_path)
+                print(f"  > 임시 파일 삭제: {temp_json_path}", file=sys.stderr)
+
+    # 중복 연결 정보 저장 (Clustering.py의 파일 투표에서 사용)
+    dedup_index.save_links()
+    dedup_index.report()
+    if chunk_filter:
+        chunk_filter.save()
+        chunk_filter.report()
+
+    # 전처리/임베딩 프로세스들이 남긴 Upstage 호출 지표 합산
+    for row in summarize_metrics_since(started_at):
+        average = row["total_s"] / row["calls"] if row["calls"] else 0
+        print(f"[Upstage] {row['endpoint']}: {row['calls']}회 (오류 {row['errors']}), 평균 {average:.2f}s, 최대 {row['max_s']:.2f}s", file=sys.stderr)
 
     print("\n--- 파이프라인 종료 (결과 요약) ---", file=sys.stderr)
     for file, status in overall_status.items():
@@ -4,11 +4,9 @@ import sys
 import requests
 import re
 
-from core.config import SOLAR_API_KEY
+from core.backend.common.llmCache import solar_chat_completion
 
-# --- Qdrant 및 Solar LLM 설정 ---
-# NOTE: Qdrant는 이 단계에서 사용되지 않지만, API 키 설정을 유지합니다. 
-SOLAR_LLM_ENDPOINT = "https://api.upstage.ai/v1/chat/completions"
+# --- Solar LLM 설정 (호출은 공용 클라이언트 + 응답 캐시 사용) ---
 SOLAR_MODEL = "solar-pro2"
 
 # --- 입력/출력 파일 경로 설정 ---
@@ -46,11 +44,6 @@ HIERARCHY_PROMPT_TEMPLATE = """
 
 def _call_solar_llm(prompt: str, max_tokens: int) -> str:
     """LLM 호출을 위한 내부 범용 함수"""
-    headers = {
-        "Authorization": f"Bearer {SOLAR_API_KEY}",
-        "Content-Type": "application/json"
-    }
-
     payload = {
         "model": SOLAR_MODEL,
         "messages": [{"role": "user", "content": prompt}],
@@ -59,18 +52,10 @@ def _call_solar_llm(prompt: str, max_tokens: int) -> str:
     }
 
     try:
-        response = requests.post(
-            SOLAR_LLM_ENDPOINT,
-            headers=headers,
-            json=payload,
-            timeout=120  
-        )
-        response.raise_for_status()
-
-        response_json = response.json()
+        content = solar_chat_completion(payload, timeout=120)
         
-        if response_json['choices'] and response_json['choices'][0]['message']:
-            return response_json['choices'][0]['message']['content'].strip()
+        if content:
+            return content.strip()
         else:
             return "LLM_RESPONSE_FAILURE"
 
@@ -7,37 +7,41 @@ import re
 from qdrant_client import QdrantClient
 from typing import List, Dict, Any, Set, Tuple
 
-from core.config import QDRANT_URL, COLLECTION_NAME, QDRANT_API_KEY, SOLAR_API_KEY
+from core.config import QDRANT_URL, COLLECTION_NAME, QDRANT_API_KEY, SUMMARY_HIERARCHY
+from core.backend.common.llmCache import solar_chat_completion
+from core.backend.common.chunkSummary import ensure_summaries
+from core.backend.common.mapReduceSummary import reduce_summaries
+from clusterModel import save_labels
 
 
-SOLAR_LLM_ENDPOINT = "https://api.upstage.ai/v1/chat/completions"
 SOLAR_MODEL = "solar-pro2"
 
 # --- 입력/출력 파일 경로 설정 ---
 FINAL_MAPPING_FILE = "final_file_cluster_mapping.json"
 CENTROID_VECTORS_FILE = "hdbscan_cluster_centroids.npy"
 OUTPUT_JSON_FILE = "hdbscan_cluster_labels.json" 
+OUTPUT_SUMMARY_FILE = "hdbscan_category_summaries.json" # {카테고리 이름: 카테고리 요약} (SUMMARY_HIERARCHY=1일 때만)
 
 # ------------------------------------------------------------------
 # 1. Qdrant 검색 함수
 # ------------------------------------------------------------------
 
 def real_qdrant_search(query_vector: np.ndarray, k: int = 5) -> List[str]: 
-    """Centroid 벡터를 쿼리로 사용하여 Qdrant에서 상위 K=5개의 원본 청크의 summary를 검색합니다."""
+    """Centroid 벡터를 쿼리로 사용하여 Qdrant에서 상위 K=5개의 원본 청크의 summary를 검색합니다. (summary가 없는 청크는 이때 생성)"""
     try:
         qdrant_client = QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY)
         
         # Qdrant 검색 (Centroid 벡터와 가장 가까운 청크를 찾음)
-        search_result = qdrant_client.search(
+        search_result = qdrant_client.query_points(
             collection_name=COLLECTION_NAME,
-            query_vector=query_vector.tolist(),
+            query=query_vector.tolist(),
             limit=k,
-            with_payload=['summary'] # summary 페이로드만 가져옵니다.
-        )
+            with_payload=['summary', 'text_for_embedding'] # summary가 없으면 원문으로 생성
+        ).points
         
-        # 검색된 summary 텍스트만 추출하여 리스트로 반환
-        summaries = [hit.payload.get('summary', '') for hit in search_result if 'summary' in hit.payload]
-        return summaries
+        # 검색된 summary 텍스트만 추출하여 리스트로 반환 (없으면 생성 후 payload에 기록)
+        summaries = ensure_summaries(qdrant_client, COLLECTION_NAME, search_result)
+        return [summary for summary in summaries if summary]
     
     except Exception as e:
         print(f"[오류] Qdrant 검색 실패: {e}", file=sys.stderr)
@@ -54,7 +58,7 @@ def call_solar_llm_for_labeling(summaries: List[str], existing_labels: Set[str],
     
     # 1. 프롬프트 구성
     summaries_text = "\n".join([f"- {s}" for s in summaries])
-    existing_labels_text = ", ".join(existing_labels)
+    existing_labels_text = ", ".join(sorted(existing_labels)) # 순서를 고정해야 같은 요청이 캐시에서 재사용됨
     
     prompt = f"""
     규칙:
@@ -78,10 +82,6 @@ def call_solar_llm_for_labeling(summaries: List[str], existing_labels: Set[str],
     """
     
     # 2. API 호출
-    headers = {
-        "Authorization": f"Bearer {SOLAR_API_KEY}",
-        "Content-Type": "application/json"
-    }
     data = {
         "model": SOLAR_MODEL,
         "messages": [{"role": "user", "content": prompt}],
@@ -91,11 +91,8 @@ def call_solar_llm_for_labeling(summaries: List[str], existing_labels: Set[str],
     }
     
     try:
-        response = requests.post(SOLAR_LLM_ENDPOINT, headers=headers, json=data)
-        response.raise_for_status() # HTTP 오류 발생 시 예외 발생
-        
-        result = response.json()
-        llm_label_raw = result['choices'][0]['message']['content'].strip()
+        # 같은 summary 목록/기존 라벨이면 캐시된 라벨 사용
+        llm_label_raw = solar_chat_completion(data, timeout=60).strip()
         
         # LLM의 출력이 따옴표 등으로 감싸져 있을 수 있으므로 제거
         llm_label = llm_label_raw.strip("'\"") 
@@ -108,10 +105,28 @@ def call_solar_llm_for_labeling(summaries: List[str], existing_labels: Set[str],
              
         return llm_label
         
-    except requests.exceptions.RequestException as e:
+    except (requests.exceptions.RequestException, KeyError, IndexError) as e:
         print(f"[오류] Solar LLM API 호출 실패: {e}", file=sys.stderr)
         return f"LLM_ERROR_{cluster_id}"
 
+def summarize_category(summaries: List[str], label: str) -> str:
+    """대표 청크 요약들을 카테고리 요약 하나로 합칩니다. (map-reduce의 reduce 단계, 응답 캐시 사용) 실패 시 빈 문자열"""
+    try:
+        return reduce_summaries(summaries, label, kind="카테고리")
+    except Exception as e:
+        print(f"[오류] 카테고리 요약 실패 ({label}): {e}", file=sys.stderr)
+        return ""
+
+
+def load_category_summaries() -> Dict[str, str]:
+    if not os.path.exists(OUTPUT_SUMMARY_FILE):
+        return {}
+    try:
+        with open(OUTPUT_SUMMARY_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
 # ------------------------------------------------------------------
 # 3. 라벨링 메인 프로세스
 # ------------------------------------------------------------------
@@ -131,15 +146,27 @@ def run_labeling_process() -> bool:
             # 클러스터 ID -> Centroid 벡터 인덱스 매핑 로드
             cluster_id_to_index = {int(k): v for k, v in mapping_data.get('cluster_id_to_index', {}).items()}
             assigned_cluster_ids = mapping_data.get('assigned_cluster_ids', [])
+            
+            # 증분 배정(Clustering.py)이면 저장된 클러스터 라벨 재사용
+            reused_labels = {int(k): v for k, v in mapping_data.get('cluster_labels', {}).items()}
 
         cluster_labels_map: Dict[int, str] = {} # {cluster_id: 'LLM_Label'}
-        existing_labels_set: Set[str] = set() # 중복 체크용
+        existing_labels_set: Set[str] = set(reused_labels.values()) # 중복 체크용
+        previous_summaries = load_category_summaries()
+        category_summaries: Dict[str, str] = {} # {'LLM_Label': 카테고리 요약}
         
         # 2. 각 클러스터별로 라벨링 수행
         print(f"\n[LLM 라벨링 시작] 총 {len(assigned_cluster_ids)}개 클러스터 대상.")
         
         for cluster_id in assigned_cluster_ids:
             
+            if cluster_id in reused_labels:
+                cluster_labels_map[cluster_id] = reused_labels[cluster_id]
+                if reused_labels[cluster_id] in previous_summaries:
+                    category_summaries[reused_labels[cluster_id]] = previous_summaries[reused_labels[cluster_id]]
+                print(f"  -> 클러스터 {cluster_id}: 기존 라벨 '{reused_labels[cluster_id]}' 재사용.")
+                continue
+            
             # 해당 클러스터의 Centroid 벡터 가져오기
             index = cluster_id_to_index.get(cluster_id)
             if index is None or index >= len(centroid_vectors):
@@ -150,7 +177,7 @@ def run_labeling_process() -> bool:
             
             # Centroid 벡터로 Qdrant 검색 (대표 summary 획득)
             representative_summaries = real_qdrant_search(centroid_vector)
-            unique_summaries = list(set(representative_summaries))
+            unique_summaries = sorted(set(representative_summaries)) # 순서를 고정해야 같은 요청이 캐시에서 재사용됨
             
             # LLM 호출
             if not unique_summaries:
@@ -162,8 +189,16 @@ def run_labeling_process() -> bool:
             # 라벨 저장 및 중복 Set에 추가
             cluster_labels_map[cluster_id] = llm_label
             existing_labels_set.add(llm_label)
+
+            # 대표 청크 요약 -> 카테고리 요약
+            if SUMMARY_HIERARCHY and unique_summaries:
+                category_summary = summarize_category(unique_summaries, llm_label)
+                if category_summary:
+                    category_summaries[llm_label] = category_summary
             print(f"  -> 클러스터 {cluster_id}: '{llm_label}' 할당 완료.")
 
+        # 다음 증분 배정에서 재사용하도록 클러스터 모델에 라벨 기록
+        save_labels(cluster_labels_map)
 
         # 3. 최종 JSON 구조 생성 및 저장
         
@@ -190,6 +225,11 @@ def run_labeling_process() -> bool:
             json.dump(output_relations, f, ensure_ascii=False, indent=2)
             
         print(f"\n[저장 완료] 최종 파일-카테고리 매핑 저장: {OUTPUT_JSON_FILE}")
+
+        if SUMMARY_HIERARCHY:
+            with open(OUTPUT_SUMMARY_FILE, 'w', encoding='utf-8') as f:
+                json.dump(category_summaries, f, ensure_ascii=False, indent=2)
+            print(f"[저장 완료] 카테고리 요약 {len(category_summaries)}개 저장: {OUTPUT_SUMMARY_FILE}")
         return True
 
     except Exception as e:
@@ -2,151 +2,211 @@ import numpy as np
 import json
 import os
 import sys
+import time
 import pandas as pd
-from qdrant_client import QdrantClient
 import hdbscan
 from collections import Counter
 from typing import Dict, List, Any
 
-from core.config import COLLECTION_NAME, QDRANT_API_KEY, QDRANT_URL
+from core.config import (
+    DEDUP_LINKS_FILE, SNAPSHOT_KEEP, CLUSTERING_MODE, CLUSTERING_INCREMENTAL, CLUSTER_INCREMENTAL_MAX_RATIO, CLUSTER_INCREMENTAL_MAX_NOISE_RISE
+)
+from vectorSnapshot import sync_snapshot, load_snapshot, remove_snapshot
+from dimReduction import reduce_vectors, unit_rows
+from docPooling import pool_documents
+from clusterModel import (
+    load_model, save_model, update_assignments, member_threshold, noise_ratio, changed_documents, assign_documents,
+    latest_indexed_at
+)
 
-
-# --- 로컬 파일 설정 (vectorPull.py에서 생성됨) ---
-VECTORS_FILE = "all_qdrant_vectors.npy"
-PAYLOADS_FILE = "all_qdrant_payloads.json"
+# 정규화를 블록 단위로 계산 (memmap 스냅샷 전체를 한 번에 float32 임시 배열로 만들지 않음)
+NORMALIZE_BLOCK_ROWS = 50000
 
 # --- 출력 파일 설정 ---
 FINAL_MAPPING_FILE = "final_file_cluster_mapping.json"
 CENTROID_VECTORS_FILE = "hdbscan_cluster_centroids.npy"
+CLUSTERING_REPORT_FILE = "clustering_report.json" # 차원 축소/HDBSCAN 소요 시간 및 품질 기록
 
 # ------------------------------------------------------
 # 1. Qdrant 데이터 Fetch 및 Load 함수
 # ------------------------------------------------------
 
 def fetch_all_vectors_from_qdrant():
-    """Qdrant에서 데이터를 가져와 로컬에 캐시합니다."""
-    
-    if os.path.exists(VECTORS_FILE) and os.path.exists(PAYLOADS_FILE):
-        print(f"[정보] 로컬 캐시 파일이 이미 존재합니다. 분석을 바로 시작합니다.")
-        return True
+    """로컬 벡터 스냅샷을 Qdrant 컬렉션과 맞춥니다. (vectorPull.py에서 이미 맞췄으면 확인만 하고 넘어감)"""
     
-    try:
-        qdrant_client = QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY)
-        if not qdrant_client.collection_exists(collection_name=COLLECTION_NAME):
-             print(f"[오류] 컬렉션 '{COLLECTION_NAME}'을(를) 찾을 수 없습니다.", file=sys.stderr)
-             return False
-        
-        print(f"[시작] 컬렉션 '{COLLECTION_NAME}'에서 데이터 가져오기 시작. (최초 다운로드)")
-        all_vectors = []
-        all_payloads = []
-        next_offset = None
-        
-        while True:
-            scroll_response, current_offset = qdrant_client.scroll(
-                collection_name=COLLECTION_NAME, limit=1000, offset=next_offset,
-                with_vectors=True, with_payload=True
-            )
-            for point in scroll_response:
-                all_vectors.append(point.vector)
-                payload_data = point.payload.copy()
-                payload_data['point_id'] = point.id 
-                all_payloads.append(payload_data)
-            
-            next_offset = current_offset
-            if next_offset is None:
-                break
-        
-        if not all_vectors:
-            print("[경고] 컬렉션에 저장된 벡터가 없습니다.", file=sys.stderr)
-            return False
+    return sync_snapshot() is not None
 
-        vectors_array = np.array(all_vectors, dtype=np.float32)
-        
-        np.save(VECTORS_FILE, vectors_array)
-        with open(PAYLOADS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(all_payloads, f, ensure_ascii=False, indent=2)
-            
-        print(f"[완료] 총 {len(vectors_array)}개 벡터와 페이로드 저장 완료. (클러스터링 준비 완료)")
-        return True
+def load_data_for_clustering():
+    """로컬에 저장된 벡터(memmap)와 페이로드(DataFrame)를 로드합니다."""
+    
+    return load_snapshot()
 
-    except Exception as e:
-        print(f"[오류] Qdrant 데이터 가져오기 실패: {e}", file=sys.stderr)
-        return False
+def normalize_rows(vectors: np.ndarray, block_rows: int = NORMALIZE_BLOCK_ROWS) -> np.ndarray:
+    """행 벡터를 단위 길이로 정규화한 float32 배열을 블록 단위로 만듭니다. (float16/memmap 입력 지원)"""
+    
+    normalized = np.empty(vectors.shape, dtype=np.float32)
+    for start in range(0, len(vectors), block_rows):
+        normalized[start:start + block_rows] = unit_rows(vectors[start:start + block_rows])
+    return normalized
 
-def load_data_for_clustering():
-    """로컬에 저장된 벡터와 페이로드를 메모리로 로드합니다."""
+def load_dedup_links() -> Dict[str, Any]:
+    """중복 제거 단계에서 기록한 파일/청크 연결 정보를 로드합니다. (없으면 빈 값)"""
     
-    if not os.path.exists(VECTORS_FILE) or not os.path.exists(PAYLOADS_FILE):
-        return None, None
-        
-    vectors = np.load(VECTORS_FILE)
-    with open(PAYLOADS_FILE, 'r', encoding='utf-8') as f:
-        payloads = json.load(f)
+    if not os.path.exists(DEDUP_LINKS_FILE):
+        return {"duplicate_files": {}, "chunk_owners": {}}
         
-    return vectors, payloads
+    with open(DEDUP_LINKS_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
 
 
 # ------------------------------------------------------
 # 2. HDBSCAN 실행 및 파일 투표 시스템
 # ------------------------------------------------------
 
-def run_file_centric_hdbscan(vectors: np.ndarray, payloads: List[Dict[str, Any]]):
-    """
-    HDBSCAN을 청크 벡터에 대해 실행하고, 파일 투표를 통해 파일의 클러스터를 확정하고 결과를 저장합니다.
-    """
-    df = pd.DataFrame(payloads)
+def fit_hdbscan(points: np.ndarray, report: Dict[str, Any]) -> np.ndarray:
+    """정규화된 포인트에 HDBSCAN을 실행하고 포인트별 클러스터 라벨을 반환합니다. (소요 시간/결과를 report에 기록)"""
     
-    # 1. 벡터 정규화
-    vectors_normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
-    
-    # 2. HDBSCAN 하이퍼파라미터 설정 (이전 실행 결과를 바탕으로 수동 설정)
+    # HDBSCAN 하이퍼파라미터 설정 (이전 실행 결과를 바탕으로 수동 설정)
     MIN_CLUSTER_SIZE = 2  # <-- 클러스터 생성을 위해 기준 완화
     MIN_SAMPLES = 1       # <-- 밀도 기준 최소화
     
+    # 포인트가 클러스터 하나를 만들 수 있는 수보다 적으면 (예: document 모드에서 짧은 문서 하나) HDBSCAN을 건너뛰고 모두 노이즈로 처리
+    if len(points) < max(MIN_CLUSTER_SIZE, MIN_SAMPLES + 1):
+        report.update({
+            "points": len(points),
+            "cluster_dim": points.shape[1],
+            "hdbscan_seconds": 0.0,
+            "clusters": 0,
+            "noise_ratio": 1.0,
+        })
+        print(f"  [HDBSCAN] 포인트 {len(points)}개 < min_cluster_size {MIN_CLUSTER_SIZE}, 클러스터링 없이 모두 노이즈로 처리합니다.", file=sys.stderr)
+        return np.full(len(points), -1, dtype=int)
+    
     print(f"\n[설정] HDBSCAN 시작. (min_cluster_size={MIN_CLUSTER_SIZE}, min_samples={MIN_SAMPLES})", file=sys.stderr)
     
-    # 3. HDBSCAN 클러스터링 실행
     clusterer = hdbscan.HDBSCAN(
         min_cluster_size=MIN_CLUSTER_SIZE, 
         min_samples=MIN_SAMPLES, 
         metric='euclidean',
     )
     
-    clusterer.fit(vectors_normalized)
-    df['cluster_label'] = clusterer.labels_
+    started = time.perf_counter()
+    clusterer.fit(points)
+    report.update({
+        "points": len(points),
+        "cluster_dim": points.shape[1],
+        "hdbscan_seconds": time.perf_counter() - started,
+        "clusters": int(len(set(clusterer.labels_)) - (1 if -1 in clusterer.labels_ else 0)),
+        "noise_ratio": float(np.mean(clusterer.labels_ == -1)),
+    })
+    print(f"  [HDBSCAN] {report['points']}개 x {report['cluster_dim']}차원, {report['hdbscan_seconds']:.1f}초, "
+          f"클러스터 {report['clusters']}개, 노이즈 {report['noise_ratio']:.0%}", file=sys.stderr)
+    return clusterer.labels_
+
+def run_file_centric_hdbscan(vectors: np.ndarray, payloads: pd.DataFrame):
+    """
+    HDBSCAN을 실행하고, 파일 투표를 통해 파일의 클러스터를 확정하고 결과를 저장합니다.
+    - chunk 모드: 청크 벡터 전체를 클러스터링하고 각 파일의 청크들이 투표
+    - document 모드: 문서별로 모은 벡터(+긴 문서의 대표 청크)를 클러스터링하고 그 포인트들이 투표 (docPooling.py)
+    """
+    df = pd.DataFrame(payloads)
+    mode = CLUSTERING_MODE.strip().lower()
+    # 저장된 차원 축소 투영은 같은 데이터(가장 최근 색인 시각 + 청크 수)에서만 재사용
+    data_version = f"{latest_indexed_at(df)}:{len(df)}"
+    
+    # 1. 클러스터링 포인트 준비 (포인트가 많으면 차원 축소 후 다시 정규화, dimReduction.py)
+    if mode == "document":
+        points, point_doc_ids, point_weights, report = pool_documents(vectors, df)
+        vote_df = pd.DataFrame({'doc_id': point_doc_ids, 'weight': point_weights})
+        points_normalized, reduction = reduce_vectors(points, tag="document", data_version=data_version)
+        if points_normalized is None:
+            points_normalized = points  # 이미 단위 벡터
+    else:
+        if mode != "chunk":
+            print(f"  [설정] 알 수 없는 CLUSTERING_MODE='{CLUSTERING_MODE}', chunk 모드로 진행합니다.", file=sys.stderr)
+        mode, points, report = "chunk", vectors, {}
+        # 중복 제거로 공유된 청크는 모든 소유 문서의 투표에 참여
+        vote_df = df[['doc_id']].copy()
+        vote_df['weight'] = 1.0
+        if 'owner_doc_ids' in df.columns:
+            vote_df['doc_id'] = [
+                owners if isinstance(owners, list) and owners else doc_id
+                for doc_id, owners in zip(df['doc_id'], df['owner_doc_ids'])
+            ]
+            vote_df = vote_df.explode('doc_id')
+        points_normalized, reduction = reduce_vectors(vectors, data_version=data_version)
+        if points_normalized is None:
+            points_normalized = normalize_rows(vectors)
+    report = {"mode": mode, **report, **reduction}
+    
+    # 2~3. HDBSCAN 클러스터링 실행
+    point_labels = fit_hdbscan(points_normalized, report)
+    vote_df['cluster_label'] = point_labels[vote_df.index.to_numpy()]
+    with open(CLUSTERING_REPORT_FILE, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
     
     # 4. 파일 투표 시스템을 통한 클러스터 소속 확정
     final_file_cluster = {} # {doc_id: cluster_id}
+    dedup_links = load_dedup_links()
     
-    for doc_id, group in df.groupby('doc_id'):
-        valid_labels = group[group['cluster_label'] != -1]['cluster_label']
+    for doc_id, group in vote_df.groupby('doc_id'):
+        valid_votes = group[group['cluster_label'] != -1]
         
-        if valid_labels.empty:
+        if valid_votes.empty:
             final_file_cluster[doc_id] = -1 
             continue
             
-        vote_counts = Counter(valid_labels)
+        vote_counts = Counter()
+        for label, weight in zip(valid_votes['cluster_label'], valid_votes['weight']):
+            vote_counts[label] += weight
         best_label = vote_counts.most_common(1)[0][0]
         final_file_cluster[doc_id] = best_label
 
+    # 동일 파일(재처리 생략)은 원본 파일과 같은 클러스터로 연결
+    link_duplicate_files(final_file_cluster, dedup_links)
+
     # 5. 클러스터 정제 및 Centroid 계산
     
     assigned_cluster_ids = sorted(list(set(final_file_cluster.values()) - {-1}))
     
+    centroids = {} # {cluster_id: centroid}
+    thresholds = {} # {cluster_id: 증분 배정 기준 유사도}
+    
+    for cluster_id in assigned_cluster_ids:
+        
+        # Centroid 계산 (해당 클러스터에 속한 모든 포인트 벡터의 평균. document 모드에서는 문서 벡터/대표 청크)
+        cluster_point_indices = np.flatnonzero(point_labels == cluster_id)
+        
+        # 정규화/축소된 벡터 대신 원본 차원 벡터를 사용해 Centroid를 계산하는 것이 더 일반적입니다. (Qdrant 검색 시 사용)
+        cluster_vectors = points[cluster_point_indices]
+        centroids[cluster_id] = np.mean(cluster_vectors, axis=0, dtype=np.float32)
+        thresholds[cluster_id] = member_threshold(cluster_vectors, centroids[cluster_id])
+
+    # 6. 최종 결과 저장 (+ 다음 실행의 증분 배정을 위한 클러스터 모델)
+    save_cluster_outputs(final_file_cluster, centroids)
+    save_model(mode, centroids, thresholds, final_file_cluster, df)
+    
+    return True
+
+def link_duplicate_files(final_file_cluster: Dict[str, int], dedup_links: Dict[str, Any]):
+    """동일 파일(재처리 생략)을 원본 파일과 같은 클러스터로 연결합니다."""
+    
+    for duplicate_doc_id, canonical_doc_id in dedup_links.get("duplicate_files", {}).items():
+        if canonical_doc_id in final_file_cluster:
+            final_file_cluster[duplicate_doc_id] = final_file_cluster[canonical_doc_id]
+
+def save_cluster_outputs(final_file_cluster: Dict[str, int], centroids: Dict[int, np.ndarray],
+                         cluster_labels: Dict[int, str] = None):
+    """
+    Centroid 벡터와 파일-클러스터 매핑(ClusterLabel.py 입력)을 저장합니다.
+    cluster_labels를 주면(증분 배정) 매핑 파일에 기록하여 라벨링 단계에서 LLM 호출 없이 재사용합니다.
+    """
+    assigned_cluster_ids = sorted(set(final_file_cluster.values()) & set(centroids))
+    
     final_mapping_data = [] # 다음 단계로 전달할 파일-클러스터 매핑
-    centroid_vectors_list = []
     cluster_id_to_index = {} # {cluster_id: index for numpy array}
     
     for index, cluster_id in enumerate(assigned_cluster_ids):
-        
-        # Centroid 계산 (해당 클러스터에 속한 모든 청크 벡터의 평균)
-        cluster_chunks_indices = df[df['cluster_label'] == cluster_id].index
-        
-        # 정규화된 벡터 대신 원본 벡터를 사용해 Centroid를 계산하는 것이 더 일반적입니다. (Qdrant 검색 시 사용)
-        cluster_vectors = vectors[cluster_chunks_indices]
-        centroid = np.mean(cluster_vectors, axis=0)
-        
-        centroid_vectors_list.append(centroid)
         cluster_id_to_index[cluster_id] = index
         
         # 해당 클러스터에 할당된 파일 목록을 final_mapping_data에 추가
@@ -156,24 +216,97 @@ def run_file_centric_hdbscan(vectors: np.ndarray, payloads: List[Dict[str, Any]]
         ]
         final_mapping_data.extend(files_in_cluster)
 
-
-    # 6. 최종 결과 저장
-    
     # (1) 클러스터 Centroid 벡터 저장
-    centroid_vectors_array = np.stack(centroid_vectors_list)
+    if assigned_cluster_ids:
+        centroid_vectors_array = np.stack([centroids[cluster_id] for cluster_id in assigned_cluster_ids])
+    else:
+        centroid_vectors_array = np.empty((0, 0), dtype=np.float32)
     np.save(CENTROID_VECTORS_FILE, centroid_vectors_array)
     print(f"\n[저장 완료] Centroid 벡터 ({len(centroid_vectors_array)}개) 저장: {CENTROID_VECTORS_FILE}")
     
     # (2) 파일-클러스터 매핑 및 메타데이터 저장
+    mapping_output = {
+        "mapping": final_mapping_data,
+        "assigned_cluster_ids": assigned_cluster_ids,
+        "cluster_id_to_index": cluster_id_to_index, # 라벨링 단계에서 Centroid 찾기 위함
+        "noise_files": [doc_id for doc_id, c_id in final_file_cluster.items() if c_id == -1]
+    }
+    if cluster_labels:
+        mapping_output["cluster_labels"] = {
+            cluster_id: cluster_labels[cluster_id] for cluster_id in assigned_cluster_ids if cluster_id in cluster_labels
+        }
     with open(FINAL_MAPPING_FILE, 'w', encoding='utf-8') as f:
-        json.dump({
-            "mapping": final_mapping_data,
-            "assigned_cluster_ids": assigned_cluster_ids,
-            "cluster_id_to_index": cluster_id_to_index, # 라벨링 단계에서 Centroid 찾기 위함
-            "noise_files": [doc_id for doc_id, c_id in final_file_cluster.items() if c_id == -1]
-        }, f, ensure_ascii=False, indent=2)
+        json.dump(mapping_output, f, ensure_ascii=False, indent=2)
     print(f"[저장 완료] 최종 파일-클러스터 매핑 저장: {FINAL_MAPPING_FILE}")
+
+# ------------------------------------------------------
+# 2-1. 증분 배정 (저장된 클러스터 모델 사용, clusterModel.py)
+# ------------------------------------------------------
+
+def run_incremental_assignment(vectors: np.ndarray, payloads: pd.DataFrame) -> bool:
+    """
+    마지막 클러스터링 이후 추가/수정된 문서만 저장된 Centroid에 배정하고 결과를 저장합니다.
+    모델이 없거나 설정이 바뀌었거나 변경/노이즈가 기준을 넘으면 False (전체 클러스터링 필요)
+    """
+    if not CLUSTERING_INCREMENTAL:
+        return False
+    model = load_model()
+    if model is None:
+        print("  [증분] 저장된 클러스터 모델이 없어 전체 클러스터링합니다.", file=sys.stderr)
+        return False
+    mode = CLUSTERING_MODE.strip().lower()
+    centroids_array = model["centroids"]
+    if model["mode"] != mode or (len(centroids_array) and centroids_array.shape[1] != vectors.shape[1]):
+        print("  [증분] 클러스터링 모드/벡터 차원이 바뀌어 전체 클러스터링합니다.", file=sys.stderr)
+        return False
+    
+    df = pd.DataFrame(payloads)
+    dedup_links = load_dedup_links()
+    duplicate_doc_ids = dedup_links.get("duplicate_files", {})
+    present = set(df['doc_id'])
+    if 'owner_doc_ids' in df.columns:
+        present.update(owner for owners in df['owner_doc_ids'] if isinstance(owners, list) for owner in owners)
+    
+    changed = changed_documents(df, model)
+    removed = {doc_id for doc_id in model["assignments"] if doc_id not in present and doc_id not in duplicate_doc_ids}
+    drift = (model["changed_documents"] + len(changed) + len(removed)) / max(1, model["fitted_documents"])
+    if drift > CLUSTER_INCREMENTAL_MAX_RATIO:
+        print(f"  [증분] 마지막 전체 클러스터링 이후 변경 문서 비율 {drift:.0%} > {CLUSTER_INCREMENTAL_MAX_RATIO:.0%}, "
+              f"전체 클러스터링합니다.", file=sys.stderr)
+        return False
+    
+    started = time.perf_counter()
+    final_file_cluster = {
+        doc_id: cluster_id for doc_id, cluster_id in model["assignments"].items()
+        if doc_id in present and doc_id not in changed
+    }
+    if changed:
+        final_file_cluster.update(assign_documents(vectors, df, model, changed))
+    link_duplicate_files(final_file_cluster, dedup_links)
+    
+    noise = noise_ratio(final_file_cluster)
+    if noise - model["fitted_noise_ratio"] > CLUSTER_INCREMENTAL_MAX_NOISE_RISE:
+        print(f"  [증분] 노이즈 문서 비율 {model['fitted_noise_ratio']:.0%} -> {noise:.0%}, 전체 클러스터링합니다.", file=sys.stderr)
+        return False
+    
+    report = {
+        "mode": "incremental",
+        "changed_documents": len(changed),
+        "removed_documents": len(removed),
+        "drift": drift,
+        "assign_seconds": time.perf_counter() - started,
+        "documents": len(final_file_cluster),
+        "clusters": len(model["cluster_ids"]),
+        "noise_ratio": noise,
+    }
+    print(f"  [증분] 변경 문서 {len(changed)}개 배정, 삭제 문서 {len(removed)}개 제외 "
+          f"({report['assign_seconds']:.1f}초, 누적 변경 {drift:.0%}, 노이즈 {noise:.0%})", file=sys.stderr)
+    with open(CLUSTERING_REPORT_FILE, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
     
+    centroids = {cluster_id: centroids_array[index] for index, cluster_id in enumerate(model["cluster_ids"])}
+    save_cluster_outputs(final_file_cluster, centroids, {int(k): v for k, v in model["labels"].items()})
+    update_assignments(model, final_file_cluster, len(changed) + len(removed), df)
     return True
 
 # ------------------------------------------------------
@@ -181,25 +314,25 @@ def run_file_centric_hdbscan(vectors: np.ndarray, payloads: List[Dict[str, Any]]
 # ------------------------------------------------------
 
 def cleanup_cache():
-    """HDBSCAN 완료 후 임시 캐시 파일을 삭제합니다."""
+    """HDBSCAN 완료 후 벡터 스냅샷을 삭제합니다. (SNAPSHOT_KEEP=1이면 다음 실행의 증분 갱신을 위해 유지)"""
     
-    if os.path.exists(VECTORS_FILE):
-        os.remove(VECTORS_FILE)
-        print(f"\n[삭제 완료] 캐시 벡터 파일 삭제: {VECTORS_FILE}")
-    if os.path.exists(PAYLOADS_FILE):
-        os.remove(PAYLOADS_FILE)
-        print(f"[삭제 완료] 캐시 페이로드 파일 삭제: {PAYLOADS_FILE}")
+    if SNAPSHOT_KEEP:
+        print(f"\n[정보] 벡터 스냅샷을 다음 실행을 위해 유지합니다.")
+        return
+    remove_snapshot()
 
 if __name__ == "__main__":
     
-    # NOTE: vectorPull.py가 먼저 실행되어 캐시 파일을 생성했다고 가정합니다.
-    # Clustering.py의 fetch 함수는 파일이 있으면 로드합니다.
+    # NOTE: vectorPull.py가 먼저 실행되어 스냅샷을 맞췄다고 가정합니다.
+    # Clustering.py의 fetch 함수는 스냅샷이 최신이면 그대로 로드합니다.
     if fetch_all_vectors_from_qdrant():
         vectors, payloads = load_data_for_clustering()
         
         if vectors is not None and len(vectors) > 0:
-            print(f"\n--- [HDBSCAN 파일 중심 클러스터링 실행] ---")
-            run_file_centric_hdbscan(vectors, payloads)
+            # 저장된 클러스터 모델로 바뀐 문서만 배정할 수 있으면 HDBSCAN/라벨링을 다시 하지 않음
+            if not run_incremental_assignment(vectors, payloads):
+                print(f"\n--- [HDBSCAN 파일 중심 클러스터링 실행 ({CLUSTERING_MODE})] ---")
+                run_file_centric_hdbscan(vectors, payloads)
             
             # --- [요청하신 캐시 파일 삭제] ---
             cleanup_cache()
@@ -0,0 +1,187 @@
+"""
+클러스터 모델 저장 / 새 문서 증분 배정 (CLUSTERING_INCREMENTAL=1).
+
+전체 클러스터링(HDBSCAN)이 끝나면 클러스터 Centroid, 클러스터별 배정 기준 유사도, 문서-클러스터 배정, 라벨(ClusterLabel.py)을
+CACHE_DIR/cluster_model/<컬렉션>에 저장합니다. 다음 실행에서는 마지막 클러스터링 이후 추가/수정된 문서
+(payload의 indexed_at > indexed_until 이거나 배정 기록이 없는 doc_id)만 문서 벡터로 모아 가장 가까운 Centroid에 배정하고,
+기존 클러스터 라벨을 그대로 사용하므로 HDBSCAN/LLM 라벨링을 다시 하지 않습니다.
+
+- 문서의 포인트(모은 벡터 + 긴 문서의 대표 청크, docPooling.py)가 가장 가까운 Centroid와의 코사인 유사도가
+  그 클러스터의 배정 기준(구성 포인트 유사도의 하위 ASSIGN_SIMILARITY_PERCENTILE 백분위)보다 낮으면 노이즈 표로 셉니다.
+- 마지막 전체 클러스터링 이후 바뀐 문서가 그때 문서 수의 CLUSTER_INCREMENTAL_MAX_RATIO를 넘거나,
+  노이즈 문서 비율이 전체 클러스터링 당시보다 CLUSTER_INCREMENTAL_MAX_NOISE_RISE 이상 늘면 전체 다시 클러스터링합니다.
+"""
+
+import json
+import os
+import sys
+import time
+from collections import Counter
+from typing import Dict, Iterable, Optional, Set
+
+import numpy as np
+import pandas as pd
+
+from core.config import CACHE_DIR, COLLECTION_NAME
+from dimReduction import unit_rows
+from docPooling import document_rows, pool_documents
+
+MODEL_FORMAT_VERSION = 1
+MODEL_DIR = os.path.join(CACHE_DIR, "cluster_model")
+ASSIGN_SIMILARITY_PERCENTILE = 5  # 클러스터 구성 포인트 중 이 백분위 유사도를 배정 기준으로 사용
+INDEXED_AT_FIELD = "indexed_at"
+
+
+# -----------------------------
+# 1. 저장 / 로드
+# -----------------------------
+
+def model_paths(collection_name: str = COLLECTION_NAME):
+    """(Centroid 파일, 모델 정보 파일) 경로"""
+    directory = os.path.join(MODEL_DIR, collection_name)
+    return os.path.join(directory, "centroids.npy"), os.path.join(directory, "model.json")
+
+
+def load_model(collection_name: str = COLLECTION_NAME) -> Optional[dict]:
+    """저장된 클러스터 모델을 반환합니다. 없거나 형식이 다르면 None ("centroids" 키에 Centroid 배열)"""
+    centroids_path, model_path = model_paths(collection_name)
+    try:
+        with open(model_path, "r", encoding="utf-8") as f:
+            model = json.load(f)
+        centroids = np.load(centroids_path)
+    except (OSError, ValueError):
+        return None
+    if model.get("format_version") != MODEL_FORMAT_VERSION or model.get("collection") != collection_name:
+        return None
+    if len(centroids) != len(model.get("cluster_ids", [])):
+        return None
+    model["centroids"] = centroids
+    return model
+
+
+def _write_model(model: dict, collection_name: str = COLLECTION_NAME):
+    _, model_path = model_paths(collection_name)
+    info = {key: value for key, value in model.items() if key != "centroids"}
+    with open(model_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(info, f, ensure_ascii=False)
+    os.replace(model_path + ".tmp", model_path)
+
+
+def save_model(mode: str, centroids: Dict[int, np.ndarray], thresholds: Dict[int, float],
+               assignments: Dict[str, int], payloads: pd.DataFrame, collection_name: str = COLLECTION_NAME):
+    """전체 클러스터링 결과를 저장합니다. (라벨은 ClusterLabel.py가 save_labels로 채움)"""
+    centroids_path, _ = model_paths(collection_name)
+    cluster_ids = sorted(centroids)
+    try:
+        os.makedirs(os.path.dirname(centroids_path), exist_ok=True)
+        if cluster_ids:
+            np.save(centroids_path, np.stack([centroids[cluster_id] for cluster_id in cluster_ids]).astype(np.float32))
+        else:
+            np.save(centroids_path, np.empty((0, 0), dtype=np.float32))
+        _write_model({
+            "format_version": MODEL_FORMAT_VERSION,
+            "collection": collection_name,
+            "mode": mode,
+            "cluster_ids": [int(cluster_id) for cluster_id in cluster_ids],
+            "thresholds": [float(thresholds[cluster_id]) for cluster_id in cluster_ids],
+            "assignments": {doc_id: int(cluster_id) for doc_id, cluster_id in assignments.items()},
+            "labels": {},
+            "indexed_until": latest_indexed_at(payloads),
+            "fitted_documents": len(assignments),
+            "fitted_noise_ratio": noise_ratio(assignments),
+            "changed_documents": 0,
+            "fitted_at": time.time(),
+        }, collection_name)
+    except OSError as e:
+        print(f"  [클러스터 모델] 저장 실패 (다음 실행은 전체 클러스터링): {e}", file=sys.stderr)
+
+
+def save_labels(labels: Dict[int, str], collection_name: str = COLLECTION_NAME):
+    """클러스터 라벨을 모델에 기록합니다. (다음 증분 실행에서 LLM 라벨링 없이 재사용)"""
+    model = load_model(collection_name)
+    if model is None:
+        return
+    model["labels"].update({str(cluster_id): label for cluster_id, label in labels.items()
+                            if not label.startswith("LLM_ERROR_")})
+    try:
+        _write_model(model, collection_name)
+    except OSError as e:
+        print(f"  [클러스터 모델] 라벨 저장 실패: {e}", file=sys.stderr)
+
+
+def update_assignments(model: dict, assignments: Dict[str, int], changed: int, payloads: pd.DataFrame,
+                       collection_name: str = COLLECTION_NAME):
+    """증분 배정 결과를 모델에 반영합니다. (Centroid/라벨은 다음 전체 클러스터링까지 유지)"""
+    model["assignments"] = {doc_id: int(cluster_id) for doc_id, cluster_id in assignments.items()}
+    model["changed_documents"] += changed
+    model["indexed_until"] = max(model["indexed_until"], latest_indexed_at(payloads))
+    try:
+        _write_model(model, collection_name)
+    except OSError as e:
+        print(f"  [클러스터 모델] 배정 저장 실패: {e}", file=sys.stderr)
+
+
+# -----------------------------
+# 2. 배정 기준 / 변경 문서
+# -----------------------------
+
+def member_threshold(member_vectors: np.ndarray, centroid: np.ndarray) -> float:
+    """클러스터 구성 포인트와 Centroid의 코사인 유사도 중 하위 ASSIGN_SIMILARITY_PERCENTILE 백분위"""
+    similarity = unit_rows(member_vectors) @ unit_rows(centroid[None, :])[0]
+    return float(np.percentile(similarity, ASSIGN_SIMILARITY_PERCENTILE))
+
+
+def noise_ratio(assignments: Dict[str, int]) -> float:
+    return float(np.mean([cluster_id == -1 for cluster_id in assignments.values()])) if assignments else 0.0
+
+
+def latest_indexed_at(payloads: pd.DataFrame) -> float:
+    if INDEXED_AT_FIELD not in payloads.columns or payloads.empty:
+        return 0.0
+    latest = pd.to_numeric(payloads[INDEXED_AT_FIELD], errors="coerce").max()
+    return 0.0 if pd.isna(latest) else float(latest)
+
+
+def changed_documents(payloads: pd.DataFrame, model: dict) -> Set[str]:
+    """마지막 배정 이후 추가되었거나(배정 기록 없음) 청크가 다시 색인된 문서"""
+    rows = document_rows(payloads)
+    changed = {doc_id for doc_id in rows if doc_id not in model["assignments"]}
+    if INDEXED_AT_FIELD in payloads.columns:
+        indexed_at = pd.to_numeric(payloads[INDEXED_AT_FIELD], errors="coerce").fillna(0.0).to_numpy()
+        fresh_rows = indexed_at > model["indexed_until"]
+        if fresh_rows.any():
+            changed.update(doc_id for doc_id, doc_rows in rows.items() if fresh_rows[doc_rows].any())
+    return changed
+
+
+# -----------------------------
+# 3. 새 문서 배정
+# -----------------------------
+
+def assign_documents(vectors: np.ndarray, payloads: pd.DataFrame, model: dict,
+                     doc_ids: Iterable[str]) -> Dict[str, int]:
+    """doc_ids 문서들을 가장 가까운 Centroid의 클러스터에 배정합니다. (기준 유사도 미달이면 -1)"""
+    targets = set(doc_ids)
+    rows = sorted({row for doc_id, doc_rows in document_rows(payloads).items() if doc_id in targets for row in doc_rows})
+    if not rows or len(model["centroids"]) == 0:
+        return {doc_id: -1 for doc_id in targets}
+
+    subset = payloads.iloc[rows].reset_index(drop=True)
+    if "owner_doc_ids" in subset.columns:
+        # 공유 청크는 이번에 배정하는 문서의 표로만 사용
+        subset["owner_doc_ids"] = [
+            [owner for owner in owners if owner in targets] if isinstance(owners, list) and owners else owners
+            for owners in subset["owner_doc_ids"]
+        ]
+    points, point_doc_ids, point_weights, _ = pool_documents(vectors[np.asarray(rows)], subset)
+
+    similarity = points @ unit_rows(model["centroids"]).T
+    nearest = np.argmax(similarity, axis=1)
+    thresholds = np.asarray(model["thresholds"])
+    cluster_ids = np.asarray(model["cluster_ids"])
+
+    votes = {doc_id: Counter() for doc_id in targets}
+    for doc_id, weight, index, best in zip(point_doc_ids, point_weights, nearest, similarity.max(axis=1)):
+        if doc_id in votes and best >= thresholds[index]:
+            votes[doc_id][int(cluster_ids[index])] += weight
+    return {doc_id: (counts.most_common(1)[0][0] if counts else -1) for doc_id, counts in votes.items()}
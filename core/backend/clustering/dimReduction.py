@@ -0,0 +1,200 @@
+"""
+HDBSCAN 전 차원 축소.
+
+4096차원 벡터에서는 HDBSCAN의 트리 기반 이웃 탐색이 사실상 전수 비교가 되어 청크 수의 제곱에 가깝게 느려집니다.
+포인트가 CLUSTER_REDUCTION_MIN_POINTS개 이상이면 CLUSTER_REDUCTION 방식으로 CLUSTER_REDUCTION_DIM차원까지 줄인 뒤
+행을 다시 단위 길이로 맞춰 HDBSCAN에 넘깁니다. (euclidean 거리가 코사인 거리와 같은 순서를 유지)
+
+- pca: 중심화 후 randomized PCA / svd: 중심화 없는 randomized TruncatedSVD / umap: umap-learn 설치 시 (없으면 pca)
+- 투영은 최대 FIT_SAMPLE_ROWS개 표본으로 학습하고 CACHE_DIR/cluster_projection에 데이터 버전(스냅샷 indexed_until + 포인트 수)과
+  함께 저장하여, 같은 데이터를 다시 클러스터링할 때만 재사용합니다. (버전을 모르면 포인트 수가 REFIT_GROWTH_RATIO 이상 달라질 때 다시 학습)
+- 품질: 표본 포인트의 최근접 이웃이 축소 전후에 얼마나 유지되는지(neighbor_overlap), PCA/SVD는 설명 분산 비율도 기록합니다.
+  재사용한 투영의 이웃 보존율이 학습 당시보다 REFIT_OVERLAP_DROP 이상 낮으면 다시 학습합니다.
+"""
+
+import os
+import pickle
+import sys
+import time
+
+import numpy as np
+
+from core.config import CACHE_DIR, COLLECTION_NAME, CLUSTER_REDUCTION, CLUSTER_REDUCTION_DIM, CLUSTER_REDUCTION_MIN_POINTS
+
+PROJECTION_DIR = os.path.join(CACHE_DIR, "cluster_projection")
+FIT_SAMPLE_ROWS = 20000       # 투영 학습에 사용할 최대 표본 수
+REFIT_GROWTH_RATIO = 0.2      # 데이터 버전을 모를 때: 학습 당시보다 포인트 수가 이 비율 이상 달라지면 다시 학습
+REFIT_OVERLAP_DROP = 0.1      # 재사용한 투영의 이웃 보존율이 학습 당시보다 이만큼 낮아지면 다시 학습
+TRANSFORM_BLOCK_ROWS = 50000  # memmap 벡터를 이 행 수씩 정규화/투영
+QUALITY_SAMPLE_ROWS = 2000    # 이웃 보존율 계산 표본 수
+QUALITY_NEIGHBORS = 10        # 이웃 보존율 계산에 쓰는 최근접 이웃 수
+RANDOM_SEED = 42
+
+REDUCTION_METHODS = ("pca", "svd", "umap")
+
+
+def unit_rows(block: np.ndarray) -> np.ndarray:
+    """행 벡터를 단위 길이로 정규화한 float32 배열 (길이 0인 행은 그대로)"""
+    block = np.asarray(block, dtype=np.float32)
+    norms = np.linalg.norm(block, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return block / norms
+
+
+def resolve_method(n_points: int, input_dim: int):
+    """이번 실행에서 사용할 축소 방식. 축소하지 않으면 None"""
+    method = CLUSTER_REDUCTION.strip().lower()
+    if method in ("", "0", "none"):
+        return None
+    if method not in REDUCTION_METHODS:
+        print(f"  [축소] 알 수 없는 CLUSTER_REDUCTION='{CLUSTER_REDUCTION}', 차원 축소 없이 진행합니다.", file=sys.stderr)
+        return None
+    if n_points < CLUSTER_REDUCTION_MIN_POINTS or input_dim <= CLUSTER_REDUCTION_DIM:
+        return None
+    if method == "umap":
+        try:
+            import umap  # noqa: F401
+        except ImportError:
+            print("  [축소] umap-learn이 설치되어 있지 않아 pca를 사용합니다.", file=sys.stderr)
+            method = "pca"
+    return method
+
+
+def _make_reducer(method: str, n_components: int):
+    if method == "umap":
+        import umap
+        return umap.UMAP(n_components=n_components, metric="cosine", random_state=RANDOM_SEED)
+    if method == "svd":
+        from sklearn.decomposition import TruncatedSVD
+        return TruncatedSVD(n_components=n_components, algorithm="randomized", random_state=RANDOM_SEED)
+    from sklearn.decomposition import PCA
+    return PCA(n_components=n_components, svd_solver="randomized", random_state=RANDOM_SEED)
+
+
+def _projection_path(method: str, input_dim: int, n_components: int, tag: str) -> str:
+    return os.path.join(PROJECTION_DIR, f"{COLLECTION_NAME}_{tag}_{method}_{input_dim}to{n_components}.pkl")
+
+
+def load_projection(path: str, n_points: int, data_version=None):
+    """저장된 투영이 이번 데이터에 쓸 수 있으면 저장 내용(dict)을, 아니면 None을 반환합니다."""
+    try:
+        with open(path, "rb") as f:
+            cached = pickle.load(f)
+        fitted_points = cached["fitted_points"]
+        if data_version is not None:
+            if cached.get("data_version") != data_version:
+                print(f"  [축소] 학습 이후 데이터가 바뀌어 투영을 다시 학습합니다.", file=sys.stderr)
+                return None
+        elif abs(n_points - fitted_points) > fitted_points * REFIT_GROWTH_RATIO:
+            return None
+        return cached
+    except FileNotFoundError:
+        pass
+    except (OSError, pickle.UnpicklingError, KeyError, AttributeError, EOFError) as e:
+        print(f"  [축소] 저장된 투영 로드 실패, 다시 학습합니다: {e}", file=sys.stderr)
+    return None
+
+
+def fit_projection(vectors: np.ndarray, method: str, n_components: int = CLUSTER_REDUCTION_DIM):
+    """최대 FIT_SAMPLE_ROWS개 표본으로 투영을 학습합니다. (투영 객체, 학습 시간) 반환"""
+    n_points = len(vectors)
+    started = time.perf_counter()
+    rng = np.random.default_rng(RANDOM_SEED)
+    sample_index = np.sort(rng.choice(n_points, size=min(n_points, FIT_SAMPLE_ROWS), replace=False))
+    reducer = _make_reducer(method, n_components)
+    reducer.fit(unit_rows(vectors[sample_index]))
+    fit_seconds = time.perf_counter() - started
+    print(f"  [축소] {method} 투영 학습 완료 (표본 {len(sample_index)}개, {fit_seconds:.1f}초)", file=sys.stderr)
+    return reducer, fit_seconds
+
+
+def save_projection(path: str, reducer, n_points: int, data_version, overlap: float):
+    try:
+        os.makedirs(PROJECTION_DIR, exist_ok=True)
+        with open(path + ".tmp", "wb") as f:
+            pickle.dump({"reducer": reducer, "fitted_points": n_points, "data_version": data_version,
+                         "neighbor_overlap": overlap}, f)
+        os.replace(path + ".tmp", path)
+    except OSError as e:
+        print(f"  [축소] 투영 저장 실패: {e}", file=sys.stderr)
+
+
+def transform_vectors(vectors: np.ndarray, reducer, n_components: int = CLUSTER_REDUCTION_DIM) -> np.ndarray:
+    """원본(memmap)을 TRANSFORM_BLOCK_ROWS행씩 정규화/투영하고 다시 단위 길이로 맞춥니다."""
+    reduced = np.empty((len(vectors), n_components), dtype=np.float32)
+    for start in range(0, len(vectors), TRANSFORM_BLOCK_ROWS):
+        block = unit_rows(vectors[start:start + TRANSFORM_BLOCK_ROWS])
+        reduced[start:start + TRANSFORM_BLOCK_ROWS] = unit_rows(reducer.transform(block))
+    return reduced
+
+
+def neighbor_overlap(vectors: np.ndarray, reduced: np.ndarray, sample_rows: int = QUALITY_SAMPLE_ROWS,
+                     k: int = QUALITY_NEIGHBORS) -> float:
+    """표본 포인트들 사이에서 구한 최근접 이웃 k개가 축소 전후에 겹치는 비율 (1.0이면 이웃 관계 완전 유지)"""
+    n_points = len(vectors)
+    if n_points <= k + 1:
+        return 1.0
+    rng = np.random.default_rng(RANDOM_SEED + 1)
+    sample_index = np.sort(rng.choice(n_points, size=min(n_points, sample_rows), replace=False))
+
+    def top_neighbors(points: np.ndarray) -> np.ndarray:
+        similarity = points @ points.T
+        np.fill_diagonal(similarity, -np.inf)
+        return np.argpartition(-similarity, k, axis=1)[:, :k]
+
+    before = top_neighbors(unit_rows(vectors[sample_index]))
+    after = top_neighbors(unit_rows(reduced[sample_index]))
+    overlaps = [len(set(b) & set(a)) / k for b, a in zip(before, after)]
+    return float(np.mean(overlaps))
+
+
+def reduce_vectors(vectors: np.ndarray, tag: str = "chunk", data_version=None):
+    """
+    축소 대상이면 (정규화된 축소 벡터, 정보 dict)를, 아니면 (None, 정보 dict)를 반환합니다.
+    원본(memmap)은 TRANSFORM_BLOCK_ROWS행씩 정규화/투영하므로 원본 차원의 float32 전체 복사본을 만들지 않습니다.
+    data_version은 입력 데이터의 버전(예: 스냅샷 indexed_until과 포인트 수)으로, 저장된 투영과 다르면 다시 학습합니다.
+    투영은 tag별(청크/문서 포인트)로 따로 저장합니다.
+    """
+    n_points, input_dim = vectors.shape
+    method = resolve_method(n_points, input_dim)
+    if method is None:
+        return None, {"method": "none", "input_dim": input_dim}
+
+    n_components = CLUSTER_REDUCTION_DIM
+    path = _projection_path(method, input_dim, n_components, tag)
+    cached = load_projection(path, n_points, data_version)
+    info = {"method": method, "input_dim": input_dim, "output_dim": n_components, "projection_cached": cached is not None}
+
+    if cached is not None:
+        print(f"  [축소] 저장된 {method} 투영 재사용 (학습 당시 {cached['fitted_points']}개)", file=sys.stderr)
+        started = time.perf_counter()
+        reduced = transform_vectors(vectors, cached["reducer"], n_components)
+        overlap = neighbor_overlap(vectors, reduced)
+        fitted_overlap = cached.get("neighbor_overlap")
+        if fitted_overlap is not None and overlap < fitted_overlap - REFIT_OVERLAP_DROP:
+            print(f"  [축소] 이웃 보존율이 {fitted_overlap:.0%} -> {overlap:.0%}로 낮아져 투영을 다시 학습합니다.", file=sys.stderr)
+            cached = None
+            info.update({"projection_cached": False, "stale_neighbor_overlap": overlap})
+        else:
+            reducer = cached["reducer"]
+            info.update({"fit_seconds": 0.0, "fitted_points": cached["fitted_points"],
+                         "transform_seconds": time.perf_counter() - started})
+
+    if cached is None:
+        reducer, fit_seconds = fit_projection(vectors, method, n_components)
+        started = time.perf_counter()
+        reduced = transform_vectors(vectors, reducer, n_components)
+        transform_seconds = time.perf_counter() - started
+        overlap = neighbor_overlap(vectors, reduced)
+        save_projection(path, reducer, n_points, data_version, overlap)
+        info.update({"fit_seconds": fit_seconds, "fitted_points": n_points, "transform_seconds": transform_seconds})
+
+    info["neighbor_overlap"] = overlap
+    if hasattr(reducer, "explained_variance_ratio_"):
+        info["explained_variance"] = float(np.sum(reducer.explained_variance_ratio_))
+    print(
+        f"  [축소] {method}: {input_dim} -> {n_components}차원, 이웃 보존율 {info['neighbor_overlap']:.0%}"
+        + (f", 설명 분산 {info['explained_variance']:.0%}" if "explained_variance" in info else ""),
+        file=sys.stderr,
+    )
+    return reduced, info
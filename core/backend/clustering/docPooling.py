@@ -0,0 +1,113 @@
+"""
+문서 단위 클러스터링 입력 (CLUSTERING_MODE=document).
+
+청크 전체를 클러스터링하고 파일 투표로 문서의 클러스터를 정하면, 포인트 수가 문서 수의 수십~수백 배가 됩니다.
+document 모드에서는 문서마다 청크 벡터를 하나로 모은 벡터(DOC_POOLING)를 만들고,
+청크가 DOC_MEDOID_MIN_CHUNKS개 이상인 긴 문서는 주제별 대표(medoid) 청크를 최대 DOC_MEDOID_CHUNKS개 더 남겨
+문서 수에 비례하는 포인트만 클러스터링합니다.
+
+- mean: 단위 벡터로 맞춘 청크 벡터의 평균
+- attention: 평균 방향과 가까운 청크에 더 큰 가중치(softmax)를 주어, 목차/부록처럼 주제에서 벗어난 청크의 영향을 줄임
+- 중복 제거로 공유된 청크(owner_doc_ids)는 모든 소유 문서에 포함됩니다.
+"""
+
+import sys
+from collections import defaultdict
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from core.config import DOC_POOLING, DOC_MEDOID_CHUNKS, DOC_MEDOID_MIN_CHUNKS
+from dimReduction import unit_rows
+
+ATTENTION_TEMPERATURE = 0.1   # attention 가중치 softmax 온도 (작을수록 평균 방향에 가까운 청크에 집중)
+MEDOID_ITERATIONS = 5         # 대표 청크를 고르는 구면 k-means 반복 횟수
+POOLED_VOTE_WEIGHT = 2.0      # 문서 투표에서 모은 벡터 포인트의 가중치 (대표 청크 포인트는 1.0)
+
+
+def document_rows(payloads: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """{doc_id: 스냅샷 행 번호 배열}. 공유 청크는 owner_doc_ids의 모든 문서에 포함"""
+    rows = defaultdict(list)
+    owners_column = payloads['owner_doc_ids'] if 'owner_doc_ids' in payloads.columns else [None] * len(payloads)
+    for row, (doc_id, owners) in enumerate(zip(payloads['doc_id'], owners_column)):
+        for owner in (owners if isinstance(owners, list) and owners else [doc_id]):
+            rows[owner].append(row)
+    return {doc_id: np.asarray(indices) for doc_id, indices in rows.items()}
+
+
+def pool_chunks(chunks: np.ndarray, method: str = DOC_POOLING) -> np.ndarray:
+    """단위 길이 청크 벡터들을 하나의 단위 벡터로 모읍니다."""
+    pooled = chunks.mean(axis=0)
+    if method == "attention" and len(chunks) > 1:
+        scores = chunks @ unit_rows(pooled[None, :])[0] / ATTENTION_TEMPERATURE
+        weights = np.exp(scores - scores.max())
+        pooled = (weights / weights.sum()) @ chunks
+    return unit_rows(pooled[None, :])[0]
+
+
+def medoid_chunks(chunks: np.ndarray, pooled: np.ndarray, k: int) -> List[int]:
+    """청크를 k개 주제 묶음으로 나눈 뒤(구면 k-means) 각 묶음 중심에 가장 가까운 청크의 위치를 반환합니다."""
+    # 초기 중심: 모은 벡터와 가장 가까운 청크, 이후 기존 중심들과 가장 먼 청크를 차례로 추가
+    centers = [int(np.argmax(chunks @ pooled))]
+    closest = chunks @ chunks[centers[0]]
+    while len(centers) < k:
+        candidate = int(np.argmin(closest))
+        if candidate in centers:
+            break
+        centers.append(candidate)
+        closest = np.maximum(closest, chunks @ chunks[candidate])
+    center_vectors = chunks[centers]
+
+    for _ in range(MEDOID_ITERATIONS):
+        assignment = np.argmax(chunks @ center_vectors.T, axis=1)
+        for index in range(len(center_vectors)):
+            members = chunks[assignment == index]
+            if len(members):
+                center_vectors[index] = unit_rows(members.mean(axis=0)[None, :])[0]
+
+    similarity = chunks @ center_vectors.T
+    assignment = np.argmax(similarity, axis=1)
+    medoids = []
+    for index in range(len(center_vectors)):
+        member_rows = np.flatnonzero(assignment == index)
+        if len(member_rows):
+            medoids.append(int(member_rows[np.argmax(similarity[member_rows, index])]))
+    return sorted(set(medoids))
+
+
+def pool_documents(vectors: np.ndarray, payloads: pd.DataFrame):
+    """
+    문서 단위 클러스터링 포인트를 만듭니다.
+    (포인트 벡터 [n_points, dim] float32 단위 벡터, 포인트별 doc_id 목록, 포인트별 투표 가중치, 정보 dict) 반환
+    """
+    method = DOC_POOLING.strip().lower()
+    if method not in ("mean", "attention"):
+        print(f"  [문서 벡터] 알 수 없는 DOC_POOLING='{DOC_POOLING}', mean을 사용합니다.", file=sys.stderr)
+        method = "mean"
+
+    points, point_doc_ids, point_weights = [], [], []
+    long_documents = 0
+    for doc_id, rows in document_rows(payloads).items():
+        chunks = unit_rows(vectors[np.sort(rows)])
+        pooled = pool_chunks(chunks, method)
+        points.append(pooled)
+        point_doc_ids.append(doc_id)
+        point_weights.append(POOLED_VOTE_WEIGHT)
+
+        if DOC_MEDOID_CHUNKS > 0 and len(chunks) >= DOC_MEDOID_MIN_CHUNKS:
+            long_documents += 1
+            for position in medoid_chunks(chunks, pooled, DOC_MEDOID_CHUNKS):
+                points.append(chunks[position])
+                point_doc_ids.append(doc_id)
+                point_weights.append(1.0)
+
+    info = {
+        "pooling": method,
+        "documents": len(set(point_doc_ids)),
+        "long_documents": long_documents,
+        "chunks": len(vectors),
+    }
+    print(f"  [문서 벡터] 청크 {info['chunks']}개 -> 문서 {info['documents']}개 ({method}), "
+          f"대표 청크를 남긴 긴 문서 {long_documents}개, 클러스터링 포인트 {len(points)}개", file=sys.stderr)
+    return np.stack(points).astype(np.float32), point_doc_ids, np.asarray(point_weights), info
@@ -0,0 +1,442 @@
+"""
+Qdrant 벡터 스냅샷 (클러스터링 입력).
+
+컬렉션 전체 벡터/페이로드를 로컬(CACHE_DIR/vector_snapshot/<컬렉션>)에 저장해 두고, 실행할 때마다 컬렉션과 비교해
+바뀐 것이 없으면 그대로, 바뀐 포인트가 적으면 그 포인트만 가져와 갱신하고, 그 밖의 경우에만 전체를 다시 받습니다.
+
+- 벡터: (포인트 수, 차원) .npy, np.load(mmap_mode='r')로 지연 로드 (SNAPSHOT_VECTOR_DTYPE = float32/float16)
+- 페이로드: 열 단위 JSON {"count": N, "columns": {키: [값 N개]}}
+- manifest: 형식 버전, 컬렉션, dtype, payload 키, 포인트 수, 스냅샷에 반영된 가장 최근 색인 시각(indexed_until), 동기화 시각
+
+갱신 판단은 runEmbed.py가 포인트마다 기록하는 indexed_at(색인 시각, payload)으로 합니다.
+- indexed_at > indexed_until 인 포인트가 없고 포인트 수가 같으면 최신
+- 바뀐 포인트가 전체의 SNAPSHOT_INCREMENTAL_MAX_RATIO 이하이면 해당 포인트만 scroll하여 덮어쓰기/추가
+- 포인트가 삭제되었거나(수가 맞지 않음) 형식/컬렉션/dtype/payload 키가 다르면 전체 다시 받기
+
+가져올 때는 클러스터링에 필요한 payload 키(SNAPSHOT_PAYLOAD_FIELDS)만 요청하고(본문/요약 제외),
+정수 ID를 SNAPSHOT_SCROLL_WORKERS개 구간으로 나눠 동시에 scroll합니다. (SNAPSHOT_PREFER_GRPC=1이면 gRPC)
+"""
+
+import io
+import json
+import math
+import os
+import queue
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from qdrant_client import QdrantClient, models
+
+from core.config import (
+    QDRANT_URL, COLLECTION_NAME, QDRANT_API_KEY, CACHE_DIR, SNAPSHOT_VECTOR_DTYPE, SNAPSHOT_INCREMENTAL_MAX_RATIO,
+    SNAPSHOT_SCROLL_WORKERS, SNAPSHOT_PREFER_GRPC, QDRANT_GRPC_PORT
+)
+
+SNAPSHOT_FORMAT_VERSION = 2
+SNAPSHOT_DIR = os.path.join(CACHE_DIR, "vector_snapshot")
+INDEXED_AT_FIELD = "indexed_at"  # runEmbed.py / dedup.py가 기록하는 색인(수정) 시각
+SCROLL_LIMIT = 1000              # scroll 요청 한 번에 가져올 포인트 수
+# 클러스터링에 필요한 payload 키 (text_for_embedding/summary 등 큰 값은 가져오지 않음)
+SNAPSHOT_PAYLOAD_FIELDS = ["doc_id", "owner_doc_ids", INDEXED_AT_FIELD]
+
+
+# -----------------------------
+# 1. 경로 / manifest
+# -----------------------------
+
+def snapshot_paths(collection_name: str = COLLECTION_NAME):
+    """(벡터 파일, 페이로드 파일, manifest 파일) 경로"""
+    directory = os.path.join(SNAPSHOT_DIR, collection_name)
+    return (
+        os.path.join(directory, "vectors.npy"),
+        os.path.join(directory, "payloads.json"),
+        os.path.join(directory, "manifest.json"),
+    )
+
+
+def load_manifest(collection_name: str = COLLECTION_NAME):
+    """manifest를 반환합니다. 없거나 형식이 다르거나 파일이 빠졌으면 None"""
+    vectors_path, payloads_path, manifest_path = snapshot_paths(collection_name)
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("format_version") != SNAPSHOT_FORMAT_VERSION or manifest.get("collection") != collection_name:
+        return None
+    if manifest.get("payload_fields") != SNAPSHOT_PAYLOAD_FIELDS:
+        return None
+    if not (os.path.exists(vectors_path) and os.path.exists(payloads_path)):
+        return None
+    return manifest
+
+
+def _save_manifest(collection_name: str, count: int, dim: int, dtype: str, indexed_until: float):
+    manifest = {
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "collection": collection_name,
+        "count": count,
+        "dim": dim,
+        "dtype": dtype,
+        "payload_fields": SNAPSHOT_PAYLOAD_FIELDS,
+        "indexed_until": indexed_until,
+        "synced_at": time.time(),
+    }
+    manifest_path = snapshot_paths(collection_name)[2]
+    with open(manifest_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(manifest_path + ".tmp", manifest_path)
+    return manifest
+
+
+def _invalidate(collection_name: str):
+    manifest_path = snapshot_paths(collection_name)[2]
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+
+
+# -----------------------------
+# 2. 파일 쓰기 도구 (memmap / 열 단위 페이로드)
+# -----------------------------
+
+def _resize_vectors(path: str, vectors: np.ndarray, rows: int) -> np.ndarray:
+    """memmap 벡터 파일을 rows행 크기의 새 파일로 옮깁니다. (예상보다 포인트가 늘거나 줄었을 때만 사용)"""
+    resized_path = path + ".resize"
+    resized = np.lib.format.open_memmap(resized_path, mode="w+", dtype=vectors.dtype, shape=(rows, vectors.shape[1]))
+    copy_rows = min(rows, len(vectors))
+    for start in range(0, copy_rows, SCROLL_LIMIT * 10):
+        end = min(copy_rows, start + SCROLL_LIMIT * 10)
+        resized[start:end] = vectors[start:end]
+    resized.flush()
+    os.replace(resized_path, path)
+    return resized
+
+
+def _append_vectors(path: str, rows: np.ndarray):
+    """
+    .npy 파일 끝에 행을 추가하고 헤더의 shape를 고칩니다. (기존 데이터 복사 없음)
+    헤더 길이가 달라지면(오래된 numpy가 쓴 파일) 새 파일로 복사합니다.
+    """
+    with open(path, "r+b") as f:
+        version = np.lib.format.read_magic(f)
+        read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+        shape, fortran_order, dtype = read_header(f)
+        header_length = f.tell()
+        header = io.BytesIO()
+        write_header = np.lib.format.write_array_header_1_0 if version == (1, 0) else np.lib.format.write_array_header_2_0
+        write_header(header, {
+            "descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": fortran_order,
+            "shape": (shape[0] + len(rows), shape[1]),
+        })
+        if len(header.getvalue()) == header_length:
+            f.seek(0, os.SEEK_END)
+            f.write(np.ascontiguousarray(rows, dtype=dtype).tobytes())
+            f.seek(0)
+            f.write(header.getvalue())
+            return
+    vectors = np.load(path, mmap_mode="r")
+    resized = _resize_vectors(path, vectors, len(vectors) + len(rows))
+    resized[len(vectors):] = rows
+    resized.flush()
+
+
+def _set_payload(columns: dict, row: int, count: int, payload: dict):
+    """열 단위 페이로드의 row번째 값을 payload로 바꿉니다. (row == count이면 끝에 추가, 없는 키는 None)"""
+    for key in payload:
+        if key not in columns:
+            columns[key] = [None] * count
+    for key, column in columns.items():
+        value = payload.get(key)
+        if row < len(column):
+            column[row] = value
+        else:
+            column.append(value)
+
+
+def _point_payload(point) -> dict:
+    payload_data = dict(point.payload or {})
+    payload_data["point_id"] = point.id
+    return payload_data
+
+
+def _read_columns(payloads_path: str):
+    with open(payloads_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return data["columns"], data["count"]
+
+
+def _write_columns(payloads_path: str, columns: dict, count: int):
+    with open(payloads_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"count": count, "columns": columns}, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(payloads_path + ".tmp", payloads_path)
+
+
+def make_snapshot_client():
+    """스냅샷용 Qdrant 클라이언트 (SNAPSHOT_PREFER_GRPC=1이면 gRPC, 연결에 실패하면 HTTP)"""
+    if SNAPSHOT_PREFER_GRPC:
+        try:
+            qdrant_client = QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY, prefer_grpc=True, grpc_port=QDRANT_GRPC_PORT)
+            qdrant_client.get_collections()
+            return qdrant_client
+        except Exception as e:
+            print(f"  [스냅샷] gRPC 연결 실패, HTTP로 가져옵니다: {e}", file=sys.stderr)
+    return QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY)
+
+
+def _scroll_range(qdrant_client, collection_name: str, scroll_filter, start, end):
+    """ID가 start 이상 end 미만인 포인트를 ID 순서로 scroll합니다. (start/end가 None이면 처음/끝까지)"""
+    next_offset = start
+    while True:
+        points, next_offset = qdrant_client.scroll(
+            collection_name=collection_name, scroll_filter=scroll_filter, limit=SCROLL_LIMIT, offset=next_offset,
+            with_vectors=True, with_payload=SNAPSHOT_PAYLOAD_FIELDS
+        )
+        if end is not None:
+            points = [point for point in points if point.id < end]
+            if next_offset is not None and next_offset >= end:
+                next_offset = None
+        if points:
+            yield points
+        if next_offset is None:
+            break
+
+
+def _id_ranges(qdrant_client, collection_name: str, scroll_filter, id_space: int, workers: int):
+    """
+    첫 포인트 ID부터 id_space개씩 나눈 workers개의 ID 구간을 반환합니다. (마지막 구간은 끝까지)
+    pipline.py가 정수 ID를 연속으로 부여하므로 구간별 포인트 수가 비슷합니다. 정수 ID가 아니면 구간 하나.
+    """
+    first, _ = qdrant_client.scroll(
+        collection_name=collection_name, scroll_filter=scroll_filter, limit=1, with_payload=False, with_vectors=False
+    )
+    if not first:
+        return []
+    start = first[0].id
+    if workers <= 1 or not isinstance(start, int) or id_space <= SCROLL_LIMIT:
+        return [(None, None)]
+    step = math.ceil(id_space / workers)
+    bounds = [start + index * step for index in range(workers)]
+    return [(bound, bounds[index + 1] if index + 1 < len(bounds) else None) for index, bound in enumerate(bounds)]
+
+
+def _scroll(qdrant_client, collection_name: str, scroll_filter=None, id_space: int = 0,
+            workers: int = SNAPSHOT_SCROLL_WORKERS):
+    """
+    ID 구간별 scroll을 동시에 실행하고 결과를 SCROLL_LIMIT개 이하씩 반환합니다. (구간 사이의 순서는 보장하지 않음)
+    아직 처리하지 않은 결과는 구간 수의 2배까지만 대기시킵니다.
+    """
+    ranges = _id_ranges(qdrant_client, collection_name, scroll_filter, id_space, workers)
+    if len(ranges) <= 1:
+        for start, end in ranges:
+            yield from _scroll_range(qdrant_client, collection_name, scroll_filter, start, end)
+        return
+
+    batches = queue.Queue(maxsize=len(ranges) * 2)
+
+    def scroll_worker(start, end):
+        try:
+            for points in _scroll_range(qdrant_client, collection_name, scroll_filter, start, end):
+                batches.put(points)
+        except Exception as e:
+            batches.put(e)
+        finally:
+            batches.put(None)
+
+    for start, end in ranges:
+        threading.Thread(target=scroll_worker, args=(start, end), daemon=True).start()
+    finished = 0
+    while finished < len(ranges):
+        item = batches.get()
+        if item is None:
+            finished += 1
+        elif isinstance(item, Exception):
+            raise item
+        else:
+            yield item
+
+
+# -----------------------------
+# 3. 전체 / 증분 동기화
+# -----------------------------
+
+def _pull_full(qdrant_client, collection_name: str, expected: int):
+    """
+    컬렉션 전체를 scroll하며 벡터는 미리 할당한 memmap에 바로 쓰고, 페이로드는 열 단위로 저장합니다.
+    포인트를 파이썬 리스트에 모았다가 np.array로 바꾸지 않으므로 최대 메모리가 scroll 한 번 분량으로 제한됩니다.
+    """
+    vectors_path, payloads_path, _ = snapshot_paths(collection_name)
+    os.makedirs(os.path.dirname(vectors_path), exist_ok=True)
+    _invalidate(collection_name)
+    indexed_until = 0.0
+    started = time.perf_counter()
+    print(f"[스냅샷] 컬렉션 '{collection_name}' 전체 가져오기 시작. (포인트 {expected}개, {SNAPSHOT_VECTOR_DTYPE})", file=sys.stderr)
+
+    tmp_vectors_path = vectors_path + ".tmp"
+    vectors = None
+    columns = {}
+    written = 0
+    for points in _scroll(qdrant_client, collection_name, id_space=expected):
+        batch = np.asarray([point.vector for point in points], dtype=SNAPSHOT_VECTOR_DTYPE)
+        if vectors is None:
+            vectors = np.lib.format.open_memmap(
+                tmp_vectors_path, mode="w+", dtype=batch.dtype, shape=(max(expected, len(batch)), batch.shape[1])
+            )
+        if written + len(batch) > len(vectors):
+            # 가져오는 동안 포인트가 추가된 경우
+            vectors = _resize_vectors(tmp_vectors_path, vectors, max(written + len(batch), int(len(vectors) * 1.25)))
+        vectors[written:written + len(batch)] = batch
+        for point in points:
+            payload_data = _point_payload(point)
+            indexed_until = max(indexed_until, payload_data.get(INDEXED_AT_FIELD) or 0.0)
+            _set_payload(columns, written, written, payload_data)
+            written += 1
+
+    if vectors is None:
+        print("[경고] 컬렉션에 저장된 벡터가 없습니다.", file=sys.stderr)
+        return None
+    if written != len(vectors):
+        # 가져오는 동안 포인트가 삭제된 경우
+        vectors = _resize_vectors(tmp_vectors_path, vectors, written)
+    vectors.flush()
+    dim = vectors.shape[1]
+    del vectors
+    os.replace(tmp_vectors_path, vectors_path)
+    _write_columns(payloads_path, columns, written)
+    print(f"[스냅샷] 총 {written}개 벡터 및 페이로드 저장 완료. ({time.perf_counter() - started:.1f}초)", file=sys.stderr)
+    return _save_manifest(collection_name, written, dim, SNAPSHOT_VECTOR_DTYPE, indexed_until)
+
+
+def _changed_filter(manifest: dict):
+    return models.Filter(must=[models.FieldCondition(
+        key=INDEXED_AT_FIELD, range=models.Range(gt=manifest["indexed_until"])
+    )])
+
+
+def _refresh_incremental(qdrant_client, collection_name: str, manifest: dict, expected: int):
+    """
+    마지막 동기화 이후 색인된 포인트만 가져와 기존 행은 덮어쓰고 새 포인트는 끝에 추가합니다.
+    갱신 후 포인트 수가 컬렉션과 다르면(삭제된 포인트가 있음) None을 반환합니다.
+    """
+    vectors_path, payloads_path, _ = snapshot_paths(collection_name)
+    indexed_until = manifest["indexed_until"]
+    columns, count = _read_columns(payloads_path)
+    row_of = {point_id: row for row, point_id in enumerate(columns.get("point_id", []))}
+    _invalidate(collection_name)  # 갱신 도중 중단되면 다음 실행에서 전체 다시 받기
+
+    vectors = np.load(vectors_path, mmap_mode="r+")
+    updated = appended = 0
+    for points in _scroll(qdrant_client, collection_name, _changed_filter(manifest), id_space=expected):
+        batch = np.asarray([point.vector for point in points], dtype=vectors.dtype)
+        new_rows = []
+        for index, point in enumerate(points):
+            row = row_of.get(point.id)
+            if row is None:
+                row = row_of[point.id] = count + len(new_rows)
+                new_rows.append(index)
+            else:
+                vectors[row] = batch[index]
+                updated += 1
+            payload_data = _point_payload(point)
+            indexed_until = max(indexed_until, payload_data.get(INDEXED_AT_FIELD) or 0.0)
+            _set_payload(columns, row, count + len(new_rows), payload_data)
+        if new_rows:
+            vectors.flush()
+            _append_vectors(vectors_path, batch[new_rows])
+            vectors = np.load(vectors_path, mmap_mode="r+")
+            count += len(new_rows)
+            appended += len(new_rows)
+    vectors.flush()
+    del vectors
+
+    if count != expected:
+        print(f"[스냅샷] 갱신 후 포인트 수({count})가 컬렉션({expected})과 다릅니다. (삭제된 포인트)", file=sys.stderr)
+        return None
+    _write_columns(payloads_path, columns, count)
+    print(f"[스냅샷] 증분 갱신 완료: 변경 {updated}개, 추가 {appended}개 (총 {count}개)", file=sys.stderr)
+    return _save_manifest(collection_name, count, manifest["dim"], manifest["dtype"], indexed_until)
+
+
+def check_snapshot(qdrant_client, collection_name: str = COLLECTION_NAME):
+    """
+    스냅샷 상태를 (상태, manifest, 컬렉션 포인트 수, 변경 포인트 수)로 반환합니다.
+    상태: "fresh"(최신) / "incremental"(변경분만 갱신) / "full"(전체 다시 받기)
+    """
+    expected = qdrant_client.count(collection_name=collection_name, exact=True).count
+    manifest = load_manifest(collection_name)
+    if manifest is None or manifest.get("dtype") != SNAPSHOT_VECTOR_DTYPE:
+        return "full", manifest, expected, None
+    changed = qdrant_client.count(collection_name=collection_name, count_filter=_changed_filter(manifest), exact=True).count
+    if changed == 0:
+        return ("fresh" if manifest["count"] == expected else "full"), manifest, expected, changed
+    if changed > expected * SNAPSHOT_INCREMENTAL_MAX_RATIO:
+        return "full", manifest, expected, changed
+    return "incremental", manifest, expected, changed
+
+
+def ensure_marker_index(qdrant_client, collection_name: str = COLLECTION_NAME):
+    """indexed_at 범위 조회가 빠르도록 payload 인덱스를 만듭니다. (이미 있으면 그대로)"""
+    try:
+        qdrant_client.create_payload_index(
+            collection_name=collection_name, field_name=INDEXED_AT_FIELD, field_schema=models.PayloadSchemaType.FLOAT
+        )
+    except Exception as e:
+        print(f"  [스냅샷] indexed_at 인덱스 생성 건너뜀: {e}", file=sys.stderr)
+
+
+def sync_snapshot(qdrant_client=None, collection_name: str = COLLECTION_NAME):
+    """
+    스냅샷을 컬렉션과 맞추고 manifest를 반환합니다. (컬렉션이 없거나 비었거나 실패하면 None)
+    """
+    try:
+        qdrant_client = qdrant_client or make_snapshot_client()
+        if not qdrant_client.collection_exists(collection_name=collection_name):
+            print(f"[오류] 컬렉션 '{collection_name}'을(를) 찾을 수 없습니다.", file=sys.stderr)
+            return None
+        ensure_marker_index(qdrant_client, collection_name)
+
+        state, manifest, expected, changed = check_snapshot(qdrant_client, collection_name)
+        if expected == 0:
+            print("[경고] 컬렉션에 저장된 벡터가 없습니다.", file=sys.stderr)
+            return None
+        if state == "fresh":
+            print(f"[스냅샷] 최신 상태입니다. (포인트 {expected}개)", file=sys.stderr)
+            return manifest
+        if state == "incremental":
+            print(f"[스냅샷] 마지막 동기화 이후 색인된 포인트 {changed}개만 가져옵니다.", file=sys.stderr)
+            refreshed = _refresh_incremental(qdrant_client, collection_name, manifest, expected)
+            if refreshed is not None:
+                return refreshed
+        return _pull_full(qdrant_client, collection_name, expected)
+
+    except Exception as e:
+        print(f"[오류] Qdrant 스냅샷 동기화 실패: {e}", file=sys.stderr)
+        return None
+
+
+# -----------------------------
+# 4. 로드
+# -----------------------------
+
+def load_snapshot(collection_name: str = COLLECTION_NAME):
+    """
+    벡터는 memmap으로 열어(실제 데이터는 접근할 때 디스크에서 읽음) 반환하고, 페이로드는 DataFrame으로 반환합니다.
+    스냅샷이 없으면 (None, None)
+    """
+    if load_manifest(collection_name) is None:
+        return None, None
+    vectors_path, payloads_path, _ = snapshot_paths(collection_name)
+    vectors = np.load(vectors_path, mmap_mode="r")
+    columns, count = _read_columns(payloads_path)
+    if len(vectors) != count:
+        raise ValueError(f"벡터 수({len(vectors)})와 페이로드 수({count})가 다릅니다.")
+    return vectors, pd.DataFrame(columns)
+
+
+def remove_snapshot(collection_name: str = COLLECTION_NAME):
+    for path in snapshot_paths(collection_name):
+        if os.path.exists(path):
+            os.remove(path)
+            print(f"[삭제 완료] 스냅샷 파일 삭제: {path}")
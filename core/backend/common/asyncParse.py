@@ -0,0 +1,172 @@
+"""
+Upstage document-parse 비동기(async) 작업 모드.
+
+여러 문서를 한꺼번에 제출하고 상태를 주기적으로 조회하여, 완료되는 순서대로 결과를 파싱 캐시에 저장합니다.
+문서마다 스레드/프로세스를 붙잡지 않고 단일 루프에서 수십 개의 문서를 동시에 파싱할 수 있습니다.
+doctype1.py는 같은 캐시 키로 결과를 찾으므로, 미리 받아 둔 문서는 파싱 API를 다시 호출하지 않습니다.
+
+UPSTAGE_API_BASE_URL을 바꾸면 로컬 대체 서버(stand-in)로 동작을 확인할 수 있습니다.
+"""
+
+import sys
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, Iterator, List, Optional
+
+from core.config import ASYNC_PARSE_MAX_IN_FLIGHT, ASYNC_PARSE_POLL_INTERVAL, ASYNC_PARSE_TIMEOUT
+from core.backend.common.parseCache import (
+    DOCUMENT_PARSE_OPTIONS, make_parse_cache_key, load_cached_parse, save_cached_parse
+)
+from core.backend.common.upstageClient import get_upstage_client
+
+ASYNC_PARSE_PATH = "/document-digitization/async"
+ASYNC_STATUS_PATH = "/document-digitization/requests/{request_id}"
+
+REQUEST_TIMEOUT = 60
+
+
+@dataclass
+class AsyncParseJob:
+    file_path: str
+    cache_key: str
+    request_id: Optional[str] = None
+    submitted_at: float = 0.0
+    status: str = "pending"     # pending / submitted / completed / failed
+    error: Optional[str] = None
+
+
+# -----------------------------
+# 1. 단일 작업 API 호출
+# -----------------------------
+
+def submit_document(file_path: str) -> str:
+    """문서를 비동기 파싱 작업으로 제출하고 request_id를 반환합니다."""
+    with open(file_path, "rb") as f:
+        response = get_upstage_client().request(
+            "POST", ASYNC_PARSE_PATH,
+            data=DOCUMENT_PARSE_OPTIONS,
+            files={"document": f},
+            timeout=REQUEST_TIMEOUT,
+        )
+    response.raise_for_status()
+    return response.json()["request_id"]
+
+
+def fetch_job_status(request_id: str) -> dict:
+    response = get_upstage_client().request(
+        "GET", ASYNC_STATUS_PATH.format(request_id=request_id),
+        timeout=REQUEST_TIMEOUT,
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+def download_job_result(status_data: dict) -> dict:
+    """완료된 작업의 batch 결과들을 내려받아 하나의 파싱 결과로 합칩니다. (페이지 순서 유지)"""
+    elements: List[dict] = []
+    batches = sorted(status_data.get("batches", []), key=lambda batch: batch.get("start_page", 0))
+    for batch in batches:
+        response = get_upstage_client().request("GET", batch["download_url"], timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        batch_elements = response.json().get("elements", [])
+
+        # batch 결과의 페이지가 batch 기준(1부터)이면 원본 페이지로 보정
+        start_page = batch.get("start_page", 1) or 1
+        if start_page > 1 and batch_elements and max(el.get("page", 1) for el in batch_elements) < start_page:
+            for element in batch_elements:
+                element["page"] = element.get("page", 1) + start_page - 1
+        elements.extend(batch_elements)
+
+    for new_id, element in enumerate(elements):
+        element["id"] = new_id
+    return {"elements": elements}
+
+
+# -----------------------------
+# 2. 다중 문서 큐
+# -----------------------------
+
+class AsyncParseQueue:
+    """
+    여러 문서를 비동기 파싱 작업으로 제출/조회하는 큐.
+    poll()을 호출할 때마다 완료된 작업의 결과를 파싱 캐시에 저장하고, 빈 자리만큼 새 문서를 제출합니다.
+    """
+
+    def __init__(self, file_paths: List[str], max_in_flight: int = ASYNC_PARSE_MAX_IN_FLIGHT):
+        self.max_in_flight = max_in_flight
+        self.pending: Deque[AsyncParseJob] = deque()
+        self.in_flight: Dict[str, AsyncParseJob] = {}
+        self.finished: Deque[AsyncParseJob] = deque()
+
+        for file_path in file_paths:
+            cache_key = make_parse_cache_key(file_path, DOCUMENT_PARSE_OPTIONS)
+            job = AsyncParseJob(file_path=file_path, cache_key=cache_key)
+            if load_cached_parse(cache_key) is not None:
+                job.status = "completed"   # 이미 캐시에 있으면 제출하지 않음
+                self.finished.append(job)
+            else:
+                self.pending.append(job)
+
+        self._submit_pending()
+
+    def _submit_pending(self):
+        while self.pending and len(self.in_flight) < self.max_in_flight:
+            job = self.pending.popleft()
+            try:
+                job.request_id = submit_document(job.file_path)
+                job.submitted_at = time.monotonic()
+                job.status = "submitted"
+                self.in_flight[job.request_id] = job
+                print(f"  [Async Parse] 제출: {job.file_path} (request_id={job.request_id})", file=sys.stderr)
+            except Exception as e:
+                self._finish(job, "failed", f"제출 실패: {e}")
+
+    def _finish(self, job: AsyncParseJob, status: str, error: Optional[str] = None):
+        job.status = status
+        job.error = error
+        if error:
+            print(f"  [Async Parse] {job.file_path}: {error} (전처리 단계에서 동기 파싱으로 대체)", file=sys.stderr)
+        self.finished.append(job)
+
+    def poll(self):
+        """진행 중인 작업 상태를 한 번씩 조회합니다."""
+        for request_id, job in list(self.in_flight.items()):
+            try:
+                status_data = fetch_job_status(request_id)
+            except Exception as e:
+                print(f"  [Async Parse] 상태 조회 실패 ({request_id}): {e}", file=sys.stderr)
+                continue
+
+            status = status_data.get("status")
+            if status == "completed":
+                del self.in_flight[request_id]
+                try:
+                    save_cached_parse(job.cache_key, download_job_result(status_data))
+                    self._finish(job, "completed")
+                except Exception as e:
+                    self._finish(job, "failed", f"결과 다운로드 실패: {e}")
+            elif status == "failed":
+                del self.in_flight[request_id]
+                self._finish(job, "failed", status_data.get("failure_message") or "파싱 실패")
+            elif time.monotonic() - job.submitted_at > ASYNC_PARSE_TIMEOUT:
+                del self.in_flight[request_id]
+                self._finish(job, "failed", "시간 초과")
+
+        self._submit_pending()
+
+    def has_unfinished(self) -> bool:
+        return bool(self.pending or self.in_flight)
+
+    def drain_finished(self) -> Iterator[AsyncParseJob]:
+        while self.finished:
+            yield self.finished.popleft()
+
+    def iter_completed(self) -> Iterator[AsyncParseJob]:
+        """모든 작업이 끝날 때까지 폴링하며, 끝난(성공/실패) 작업을 완료 순서대로 반환합니다."""
+        while True:
+            yield from self.drain_finished()
+            if not self.has_unfinished():
+                return
+            time.sleep(ASYNC_PARSE_POLL_INTERVAL)
+            self.poll()
@@ -0,0 +1,127 @@
+"""
+여러 청크를 하나의 프롬프트로 묶어 요약하는 배치 요약 모듈.
+
+- 청크 여러 개를 번호를 붙여 한 번에 요청하고, LLM이 JSON 배열로 요약을 돌려주도록 합니다.
+- 응답을 검증하여 누락되거나 형식이 잘못된 항목만 단건 요약(fallback)으로 다시 처리합니다.
+- 요청 수와 반복되는 프롬프트 토큰을 배치 크기만큼 줄입니다.
+"""
+
+import json
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from core.config import SOLAR_LLM_MAX_WORKERS, SOLAR_SUMMARY_BATCH_SIZE, SOLAR_SUMMARY_BATCH_MAX_CHARS
+
+PROMPT_BATCH_SUMMARY = """다음은 문서에서 추출한 여러 개의 텍스트 청크입니다. 각 청크는 [청크 번호] 로 구분됩니다.
+각 청크의 핵심 내용을 3줄 이내의 간결한 문장으로 각각 요약해주세요.
+
+반드시 아래 형식의 JSON 배열만 출력하세요. 다른 설명이나 코드 블록 표시는 포함하지 마세요.
+[{{"id": 청크 번호, "summary": "요약"}}, ...]
+
+{CHUNKS}
+"""
+
+JSON_ARRAY_PATTERN = re.compile(r"\[.*\]", re.DOTALL)
+
+
+def build_batch_prompt(items: Dict[int, str]) -> str:
+    chunks_text = "\n\n".join(f"[{item_id}]\n{text}" for item_id, text in items.items())
+    return PROMPT_BATCH_SUMMARY.format(CHUNKS=chunks_text)
+
+
+def parse_batch_response(raw: str, expected_ids) -> Dict[int, str]:
+    """LLM 응답에서 {id: summary}를 추출합니다. 검증에 실패한 항목은 결과에서 제외됩니다."""
+    match = JSON_ARRAY_PATTERN.search(raw or "")
+    if not match:
+        return {}
+    try:
+        parsed = json.loads(match.group(0))
+    except json.JSONDecodeError:
+        return {}
+    if not isinstance(parsed, list):
+        return {}
+
+    results = {}
+    for entry in parsed:
+        if not isinstance(entry, dict):
+            continue
+        item_id = entry.get("id")
+        summary = entry.get("summary")
+        if isinstance(item_id, str) and item_id.isdigit():
+            item_id = int(item_id)
+        if item_id in expected_ids and isinstance(summary, str) and summary.strip():
+            results[item_id] = summary.strip()
+    return results
+
+
+def make_batches(texts: List[str], batch_size: int, max_chars: int) -> List[Dict[int, str]]:
+    """빈 텍스트를 제외하고, 개수/문자 수 제한에 맞춰 {원본 인덱스: 텍스트} 배치로 나눕니다."""
+    batches = []
+    current: Dict[int, str] = {}
+    current_chars = 0
+    for index, text in enumerate(texts):
+        if not text or text.isspace():
+            continue
+        if current and (len(current) >= batch_size or current_chars + len(text) > max_chars):
+            batches.append(current)
+            current, current_chars = {}, 0
+        current[index] = text
+        current_chars += len(text)
+    if current:
+        batches.append(current)
+    return batches
+
+
+def summarize_in_batches(
+    texts: List[str],
+    call_llm: Callable[[str], str],
+    summarize_single: Callable[[str], str],
+    batch_size: int = SOLAR_SUMMARY_BATCH_SIZE,
+    max_chars: int = SOLAR_SUMMARY_BATCH_MAX_CHARS,
+    max_workers: int = SOLAR_LLM_MAX_WORKERS,
+) -> List[str]:
+    """
+    texts를 배치 프롬프트로 요약하여 입력 순서대로 반환합니다.
+    call_llm(prompt)은 LLM 응답 원문을 반환(실패 시 예외)하고,
+    summarize_single(text)은 배치 결과에서 빠진 항목을 단건으로 요약합니다.
+    batch_size가 1 이하이면 모든 항목을 단건으로 처리합니다.
+    """
+    summaries: List[Optional[str]] = ["" for _ in texts]
+    if batch_size <= 1:
+        batches = [{index: text} for index, text in enumerate(texts) if text and not text.isspace()]
+    else:
+        batches = make_batches(texts, batch_size, max_chars)
+
+    def run_batch(batch: Dict[int, str]) -> Dict[int, str]:
+        if len(batch) == 1:
+            (index, text), = batch.items()
+            return {index: summarize_single(text)}
+
+        # 배치 내부 번호는 1부터 (프롬프트 가독성)
+        local_ids = {local_id: index for local_id, index in enumerate(batch, start=1)}
+        prompt = build_batch_prompt({local_id: batch[index] for local_id, index in local_ids.items()})
+        try:
+            parsed = parse_batch_response(call_llm(prompt), set(local_ids))
+        except Exception as e:
+            print(f"  > [LLM Error] 배치 요약 호출 실패 ({len(batch)}개): {e}", file=sys.stderr)
+            parsed = {}
+
+        results = {local_ids[local_id]: summary for local_id, summary in parsed.items()}
+        missing = [index for index in batch if index not in results]
+        if missing:
+            print(f"  > [배치 요약] {len(missing)}/{len(batch)}개 항목 검증 실패. 단건 요약으로 대체합니다.", file=sys.stderr)
+            for index in missing:
+                results[index] = summarize_single(batch[index])
+        return results
+
+    if batches:
+        workers = max(1, min(max_workers, len(batches)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for results in executor.map(run_batch, batches):
+                for index, summary in results.items():
+                    summaries[index] = summary
+
+    print(f"  > [배치 요약] 항목 {sum(len(b) for b in batches)}개를 {len(batches)}개 요청으로 처리했습니다.", file=sys.stderr)
+    return summaries
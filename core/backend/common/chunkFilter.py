@@ -0,0 +1,200 @@
+"""
+반복 문구(머리글/바닥글/쪽 번호/고지문) 및 정보량이 낮은 청크 필터.
+
+- 문서 내부: 여러 페이지에 반복되는 짧은 줄(머리글/바닥글 등)과 쪽 번호 줄을 제거합니다. (doctype1.py)
+- 문서 간: 문서별로 등장한 짧은 줄을 CACHE_DIR/boilerplate에 기록해 두고,
+  BOILERPLATE_MIN_DOCS개 이상의 다른 문서에서 나온 줄(고지문 등)은 제거합니다. (pipline.py, PDF/DOCX/PPTX)
+- 정보량: 제목 헤더를 뺀 본문의 서로 다른 단어 수가 MIN_CHUNK_UNIQUE_TOKENS 미만인 청크/조각은 요약/임베딩하지 않습니다.
+
+줄 비교는 공백/대소문자를 정규화해서 합니다. 문서 내부 반복은 숫자도 '#'으로 바꿔 비교하므로
+"Report 2024 - 3" 같은 머리글도 같은 줄로 취급합니다. (문서 간에는 숫자까지 같아야 같은 줄)
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+import sys
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+
+from core.config import CACHE_DIR, BOILERPLATE_MIN_DOCS, MIN_CHUNK_UNIQUE_TOKENS, EMBED_BATCH_SIZE
+
+BOILERPLATE_STORE_FILE = os.path.join(CACHE_DIR, "boilerplate", "line_documents.json")
+BOILERPLATE_STORE_MAX_LINES = 200000   # 넘으면 한 문서에서만 나온 줄부터 정리
+
+MAX_BOILERPLATE_LINE_CHARS = 300       # 이보다 긴 줄은 반복 문구 후보로 보지 않음 (문서 간 고지문)
+MAX_PAGE_REPEAT_LINE_CHARS = 100       # 문서 내부 반복(머리글/바닥글) 후보 줄의 최대 길이
+MIN_REPEAT_PAGES = 3                   # 문서 내부 반복: 최소 페이지 수
+PAGE_REPEAT_RATIO = 0.5                # 문서 내부 반복: 전체 페이지 중 이 비율 이상에서 나오면 반복 문구
+
+# 전처리 스크립트가 붙이는 "파일 제목: ...\n\n내용: " 헤더는 정보량 계산에서 제외
+TITLE_HEADER_PATTERN = re.compile(r"^파일 제목:[^\n]*\n+(내용:\s*)?")
+TOKEN_PATTERN = re.compile(r"\w+")
+DIGITS_PATTERN = re.compile(r"\d+")
+# 숫자를 '#'으로 바꾼 뒤의 쪽 번호 줄 (예: "3", "- 3 -", "page 3 of 10", "3 / 10", "3쪽")
+PAGE_NUMBER_PATTERN = re.compile(
+    r"^(page|p\.|pg\.?)?\s*[-–—(\[]?\s*#\s*[-–—)\]]?\s*((/|of)\s*#)?\s*(쪽|페이지|page)?$"
+)
+
+
+# -----------------------------
+# 1. 줄 정규화 / 정보량
+# -----------------------------
+
+def normalize_line(line: str, mask_digits: bool = True) -> str:
+    normalized = " ".join(line.split()).lower()
+    return DIGITS_PATTERN.sub("#", normalized) if mask_digits else normalized
+
+
+def is_page_number_line(normalized: str) -> bool:
+    return bool(normalized) and bool(PAGE_NUMBER_PATTERN.match(normalized))
+
+
+def count_unique_tokens(text: str) -> int:
+    body = TITLE_HEADER_PATTERN.sub("", text or "", count=1)
+    return len(set(token.lower() for token in TOKEN_PATTERN.findall(body)))
+
+
+def is_low_information(text: str, min_unique_tokens: int = MIN_CHUNK_UNIQUE_TOKENS) -> bool:
+    """본문의 서로 다른 단어 수가 기준보다 적으면 True"""
+    return count_unique_tokens(text) < min_unique_tokens
+
+
+def candidate_lines(text: str, mask_digits: bool = True, max_chars: int = MAX_BOILERPLATE_LINE_CHARS) -> Set[str]:
+    """반복 문구 후보가 될 수 있는 (짧은) 정규화 줄 집합"""
+    lines = set()
+    for line in (text or "").splitlines():
+        normalized = normalize_line(line, mask_digits)
+        if normalized and len(normalized) <= max_chars:
+            lines.add(normalized)
+    return lines
+
+
+def find_repeated_lines(page_texts: Dict[int, Iterable[str]]) -> Set[str]:
+    """페이지별 텍스트에서 여러 페이지에 반복되는 줄(정규화 형태)을 찾습니다."""
+    if len(page_texts) < MIN_REPEAT_PAGES:
+        return set()
+    page_counts = Counter()
+    for texts in page_texts.values():
+        lines = set()
+        for text in texts:
+            lines |= candidate_lines(text, max_chars=MAX_PAGE_REPEAT_LINE_CHARS)
+        page_counts.update(lines)
+    threshold = max(MIN_REPEAT_PAGES, math.ceil(len(page_texts) * PAGE_REPEAT_RATIO))
+    return {line for line, count in page_counts.items() if count >= threshold}
+
+
+def strip_lines(text: str, boilerplate: Set[str], mask_digits: bool = True) -> Tuple[str, int]:
+    """반복 문구/쪽 번호 줄을 제거한 텍스트와 제거한 줄 수를 반환합니다."""
+    kept, removed = [], 0
+    for line in text.splitlines():
+        masked = normalize_line(line)
+        normalized = masked if mask_digits else normalize_line(line, mask_digits=False)
+        if masked and (normalized in boilerplate or is_page_number_line(masked)):
+            removed += 1
+            continue
+        kept.append(line)
+    if not removed:
+        return text, 0
+    return "\n".join(kept).strip(), removed
+
+
+# -----------------------------
+# 2. 파이프라인 단위 필터 (문서 간 반복 문구 + 정보량)
+# -----------------------------
+
+def _line_key(normalized: str) -> str:
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16]
+
+
+def _doc_key(doc_id: str) -> str:
+    return hashlib.sha1(doc_id.encode("utf-8")).hexdigest()[:12]
+
+
+class ChunkFilter:
+    """한 번의 파이프라인 실행 동안 유지되며, 문서 간 반복 줄 기록은 실행 간에도 유지됩니다."""
+
+    def __init__(self, store_path: str = BOILERPLATE_STORE_FILE):
+        self.store_path = store_path
+        self.line_documents: Dict[str, List[str]] = {}  # 줄 키 -> 등장한 문서 키 (최대 BOILERPLATE_MIN_DOCS + 1개)
+        self.stats = Counter()
+        try:
+            with open(store_path, "r", encoding="utf-8") as f:
+                self.line_documents = json.load(f).get("lines", {})
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"  [Filter] 반복 문구 기록 로드 실패, 새로 시작합니다: {e}", file=sys.stderr)
+
+    def _corpus_boilerplate(self, doc_key: str, lines: Set[str]) -> Set[str]:
+        """다른 문서 BOILERPLATE_MIN_DOCS개 이상에서 나온 줄"""
+        return {
+            line for line in lines
+            if sum(1 for key in self.line_documents.get(_line_key(line), []) if key != doc_key) >= BOILERPLATE_MIN_DOCS
+        }
+
+    def _record_lines(self, doc_key: str, lines: Set[str]):
+        for line in lines:
+            documents = self.line_documents.setdefault(_line_key(line), [])
+            if doc_key not in documents and len(documents) <= BOILERPLATE_MIN_DOCS:
+                documents.append(doc_key)
+
+    def filter_chunks(self, chunks: Iterable[dict], strip_boilerplate: bool = False) -> Iterator[dict]:
+        """
+        정보량이 낮은 청크를 제외하고, strip_boilerplate이면 여러 문서에 반복되는 줄을 제거한 청크를 차례로 반환합니다.
+        반복 줄 제거는 문서의 모든 줄이 필요하므로 그때만 청크를 모아서 처리합니다. (PDF/DOCX/PPTX, 문서 하나 분량)
+        """
+        if strip_boilerplate:
+            chunks = list(chunks)
+        if strip_boilerplate and chunks:
+            doc_key = _doc_key(chunks[0].get("doc_id", ""))
+            lines = set()
+            for chunk in chunks:
+                lines |= candidate_lines(chunk.get("text_for_embedding", ""), mask_digits=False)
+            boilerplate = self._corpus_boilerplate(doc_key, lines)
+            self._record_lines(doc_key, lines)
+            if boilerplate:
+                for chunk in chunks:
+                    text = chunk.get("text_for_embedding", "")
+                    cleaned, removed = strip_lines(text, boilerplate, mask_digits=False)
+                    if removed:
+                        chunk["text_for_embedding"] = cleaned
+                        self.stats["stripped_lines"] += removed
+                        self.stats["stripped_chars"] += len(text) - len(cleaned)
+
+        input_count = kept_count = 0
+        for chunk in chunks:
+            input_count += 1
+            text = chunk.get("text_for_embedding", "")
+            if is_low_information(text):
+                self.stats["dropped_chunks"] += 1
+                self.stats["dropped_chars"] += len(text)
+                continue
+            kept_count += 1
+            yield chunk
+
+        # 청크 수가 줄어 줄어든 임베딩 배치 요청 수 (runEmbed.py는 EMBED_BATCH_SIZE개씩 요청)
+        self.stats["input_chunks"] += input_count
+        self.stats["saved_embed_requests"] += math.ceil(input_count / EMBED_BATCH_SIZE) - math.ceil(kept_count / EMBED_BATCH_SIZE)
+
+    def save(self):
+        if len(self.line_documents) > BOILERPLATE_STORE_MAX_LINES:
+            self.line_documents = {key: docs for key, docs in self.line_documents.items() if len(docs) > 1}
+        try:
+            os.makedirs(os.path.dirname(self.store_path), exist_ok=True)
+            tmp_path = self.store_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"lines": self.line_documents}, f)
+            os.replace(tmp_path, self.store_path)
+        except OSError as e:
+            print(f"  [Filter] 반복 문구 기록 저장 실패: {e}", file=sys.stderr)
+
+    def report(self):
+        print(
+            f"[Filter] 청크 {self.stats['input_chunks']}개 중 정보량 부족 {self.stats['dropped_chunks']}개 제외 "
+            f"({self.stats['dropped_chars']}자), 반복 문구 {self.stats['stripped_lines']}줄 제거 ({self.stats['stripped_chars']}자), "
+            f"임베딩 요청 {self.stats['saved_embed_requests']}회 절감",
+            file=sys.stderr,
+        )
@@ -0,0 +1,90 @@
+"""
+청크 요약 지연 생성 (on-demand).
+
+청크 summary는 클러스터 라벨링(ClusterLabel.py)에서 대표 청크 몇 개에만 쓰이므로,
+LAZY_CHUNK_SUMMARY=1(기본)이면 수집 단계에서는 만들지 않고 실제로 필요할 때 생성합니다.
+- 요약이 필요한 포인트만 모아 배치 프롬프트로 요약 (common/batchSummary.py)
+- 생성한 요약은 Qdrant payload에 기록하여 다음 라벨링/조회에서 재사용
+- 같은 텍스트의 요약 요청은 LLM 응답 캐시(common/llmCache.py)에서 재사용
+"""
+
+import sys
+from typing import List, Sequence
+
+from core.backend.common.batchSummary import summarize_in_batches
+from core.backend.common.llmCache import solar_chat_completion
+
+SUMMARY_MODEL = "solar-pro2"
+
+# 청크 텍스트를 요약하는 프롬프트
+PROMPT_SUMMARY = """다음 텍스트는 문서의 일부에서 추출한 청크입니다.
+이 텍스트의 핵심 내용을 3줄 이내의 간결한 문장으로 요약해주세요.
+결과 외에 다른 설명이나 서론/결론은 포함하지 마세요.
+
+[텍스트]
+{CHUNK_TEXT}
+"""
+
+# 이전 버전 runEmbed.py / doctype1.py가 요약 대신 저장하던 값 (요약이 없는 것으로 취급)
+PLACEHOLDER_SUMMARIES = {"", "요약 없음"}
+ERROR_SUMMARY_PREFIX = "[LLM 오류"
+
+
+def post_solar_chat(prompt: str) -> str:
+    """Solar LLM에 프롬프트 하나를 요청하고 응답 텍스트를 반환합니다. (응답 캐시 사용, 실패 시 예외 발생)"""
+    payload = {
+        "model": SUMMARY_MODEL,
+        "messages": [{"role": "user", "content": prompt}]
+    }
+    return solar_chat_completion(payload, timeout=60).strip()
+
+
+def summarize_chunk(text: str) -> str:
+    """청크 하나를 요약합니다. 내용이 없거나 호출에 실패하면 빈 문자열을 반환합니다."""
+    if not text or text.isspace():
+        return ""
+    try:
+        return post_solar_chat(PROMPT_SUMMARY.format(CHUNK_TEXT=text))
+    except Exception as e:
+        print(f"  > [LLM Error] 청크 요약 실패: {e}", file=sys.stderr)
+        return ""
+
+
+def summarize_chunks(texts: List[str]) -> List[str]:
+    """여러 청크를 배치 프롬프트로 요약하여 입력 순서대로 반환합니다. (실패한 항목은 빈 문자열)"""
+    return summarize_in_batches(texts, call_llm=post_solar_chat, summarize_single=summarize_chunk)
+
+
+def has_summary(payload: dict) -> bool:
+    summary = (payload or {}).get("summary")
+    return isinstance(summary, str) and summary.strip() not in PLACEHOLDER_SUMMARIES \
+        and not summary.startswith(ERROR_SUMMARY_PREFIX)
+
+
+def ensure_summaries(qdrant_client, collection_name: str, points: Sequence) -> List[str]:
+    """
+    Qdrant 포인트(검색 결과/조회 결과)의 summary를 입력 순서대로 반환합니다.
+    payload에 summary가 없는 포인트는 text_for_embedding으로 요약을 만들어 payload에 기록합니다.
+    (points는 payload에 'summary', 'text_for_embedding'을 포함해 조회해야 합니다.)
+    """
+    summaries = [point.payload.get("summary", "") if has_summary(point.payload) else "" for point in points]
+    missing = [index for index, point in enumerate(points) if not has_summary(point.payload)]
+    if not missing:
+        return summaries
+
+    texts = [points[index].payload.get("text_for_embedding", "") for index in missing]
+    print(f"  [요약] summary가 없는 청크 {len(missing)}개 요약 생성 중...", file=sys.stderr)
+    for index, summary in zip(missing, summarize_chunks(texts)):
+        if not summary:
+            continue  # 실패한 요약은 기록하지 않음 (다음 요청에서 다시 시도)
+        summaries[index] = summary
+        try:
+            qdrant_client.set_payload(
+                collection_name=collection_name,
+                payload={"summary": summary},
+                points=[points[index].id],
+                wait=False,
+            )
+        except Exception as e:
+            print(f"  [요약] 포인트 {points[index].id} summary 저장 실패: {e}", file=sys.stderr)
+    return summaries
@@ -0,0 +1,238 @@
+"""
+HTML 본문 텍스트 스트리밍 추출.
+
+BeautifulSoup(html.parser)로 전체 트리를 만든 뒤 정크 태그를 decompose() 하고 get_text('\\n', strip=True) 하던 방식과
+같은 텍스트를, 트리를 만들지 않고 토크나이저 이벤트만으로 추출합니다.
+- 파일을 블록 단위로 읽어 파서에 흘려보내므로 원본 HTML 전체를 메모리에 올리지 않습니다.
+- 열린 태그 스택만 유지하며, 정크 태그(script/style/nav 등) 하위의 텍스트는 버립니다.
+- 태그 스택/빈 요소/문자 참조 처리는 BeautifulSoup html.parser 트리 빌더와 동일한 규칙을 따릅니다.
+
+python -m core.backend.common.htmlText <html 파일...> 로 기존 BeautifulSoup 방식과 결과 일치 여부 및 속도를 비교할 수 있습니다.
+"""
+
+import re
+import sys
+import time
+from collections import Counter
+from html.entities import html5
+from html.parser import HTMLParser
+from typing import List
+
+JUNK_TAGS = {
+    'script', 'style', 'nav', 'header', 'footer',
+    'aside', 'form', 'button', 'iframe', 'svg'
+}
+
+# BeautifulSoup이 별도 문자열 타입으로 담아 get_text()에서 제외하는 태그 (루비 주석, template)
+EXCLUDED_STRING_CONTAINERS = {'rt', 'rp', 'template'}
+
+# 닫는 태그 없이 바로 닫히는 빈 요소 (BeautifulSoup HTMLTreeBuilder.empty_element_tags)
+EMPTY_ELEMENT_TAGS = {
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen', 'link', 'menuitem', 'meta', 'param',
+    'source', 'track', 'wbr', 'basefont', 'bgsound', 'command', 'frame', 'image', 'isindex', 'nextid', 'spacer',
+}
+
+# 세미콜론을 포함한 HTML5 명명 문자 참조 (예: "amp;" -> "&")
+NAMED_ENTITIES = {name[:-1]: value for name, value in html5.items() if name.endswith(";")}
+
+READ_BLOCK_CHARS = 1024 * 1024
+
+_DECIMAL_REFERENCE_WITH_FOLLOWING_DATA = re.compile("^([0-9]+)(.*)")
+_HEX_REFERENCE_WITH_FOLLOWING_DATA = re.compile("^([0-9a-f]+)(.*)")
+
+
+def _numeric_reference(number: int) -> str:
+    """HTML 명세의 숫자 문자 참조 변환 (범위 밖/서로게이트는 U+FFFD, C1 제어 문자는 windows-1252로 해석)"""
+    if number == 0 or number > 0x10FFFF or 0xD800 <= number <= 0xDFFF:
+        return "�"
+    if 0x80 <= number <= 0x9F:
+        try:
+            return bytes([number]).decode("cp1252")
+        except UnicodeDecodeError:
+            return chr(number)
+    return chr(number)
+
+
+class StreamingTextExtractor(HTMLParser):
+    """토크나이저 이벤트로 본문 텍스트 조각을 모읍니다. feed()를 여러 번 호출해 스트리밍으로 사용할 수 있습니다."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.texts: List[str] = []
+        self._data: List[str] = []
+        self._stack: List[str] = []
+        self._junk_depth = 0
+        self._excluded_depth = 0
+        # 시작 태그만으로 이미 닫은 빈 요소의 태그별 개수 (뒤따르는 </br> 같은 닫는 태그는 무시)
+        # BeautifulSoup은 리스트로 관리하지만, 빈 요소가 많은 문서에서 닫는 태그마다 선형 탐색이 되므로 개수로 관리
+        self._already_closed_empty: Counter = Counter()
+
+    # --- 텍스트 조각 관리 ---
+
+    def _flush(self, keep: bool = True):
+        """태그/주석 경계에서 모은 문자열을 하나의 텍스트 조각으로 확정합니다."""
+        if self._data:
+            text = "".join(self._data).strip()
+            self._data = []
+            if keep and text:
+                self.texts.append(text)
+
+    def handle_data(self, data: str):
+        self._data.append(data)
+
+    def _end_string(self, data: str = "", visible: bool = True):
+        """주석/선언 등 독립 문자열: 앞의 텍스트를 확정하고 자신은 표시 여부에 따라 추가합니다."""
+        self._flush(self._visible())
+        self._data.append(data)
+        self._flush(visible and self._visible())
+
+    def _visible(self) -> bool:
+        return self._junk_depth == 0 and self._excluded_depth == 0
+
+    # --- 태그 스택 ---
+
+    def _push(self, tag: str):
+        self._stack.append(tag)
+        if tag in JUNK_TAGS:
+            self._junk_depth += 1
+        if tag in EXCLUDED_STRING_CONTAINERS:
+            self._excluded_depth += 1
+
+    def _pop_to(self, tag: str):
+        """가장 최근에 열린 같은 이름의 태그까지 닫습니다. (없으면 무시)"""
+        if tag not in self._stack:
+            return
+        while self._stack:
+            popped = self._stack.pop()
+            if popped in JUNK_TAGS:
+                self._junk_depth -= 1
+            if popped in EXCLUDED_STRING_CONTAINERS:
+                self._excluded_depth -= 1
+            if popped == tag:
+                break
+
+    def handle_starttag(self, tag, attrs, handle_empty_element=True):
+        self._flush(self._visible())
+        self._push(tag)
+        if tag in EMPTY_ELEMENT_TAGS and handle_empty_element:
+            self.handle_endtag(tag, check_already_closed=False)
+            self._already_closed_empty[tag] += 1
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs, handle_empty_element=False)
+        self.handle_endtag(tag, check_already_closed=False)
+
+    def handle_endtag(self, tag, check_already_closed=True):
+        if check_already_closed and self._already_closed_empty[tag] > 0:
+            self._already_closed_empty[tag] -= 1
+            return
+        self._flush(self._visible())
+        self._pop_to(tag)
+
+    # --- 주석/선언/문자 참조 ---
+
+    def handle_comment(self, data):
+        self._end_string(visible=False)
+
+    def handle_decl(self, decl):
+        self._end_string(visible=False)
+
+    def handle_pi(self, data):
+        self._end_string(visible=False)
+
+    def unknown_decl(self, data):
+        if data.upper().startswith("CDATA["):
+            self._end_string(data[len("CDATA["):])
+        else:
+            self._end_string(visible=False)
+
+    def handle_charref(self, name):
+        base, pattern = 10, _DECIMAL_REFERENCE_WITH_FOLLOWING_DATA
+        if name.startswith(("x", "X")):
+            name, base, pattern = name[1:], 16, _HEX_REFERENCE_WITH_FOLLOWING_DATA
+
+        extra_data = ""
+        try:
+            number = int(name, base)
+        except ValueError:
+            # 세미콜론 없이 끝난 참조: 숫자 부분만 참조로 해석하고 나머지는 일반 텍스트
+            match = pattern.search(name)
+            if match is None:
+                self.handle_data(name)
+                return
+            number, extra_data = int(match.group(1), base), match.group(2)
+
+        self.handle_data(_numeric_reference(number))
+        if extra_data:
+            self.handle_data(extra_data)
+
+    def handle_entityref(self, name):
+        character = NAMED_ENTITIES.get(name)
+        self.handle_data(character if character is not None else "&%s" % name)
+
+    def get_text(self) -> str:
+        return "\n".join(self.texts)
+
+
+def extract_text(html_body: str) -> str:
+    """HTML 문자열에서 본문 텍스트를 추출합니다."""
+    extractor = StreamingTextExtractor()
+    extractor.feed(html_body)
+    extractor.close()
+    extractor._flush(extractor._visible())
+    return extractor.get_text()
+
+
+def extract_text_from_file(file_path: str) -> str:
+    """HTML 파일을 블록 단위로 읽으며 본문 텍스트를 추출합니다. (UTF-8 실패 시 latin-1로 다시 읽음)"""
+    for encoding in ("utf-8", "latin-1"):
+        extractor = StreamingTextExtractor()
+        try:
+            with open(file_path, "r", encoding=encoding) as f:
+                for block in iter(lambda: f.read(READ_BLOCK_CHARS), ""):
+                    extractor.feed(block)
+        except UnicodeDecodeError:
+            continue
+        extractor.close()
+        extractor._flush(extractor._visible())
+        return extractor.get_text()
+    return ""
+
+
+# -----------------------------
+# 기존 BeautifulSoup 방식과 비교 (일치 여부 / 속도)
+# -----------------------------
+
+def _extract_text_with_soup(html_body: str) -> str:
+    from bs4 import BeautifulSoup, Comment
+
+    soup = BeautifulSoup(html_body, 'html.parser')
+    for tag in soup(list(JUNK_TAGS)):
+        tag.decompose()
+    for element in soup(string=lambda text: isinstance(text, Comment)):
+        element.extract()
+    return soup.get_text(separator='\n', strip=True)
+
+
+def _benchmark(file_paths: List[str]):
+    for file_path in file_paths:
+        with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+            html_body = f.read()
+
+        started = time.perf_counter()
+        soup_text = _extract_text_with_soup(html_body)
+        soup_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        stream_text = extract_text(html_body)
+        stream_seconds = time.perf_counter() - started
+
+        print(
+            f"{file_path}: {len(html_body) / 1024 / 1024:.1f}MB, "
+            f"BeautifulSoup {soup_seconds:.2f}s, 스트리밍 {stream_seconds:.2f}s "
+            f"({soup_seconds / max(stream_seconds, 1e-9):.1f}배), 결과 일치: {soup_text == stream_text}"
+        )
+
+
+if __name__ == "__main__":
+    _benchmark(sys.argv[1:])
@@ -0,0 +1,165 @@
+"""
+Solar LLM 응답 영구 캐시.
+
+같은 (모델, 프롬프트, 파라미터) 요청은 실행이 바뀌어도 다시 호출하지 않고 로컬 디스크(SQLite)의 응답을 사용합니다.
+- 키: 요청 payload 전체(model, messages, temperature, max_tokens ...)를 정렬된 JSON으로 직렬화한 SHA-256
+- 만료: LLM_CACHE_TTL_DAYS가 지난 응답은 사용하지 않고 삭제
+- 크기 제한: LLM_CACHE_MAX_MB를 넘으면 가장 오래 사용하지 않은 응답부터 삭제
+- 동시 요청 병합: 같은 키의 요청이 동시에 들어오면 한 번만 호출하고 나머지는 그 결과를 기다림
+
+실패한 호출(예외)은 저장하지 않으므로 각 호출부의 오류 처리는 그대로 동작합니다.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from core.config import LLM_CACHE, LLM_CACHE_DIR, LLM_CACHE_TTL_DAYS, LLM_CACHE_MAX_MB
+from core.backend.common.upstageClient import get_upstage_client
+
+LLM_CACHE_PATH = os.path.join(LLM_CACHE_DIR, "completions.sqlite")
+
+_inflight: Dict[str, threading.Event] = {}
+_inflight_lock = threading.Lock()
+_evicted = False
+
+
+# -----------------------------
+# 1. 캐시 저장소
+# -----------------------------
+
+def make_completion_key(payload: dict) -> str:
+    """요청 payload(모델 + 메시지 + 파라미터) 기준 캐시 키"""
+    serialized = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+def _connect() -> sqlite3.Connection:
+    os.makedirs(LLM_CACHE_DIR, exist_ok=True)
+    connection = sqlite3.connect(LLM_CACHE_PATH, timeout=30)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS completions ("
+        " key TEXT PRIMARY KEY, model TEXT, content TEXT,"
+        " created_at REAL, last_used REAL, size INTEGER)"
+    )
+    return connection
+
+
+def load_cached_completion(key: str) -> Optional[str]:
+    now = time.time()
+    connection = _connect()
+    try:
+        with connection:
+            row = connection.execute("SELECT content, created_at FROM completions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            content, created_at = row
+            if now - created_at > LLM_CACHE_TTL_DAYS * 86400:
+                connection.execute("DELETE FROM completions WHERE key = ?", (key,))
+                return None
+            connection.execute("UPDATE completions SET last_used = ? WHERE key = ?", (now, key))
+            return content
+    finally:
+        connection.close()
+
+
+def save_cached_completion(key: str, model: str, content: str):
+    now = time.time()
+    connection = _connect()
+    try:
+        with connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO completions (key, model, content, created_at, last_used, size) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, content, now, now, len(content.encode("utf-8"))),
+            )
+    finally:
+        connection.close()
+
+
+def evict_llm_cache(max_bytes: int = LLM_CACHE_MAX_MB * 1024 * 1024, ttl_days: float = LLM_CACHE_TTL_DAYS):
+    """만료된 응답을 지우고, 전체 크기가 max_bytes를 넘으면 오래 사용하지 않은 응답부터 삭제합니다."""
+    connection = _connect()
+    try:
+        with connection:
+            expired = connection.execute(
+                "DELETE FROM completions WHERE created_at < ?", (time.time() - ttl_days * 86400,)
+            ).rowcount
+            total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM completions").fetchone()[0]
+            removed = 0
+            if total > max_bytes:
+                for key, size in connection.execute("SELECT key, size FROM completions ORDER BY last_used").fetchall():
+                    if total <= max_bytes:
+                        break
+                    connection.execute("DELETE FROM completions WHERE key = ?", (key,))
+                    total -= size
+                    removed += 1
+        if expired or removed:
+            print(f"  [LLM Cache] 만료 {expired}개, 용량 초과 {removed}개 응답 삭제", file=sys.stderr)
+    finally:
+        connection.close()
+
+
+# -----------------------------
+# 2. 캐시를 거치는 호출
+# -----------------------------
+
+def cached_completion(payload: dict, fetch: Callable[[dict], str]) -> str:
+    """
+    캐시에 있으면 저장된 응답을, 없으면 fetch(payload)를 호출해 저장한 뒤 반환합니다.
+    같은 키로 진행 중인 호출이 있으면 새로 호출하지 않고 그 결과를 기다립니다.
+    """
+    global _evicted
+    if not LLM_CACHE:
+        return fetch(payload)
+
+    if not _evicted:
+        _evicted = True
+        try:
+            evict_llm_cache()
+        except sqlite3.Error as e:
+            print(f"  [LLM Cache] 정리 실패: {e}", file=sys.stderr)
+
+    key = make_completion_key(payload)
+    while True:
+        try:
+            cached = load_cached_completion(key)
+        except sqlite3.Error as e:
+            print(f"  [LLM Cache] 조회 실패, 캐시 없이 호출합니다: {e}", file=sys.stderr)
+            return fetch(payload)
+        if cached is not None:
+            return cached
+
+        with _inflight_lock:
+            event = _inflight.get(key)
+            is_leader = event is None
+            if is_leader:
+                event = _inflight[key] = threading.Event()
+
+        if is_leader:
+            break
+        # 같은 요청을 먼저 보낸 스레드가 끝나면 캐시를 다시 확인 (실패했으면 이번에는 직접 호출)
+        event.wait()
+
+    try:
+        content = fetch(payload)
+        try:
+            save_cached_completion(key, payload.get("model", ""), content)
+        except sqlite3.Error as e:
+            print(f"  [LLM Cache] 저장 실패: {e}", file=sys.stderr)
+        return content
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+        event.set()
+
+
+def solar_chat_completion(payload: dict, timeout: float = 60) -> str:
+    """Solar chat completions 요청 (캐시 사용). 응답 메시지 내용을 반환하며, 실패 시 requests/KeyError 예외를 그대로 전달합니다."""
+    client = get_upstage_client()
+    return cached_completion(payload, lambda request_payload: client.chat_completion(request_payload, timeout))
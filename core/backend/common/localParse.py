@@ -0,0 +1,178 @@
+"""
+PDF/DOCX 로컬 텍스트 레이어 추출 (document-parse 호출 최소화).
+
+- PDF: pdfplumber로 페이지별 텍스트/표를 추출하고, 텍스트 레이어가 쓸 만한지 페이지 단위로 판단합니다.
+  스캔본이거나 이미지뿐인 페이지만 원격 OCR(document-parse) 대상으로 남깁니다.
+- DOCX: python-docx로 문단/표를 문서 순서대로 추출합니다.
+
+출력은 document-parse 응답과 같은 모양({"elements": [...]})이라 structure_parsed_json을 그대로 사용할 수 있습니다.
+"""
+
+import html
+import re
+from typing import Dict, List, Optional, Tuple
+
+# --- 텍스트 레이어 품질 기준 ---
+MIN_PAGE_TEXT_CHARS = 30          # 공백 제외 글자 수가 이보다 적으면 이미지 페이지로 간주
+MIN_VALID_CHAR_RATIO = 0.85       # 한글/영문/숫자/일반 문장부호 비율 (깨진 폰트 매핑 감지)
+CID_GARBAGE_PATTERN = re.compile(r"\(cid:\d+\)")
+VALID_CHAR_PATTERN = re.compile(r"[가-힣ㄱ-ㅎㅏ-ㅣA-Za-z0-9!-/:-@\[-`{-~·•※○●□■◆▶→–—“”‘’「」『』…°]")
+
+
+# -----------------------------
+# 1. 공통 유틸
+# -----------------------------
+
+def is_usable_text(text: str) -> bool:
+    """텍스트 레이어가 OCR 없이 사용할 수 있는 품질인지 판단합니다."""
+    if not text:
+        return False
+    if CID_GARBAGE_PATTERN.search(text):
+        return False
+    compact = re.sub(r"\s+", "", text)
+    if len(compact) < MIN_PAGE_TEXT_CHARS:
+        return False
+    valid = len(VALID_CHAR_PATTERN.findall(compact))
+    return valid / len(compact) >= MIN_VALID_CHAR_RATIO
+
+
+def _element(category: str, page: int, html_content: str) -> dict:
+    return {"category": category, "page": page, "content": {"html": html_content}}
+
+
+def _paragraph_html(text: str) -> str:
+    return f"<p>{html.escape(text)}</p>"
+
+
+def _table_html(rows: List[List[Optional[str]]]) -> str:
+    body = "".join(
+        "<tr>" + "".join(f"<td>{html.escape((cell or '').strip())}</td>" for cell in row) + "</tr>"
+        for row in rows
+    )
+    return f"<table>{body}</table>"
+
+
+def _split_paragraphs(text: str) -> List[str]:
+    """빈 줄 기준으로 문단을 나눕니다. (빈 줄이 없으면 페이지 전체가 한 문단)"""
+    return [block.strip() for block in re.split(r"\n\s*\n", text) if block.strip()]
+
+
+def finalize_elements(elements: List[dict]) -> dict:
+    """페이지 순서로 정렬하고 요소 ID를 0부터 다시 부여하여 document-parse 응답 형태로 반환합니다."""
+    ordered = sorted(elements, key=lambda el: el.get("page", 1))  # 안정 정렬: 페이지 내 순서 유지
+    for new_id, element in enumerate(ordered):
+        element["id"] = new_id
+    return {"elements": ordered}
+
+
+def remap_pages(parsed_data: dict, page_map: Dict[int, int]) -> List[dict]:
+    """부분 PDF의 파싱 결과 페이지 번호(1부터)를 원본 문서 페이지 번호로 바꿉니다."""
+    elements = []
+    for element in parsed_data.get("elements", []):
+        element = dict(element)
+        element["page"] = page_map.get(element.get("page", 1), element.get("page", 1))
+        elements.append(element)
+    return elements
+
+
+# -----------------------------
+# 2. PDF
+# -----------------------------
+
+def extract_pdf_text_layer(file_path: str) -> Tuple[List[dict], List[int]]:
+    """
+    PDF의 텍스트 레이어를 페이지별로 추출합니다.
+    반환: (로컬에서 만든 요소 리스트, 원격 OCR이 필요한 페이지 번호 리스트)
+    """
+    import pdfplumber
+
+    elements: List[dict] = []
+    ocr_pages: List[int] = []
+
+    with pdfplumber.open(file_path) as pdf:
+        for page_num, page in enumerate(pdf.pages, start=1):
+            tables = page.find_tables()
+            table_bboxes = [table.bbox for table in tables]
+
+            # 표 영역의 글자는 본문에서 제외 (표는 별도 table 요소로 처리)
+            def outside_tables(obj):
+                if obj.get("object_type") != "char":
+                    return True
+                x0, top, x1, bottom = obj["x0"], obj["top"], obj["x1"], obj["bottom"]
+                return not any(bx0 <= x0 and x1 <= bx1 and btop <= top and bottom <= bbottom
+                               for bx0, btop, bx1, bbottom in table_bboxes)
+
+            text_page = page.filter(outside_tables) if table_bboxes else page
+            page_text = text_page.extract_text() or ""
+            table_rows = [table.extract() for table in tables]
+            table_text = " ".join(cell or "" for rows in table_rows for row in rows for cell in row)
+
+            if not is_usable_text(page_text + " " + table_text):
+                ocr_pages.append(page_num)
+                continue
+
+            for paragraph in _split_paragraphs(page_text):
+                elements.append(_element("paragraph", page_num, _paragraph_html(paragraph)))
+            for rows in table_rows:
+                if rows:
+                    elements.append(_element("table", page_num, _table_html(rows)))
+
+    return elements, ocr_pages
+
+
+def count_pdf_pages(file_path: str) -> int:
+    from PyPDF2 import PdfReader
+    return len(PdfReader(file_path).pages)
+
+
+def write_pdf_pages(src_path: str, pages: List[int], dst_path: str):
+    """원본 PDF에서 지정한 페이지(1부터)만 골라 새 PDF로 저장합니다."""
+    from PyPDF2 import PdfReader, PdfWriter
+
+    reader = PdfReader(src_path)
+    writer = PdfWriter()
+    for page_num in pages:
+        writer.add_page(reader.pages[page_num - 1])
+    with open(dst_path, "wb") as f:
+        writer.write(f)
+
+
+# -----------------------------
+# 3. DOCX
+# -----------------------------
+
+def extract_docx_elements(file_path: str) -> List[dict]:
+    """
+    DOCX 본문의 문단과 표를 문서 순서대로 추출합니다.
+    DOCX에는 고정된 페이지가 없으므로 명시적/렌더링된 페이지 나눔을 기준으로 페이지 번호를 매깁니다.
+    """
+    import docx
+    from docx.table import Table
+    from docx.text.paragraph import Paragraph
+
+    document = docx.Document(file_path)
+    body = document.element.body
+    elements: List[dict] = []
+    page_num = 1
+
+    for child in body.iterchildren():
+        tag = child.tag.rsplit("}", 1)[-1]
+        if tag == "p":
+            paragraph = Paragraph(child, document)
+            xml = child.xml
+            if 'w:type="page"' in xml or "lastRenderedPageBreak" in xml:
+                if elements:
+                    page_num += 1
+            text = paragraph.text.strip()
+            if not text:
+                continue
+            style_name = (paragraph.style.name if paragraph.style is not None else "") or ""
+            category = "heading1" if style_name.lower().startswith(("heading", "title")) else "paragraph"
+            elements.append(_element(category, page_num, _paragraph_html(text)))
+        elif tag == "tbl":
+            table = Table(child, document)
+            rows = [[cell.text for cell in row.cells] for row in table.rows]
+            if any((cell or "").strip() for row in rows for cell in row):
+                elements.append(_element("table", page_num, _table_html(rows)))
+
+    return elements
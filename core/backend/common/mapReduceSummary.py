@@ -0,0 +1,171 @@
+"""
+계층적 map-reduce 문서 요약.
+
+긴 문서를 앞부분/중간 부분만 잘라 요약하던 방식 대신, 문서 전체를 구간(segment)으로 나눠 요약(map)하고
+구간 요약을 SUMMARY_REDUCE_FAN_IN개씩 묶어 다시 요약(reduce)하는 과정을 하나가 남을 때까지 반복합니다.
+- 같은 단계의 요청은 동시에 처리하고, 토큰 비용은 문서 길이에 대략 비례합니다.
+- 모든 요청이 LLM 응답 캐시(common/llmCache.py)를 거치므로, 다시 실행하면 바뀌지 않은 구간/단계의 요약을 재사용합니다.
+  (프롬프트에 구간 번호/전체 개수를 넣지 않아 문서 길이가 바뀌어도 같은 구간의 요청은 같은 키가 됨)
+- 구간이 SUMMARY_MAX_SEGMENTS개보다 많으면 문서 전체에 고르게 간격을 두고 표본 구간만 요약합니다.
+- summarize_pages()는 페이지 단위 요약을 만들고(청크 요약이 있으면 그것을 reduce), reduce_summaries()로
+  페이지 요약을 문서 요약으로, 대표 청크 요약을 카테고리 요약으로 합칩니다. (doctype1, ClusterLabel.py)
+"""
+
+import math
+import sys
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from core.config import SOLAR_LLM_MAX_WORKERS, SUMMARY_SEGMENT_CHARS, SUMMARY_REDUCE_FAN_IN, SUMMARY_MAX_SEGMENTS
+from core.backend.common.llmCache import solar_chat_completion
+
+SUMMARY_MODEL = "solar-pro2"
+
+PROMPT_MAP = """다음은 **{TITLE}** {KIND}의 일부분입니다.
+이 부분의 핵심 내용을 3문장 이내로 간결하게 요약해 주세요. 요약 외에 다른 설명은 포함하지 마세요.
+
+[{KIND} 일부]
+---
+{CONTENT}
+---
+
+부분 요약:"""
+
+PROMPT_REDUCE = """다음은 **{TITLE}** {KIND}의 여러 부분을 순서대로 요약한 목록입니다.
+이 요약들을 하나로 통합하여 {KIND}의 주제와 핵심 내용을 3문장 이내로 간결하게 요약해 주세요.
+요약 외에 다른 설명은 포함하지 마세요.
+
+[부분 요약 목록]
+{SUMMARIES}
+
+통합 요약:"""
+
+
+def _post_summary(prompt: str) -> str:
+    payload = {
+        "model": SUMMARY_MODEL,
+        "messages": [{"role": "user", "content": prompt}],
+        "temperature": 0.1,
+        "max_tokens": 512
+    }
+    return solar_chat_completion(payload, timeout=60).strip()
+
+
+def _run_concurrently(func, items: List) -> List:
+    if not items:
+        return []
+    workers = max(1, min(SOLAR_LLM_MAX_WORKERS, len(items)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(func, items))
+
+
+def split_segments(text: str, segment_chars: int = SUMMARY_SEGMENT_CHARS) -> List[str]:
+    """메모리에 있는 텍스트를 요약 구간으로 나눕니다."""
+    return make_segment_splitter(segment_chars).split_text(text)
+
+
+def make_segment_splitter(segment_chars: int = SUMMARY_SEGMENT_CHARS) -> RecursiveCharacterTextSplitter:
+    return RecursiveCharacterTextSplitter(
+        chunk_size=segment_chars, chunk_overlap=0,
+        length_function=len, separators=["\n\n", "\n", " ", ""]
+    )
+
+
+def sample_segments(segments: Iterable, estimated_total: Optional[int] = None,
+                    max_segments: int = SUMMARY_MAX_SEGMENTS) -> List:
+    """
+    구간(또는 페이지)이 max_segments개를 넘으면 일정 간격으로 표본을 뽑습니다.
+    estimated_total을 알면 스트림을 한 번만 읽으며 간격을 정하고, 모르면 모두 모은 뒤 고르게 뽑습니다.
+    """
+    if estimated_total:
+        stride = max(1, math.ceil(estimated_total / max_segments))
+        picked = [segment for index, segment in enumerate(segments) if index % stride == 0]
+    else:
+        picked = list(segments)
+    if len(picked) > max_segments:
+        step = len(picked) / max_segments
+        picked = [picked[int(i * step)] for i in range(max_segments)]
+    return picked
+
+
+def map_summaries(segments: List[str], title: str, kind: str = "문서") -> List[str]:
+    """구간별 요약을 동시에 요청합니다. 실패한 구간은 빈 문자열로 반환합니다."""
+    def summarize(segment: str) -> str:
+        try:
+            return _post_summary(PROMPT_MAP.format(TITLE=title, KIND=kind, CONTENT=segment))
+        except Exception as e:
+            print(f"  > [요약 map] 구간 요약 실패: {e}", file=sys.stderr)
+            return ""
+
+    return _run_concurrently(summarize, segments)
+
+
+def reduce_summaries(summaries: List[str], title: str, kind: str = "문서",
+                     fan_in: int = SUMMARY_REDUCE_FAN_IN) -> str:
+    """
+    요약 목록을 fan_in개씩 묶어 요약하는 과정을 하나가 남을 때까지 반복합니다. (같은 단계는 동시 요청)
+    묶음 요약 호출이 실패하면 requests 예외를 그대로 전달합니다.
+    """
+    level = [summary for summary in summaries if summary]
+    fan_in = max(2, fan_in)
+    depth = 0
+    while len(level) > 1:
+        groups = [level[i:i + fan_in] for i in range(0, len(level), fan_in)]
+        depth += 1
+        print(f"  > [요약 reduce] {depth}단계: 요약 {len(level)}개 -> {len(groups)}개", file=sys.stderr)
+        level = _run_concurrently(
+            lambda group: group[0] if len(group) == 1 else _post_summary(PROMPT_REDUCE.format(
+                TITLE=title, KIND=kind, SUMMARIES="\n".join(f"- {summary}" for summary in group)
+            )),
+            groups,
+        )
+    return level[0] if level else ""
+
+
+def summarize_pages(pages: List[Tuple[int, str]], title: str,
+                    chunk_summaries: Optional[Dict[int, List[str]]] = None,
+                    max_pages: int = SUMMARY_MAX_SEGMENTS) -> Dict[int, str]:
+    """
+    (페이지 번호, 페이지 텍스트) 목록으로 {페이지 번호: 페이지 요약}을 만듭니다. 페이지가 max_pages개보다 많으면 표본 페이지만 요약합니다.
+    - chunk_summaries에 청크 요약이 있는 페이지는 청크 요약을 reduce (추가 map 요청 없음)
+    - 없는 페이지는 페이지 텍스트를 구간으로 나눠 map -> reduce (모든 페이지의 구간을 한 번에 동시 요청)
+    요약에 실패한 페이지는 결과에서 빠집니다.
+    """
+    chunk_summaries = chunk_summaries or {}
+    picked = sample_segments(pages, max_segments=max_pages)
+
+    partials: Dict[int, List[str]] = defaultdict(list)
+    to_map = []
+    for page, text in picked:
+        page_chunk_summaries = [summary for summary in chunk_summaries.get(page, []) if summary]
+        if page_chunk_summaries:
+            partials[page] = page_chunk_summaries
+        else:
+            to_map.extend((page, segment) for segment in split_segments(text))
+    print(f"[LLM] 페이지 {len(picked)}개 요약: 구간 {len(to_map)}개 map, 청크 요약 재사용 {len(partials)}개 페이지", file=sys.stderr)
+    for (page, _), summary in zip(to_map, map_summaries([segment for _, segment in to_map], title)):
+        partials[page].append(summary)
+
+    def reduce_page(page: int) -> str:
+        try:
+            return reduce_summaries(partials[page], title, kind="문서 페이지")
+        except Exception as e:
+            print(f"  > [요약 reduce] 페이지 {page} 요약 실패: {e}", file=sys.stderr)
+            return ""
+
+    ordered = [page for page, _ in picked if partials.get(page)]
+    return {page: summary for page, summary in zip(ordered, _run_concurrently(reduce_page, ordered)) if summary}
+
+
+def summarize_document(segments: Iterable[str], title: str, kind: str = "문서",
+                       estimated_total: Optional[int] = None) -> str:
+    """
+    구간 스트림으로 문서 전체 요약을 만듭니다. (map -> reduce)
+    모든 구간 요약이 실패하면 빈 문자열을 반환합니다.
+    """
+    picked = sample_segments(segments, estimated_total)
+    print(f"[LLM] {kind} 전체를 구간 {len(picked)}개로 나눠 요약합니다. (map-reduce)", file=sys.stderr)
+    return reduce_summaries(map_summaries(picked, title, kind), title, kind)
@@ -0,0 +1,206 @@
+"""
+이미지/작은 문서 OCR 묶음 처리.
+
+스캔 영수증, 스크린샷처럼 작은 파일이 많으면 파일마다 document-parse 왕복 비용이 듭니다.
+원격 파싱이 필요한 이미지와 작은 PDF(OCR_PACK_MAX_FILE_PAGES 이하, 텍스트 레이어 없음)를 모아
+OCR_PACK_PAGES 페이지 단위의 PDF 하나로 묶어 한 번에 파싱하고, 결과 요소를 페이지 대응표로 원본 파일별로 나눕니다.
+- 파일별 결과는 파일 단독 파싱과 같은 캐시 키로 파싱 캐시에 저장되므로, doctype1.py는 API 호출 없이 캐시를 사용합니다.
+- 묶음 파싱이 실패한 파일은 캐시에 남지 않으므로 doctype1.py가 기존처럼 파일 단위로 파싱합니다.
+"""
+
+import io
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from core.config import (
+    LOCAL_TEXT_LAYER, OCR_PACK_PAGES, OCR_PACK_MAX_FILE_PAGES, PARSE_SHARD_MAX_WORKERS, PARSE_SHARD_RETRIES
+)
+from core.backend.common.parseCache import (
+    DOCUMENT_PARSE_OPTIONS, make_parse_cache_key, load_cached_parse, save_cached_parse
+)
+from core.backend.common.localParse import extract_pdf_text_layer, count_pdf_pages, finalize_elements
+from core.backend.common.upstageClient import get_upstage_client
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.tif', '.tiff', '.bmp')
+PACK_MAX_BYTES = 30 * 1024 * 1024   # 묶음 PDF 하나에 넣을 원본 파일 크기 합계 상한
+IMAGE_PDF_RESOLUTION = 150.0        # 이미지 -> PDF 페이지 변환 해상도 (DPI)
+
+
+@dataclass
+class PackSource:
+    file_path: str
+    cache_key: str
+    page_count: int
+    size: int
+
+
+@dataclass
+class OcrPack:
+    sources: List[PackSource] = field(default_factory=list)
+    page_count: int = 0
+    size: int = 0
+
+
+# -----------------------------
+# 1. 묶음 대상 선별
+# -----------------------------
+
+def count_image_frames(file_path: str) -> int:
+    from PIL import Image
+
+    with Image.open(file_path) as image:
+        return getattr(image, "n_frames", 1)
+
+
+def packable_page_count(file_path: str) -> Optional[int]:
+    """묶음 파싱 대상이면 페이지 수를, 아니면 None을 반환합니다."""
+    ext = os.path.splitext(file_path)[1].lower()
+    try:
+        if ext in IMAGE_EXTENSIONS:
+            page_count = count_image_frames(file_path)
+        elif ext == ".pdf":
+            page_count = count_pdf_pages(file_path)
+            if page_count > OCR_PACK_MAX_FILE_PAGES:
+                return None
+            if LOCAL_TEXT_LAYER:
+                # 텍스트 레이어가 있는 페이지는 로컬에서 처리되므로, 전 페이지가 스캔본일 때만 묶음 대상
+                elements, ocr_pages = extract_pdf_text_layer(file_path)
+                if elements or not ocr_pages:
+                    return None
+        else:
+            return None
+    except Exception as e:
+        print(f"  [OCR Pack] {os.path.basename(file_path)} 확인 실패, 단독 파싱합니다: {e}", file=sys.stderr)
+        return None
+    return page_count if page_count > 0 else None
+
+
+def plan_packs(file_paths: List[str], pack_pages: int = OCR_PACK_PAGES) -> List[OcrPack]:
+    """캐시에 없는 묶음 대상 파일을 페이지 수/크기 상한에 맞춰 묶습니다."""
+    packs: List[OcrPack] = []
+    current = OcrPack()
+    for file_path in file_paths:
+        page_count = packable_page_count(file_path)
+        if not page_count or page_count > pack_pages:
+            continue
+        cache_key = make_parse_cache_key(file_path, DOCUMENT_PARSE_OPTIONS)
+        if load_cached_parse(cache_key) is not None:
+            continue
+        size = os.path.getsize(file_path)
+        if current.sources and (current.page_count + page_count > pack_pages or current.size + size > PACK_MAX_BYTES):
+            packs.append(current)
+            current = OcrPack()
+        current.sources.append(PackSource(file_path, cache_key, page_count, size))
+        current.page_count += page_count
+        current.size += size
+    if current.sources:
+        packs.append(current)
+    # 파일 하나짜리 묶음은 단독 파싱과 같으므로 doctype1에 맡김
+    return [pack for pack in packs if len(pack.sources) > 1]
+
+
+# -----------------------------
+# 2. 묶음 PDF 생성 / 결과 분배
+# -----------------------------
+
+def _image_pdf_pages(file_path: str) -> bytes:
+    """이미지(여러 프레임 TIFF 포함)를 프레임당 한 페이지인 PDF로 변환합니다."""
+    from PIL import Image, ImageSequence
+
+    with Image.open(file_path) as image:
+        frames = [frame.convert("RGB") for frame in ImageSequence.Iterator(image)]
+    buffer = io.BytesIO()
+    frames[0].save(buffer, "PDF", resolution=IMAGE_PDF_RESOLUTION, save_all=True, append_images=frames[1:])
+    return buffer.getvalue()
+
+
+def write_pack_pdf(pack: OcrPack, dst_path: str) -> Dict[int, Tuple[PackSource, int]]:
+    """묶음 PDF를 만들고 {묶음 페이지 번호: (원본 파일, 원본 페이지 번호)} 대응표를 반환합니다."""
+    from PyPDF2 import PdfReader, PdfWriter
+
+    writer = PdfWriter()
+    page_map: Dict[int, Tuple[PackSource, int]] = {}
+    for source in pack.sources:
+        if os.path.splitext(source.file_path)[1].lower() in IMAGE_EXTENSIONS:
+            reader = PdfReader(io.BytesIO(_image_pdf_pages(source.file_path)))
+        else:
+            reader = PdfReader(source.file_path)
+        for page_num, page in enumerate(reader.pages, start=1):
+            writer.add_page(page)
+            page_map[len(page_map) + 1] = (source, page_num)
+    with open(dst_path, "wb") as f:
+        writer.write(f)
+    return page_map
+
+
+def split_pack_result(parsed_data: dict, page_map: Dict[int, Tuple[PackSource, int]]) -> Dict[str, dict]:
+    """묶음 파싱 결과 요소를 원본 파일별 파싱 결과로 나눕니다. (페이지 번호는 원본 기준)"""
+    elements_by_file: Dict[str, List[dict]] = {source.file_path: [] for source, _ in page_map.values()}
+    for element in parsed_data.get("elements", []):
+        mapped = page_map.get(element.get("page", 1))
+        if mapped is None:
+            continue
+        source, page_num = mapped
+        element = dict(element)
+        element["page"] = page_num
+        elements_by_file[source.file_path].append(element)
+    return {file_path: finalize_elements(elements) for file_path, elements in elements_by_file.items()}
+
+
+def parse_pack(pack: OcrPack) -> int:
+    """묶음 하나를 파싱하여 파일별 결과를 파싱 캐시에 저장하고, 저장한 파일 수를 반환합니다."""
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp_file:
+        pack_path = tmp_file.name
+    try:
+        page_map = write_pack_pdf(pack, pack_path)
+        for attempt in range(1, PARSE_SHARD_RETRIES + 1):
+            try:
+                response = get_upstage_client().document_parse(pack_path, DOCUMENT_PARSE_OPTIONS)
+                response.raise_for_status()
+                parsed_data = response.json()
+                break
+            except Exception as e:
+                if attempt == PARSE_SHARD_RETRIES:
+                    raise
+                print(f"  [OCR Pack] 재시도 {attempt}/{PARSE_SHARD_RETRIES}: {e}", file=sys.stderr)
+                time.sleep(2 ** attempt)
+    finally:
+        os.remove(pack_path)
+
+    results = split_pack_result(parsed_data, page_map)
+    for source in pack.sources:
+        save_cached_parse(source.cache_key, results[source.file_path])
+    return len(pack.sources)
+
+
+def prefetch_packed_ocr(file_paths: List[str]) -> int:
+    """
+    묶음 대상 파일을 모아 동시에 파싱하고 결과를 파싱 캐시에 저장합니다.
+    실패한 묶음은 건너뛰며(파일 단위 파싱으로 대체), 캐시에 저장한 파일 수를 반환합니다.
+    """
+    packs = plan_packs(file_paths)
+    if not packs:
+        return 0
+    total_files = sum(len(pack.sources) for pack in packs)
+    total_pages = sum(pack.page_count for pack in packs)
+    print(f"[OCR Pack] 이미지/작은 문서 {total_files}개({total_pages}페이지)를 {len(packs)}개 요청으로 묶어 파싱합니다.", file=sys.stderr)
+
+    def run(pack: OcrPack) -> int:
+        try:
+            return parse_pack(pack)
+        except Exception as e:
+            print(f"  [OCR Pack] 묶음 파싱 실패 ({len(pack.sources)}개 파일은 개별 파싱): {e}", file=sys.stderr)
+            return 0
+
+    max_workers = max(1, min(PARSE_SHARD_MAX_WORKERS, len(packs)))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        parsed_counts = list(executor.map(run, packs))
+    parsed_files = sum(parsed_counts)
+    saved_requests = parsed_files - sum(1 for count in parsed_counts if count)
+    print(f"[OCR Pack] {parsed_files}/{total_files}개 파일 파싱 완료 (document-parse 요청 {saved_requests}회 절감).", file=sys.stderr)
+    return parsed_files
@@ -0,0 +1,94 @@
+"""
+Upstage document-parse 결과 디스크 캐시.
+
+파일 내용 해시 + 파싱 옵션으로 키를 만들어 원본 JSON을 저장합니다.
+파일이 바뀌지 않았다면 재실행 시 파싱 API 호출을 건너뛰고 바로 structure_parsed_json 단계로 넘어갑니다.
+캐시 전체 크기가 PARSE_CACHE_MAX_MB를 넘으면 가장 오래 사용하지 않은 항목부터 삭제합니다.
+"""
+
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from typing import Optional
+
+from core.config import PARSE_CACHE_DIR, PARSE_CACHE_MAX_MB
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+# document-parse 요청 옵션 (동기/비동기 호출과 캐시 키에서 공통 사용)
+DOCUMENT_PARSE_OPTIONS = {
+    "ocr": "force",
+    "model": "document-parse"
+}
+
+
+def _file_sha256(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def make_parse_cache_key(file_path: str, options: dict) -> str:
+    """파일 내용 해시와 파싱 옵션(ocr, model 등)을 합친 캐시 키"""
+    options_text = json.dumps(options, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(f"{_file_sha256(file_path)}|{options_text}".encode("utf-8")).hexdigest()
+
+
+def _cache_path(key: str) -> str:
+    return os.path.join(PARSE_CACHE_DIR, f"{key}.json")
+
+
+def load_cached_parse(key: str) -> Optional[dict]:
+    """캐시된 파싱 결과를 반환합니다. (없거나 손상되었으면 None)"""
+    path = _cache_path(key)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            parsed_data = json.load(f)
+        os.utime(path, None)  # 최근 사용 시각 갱신 (LRU 기준)
+        return parsed_data
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"[캐시] 파싱 캐시 로드 실패, 무시합니다: {e}", file=sys.stderr)
+        return None
+
+
+def save_cached_parse(key: str, parsed_data: dict):
+    """파싱 결과를 원자적으로 저장한 뒤 크기 제한을 적용합니다."""
+    try:
+        os.makedirs(PARSE_CACHE_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=PARSE_CACHE_DIR, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(parsed_data, f, ensure_ascii=False)
+        os.replace(tmp_path, _cache_path(key))
+        evict_parse_cache()
+    except OSError as e:
+        print(f"[캐시] 파싱 캐시 저장 실패: {e}", file=sys.stderr)
+
+
+def evict_parse_cache(max_bytes: int = PARSE_CACHE_MAX_MB * 1024 * 1024):
+    """캐시 크기가 상한을 넘으면 최근 사용 시각이 오래된 파일부터 삭제합니다."""
+    entries = []
+    for name in os.listdir(PARSE_CACHE_DIR):
+        if not name.endswith(".json"):
+            continue
+        path = os.path.join(PARSE_CACHE_DIR, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
@@ -0,0 +1,86 @@
+"""
+전처리 스크립트의 stdout 스트리밍 출력/입력.
+
+전처리 스크립트는 stdout에 청크 JSON 배열을 출력하고, pipline.py는 그 배열을 원소 단위로 읽습니다.
+청크를 만들어지는 즉시 배열 원소로 출력하고(JsonArrayWriter) 읽는 쪽도 원소 하나씩 처리하면(iter_json_array)
+큰 표/텍스트 파일에서도 양쪽 모두 전체 청크 리스트를 메모리에 두지 않습니다.
+"""
+
+import json
+import sys
+from typing import Iterator, TextIO
+
+READ_SIZE = 64 * 1024
+
+
+class JsonArrayWriter:
+    """청크를 만들어지는 즉시 stdout에 JSON 배열 원소로 출력합니다. (전체 리스트를 메모리에 두지 않음)"""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self.count = 0
+
+    def write(self, item):
+        self.stream.write(("[" if self.count == 0 else ",") + json.dumps(item, ensure_ascii=False))
+        self.count += 1
+
+    def close(self):
+        if self.count:
+            self.stream.write("]\n")
+            self.stream.flush()
+
+
+def iter_json_array(stream: TextIO, read_size: int = READ_SIZE) -> Iterator:
+    """
+    텍스트 스트림의 JSON 배열을 원소 단위로 읽어 반환합니다. (스트림이 비어 있으면 원소 없음)
+    형식이 올바르지 않으면 json.JSONDecodeError(ValueError)를 발생시킵니다.
+    """
+    decoder = json.JSONDecoder()
+    buffer, position, eof = "", 0, False
+
+    def fill() -> bool:
+        nonlocal buffer, position, eof
+        data = stream.read(read_size)
+        eof = not data
+        buffer, position = buffer[position:] + data, 0
+        return not eof
+
+    def next_char() -> str:
+        """공백을 건너뛴 다음 문자 (스트림 끝이면 빈 문자열)"""
+        nonlocal position
+        while True:
+            while position < len(buffer) and buffer[position].isspace():
+                position += 1
+            if position < len(buffer) or not fill():
+                return buffer[position:position + 1]
+
+    first = next_char()
+    if not first:
+        return
+    if first != "[":
+        raise json.JSONDecodeError("JSON 배열이 아닙니다", buffer, position)
+    position += 1
+    if next_char() == "]":
+        return
+
+    while True:
+        next_char()
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+                # 버퍼 끝에서 끝난 값은 잘린 숫자/리터럴일 수 있으므로 더 읽어서 다시 확인
+                if end < len(buffer) or eof:
+                    break
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            fill()
+        position = end
+        yield value
+
+        separator = next_char()
+        position += 1
+        if separator == "]":
+            return
+        if separator != ",":
+            raise json.JSONDecodeError("JSON 배열 구분자가 올바르지 않습니다", buffer, max(0, position - 1))
@@ -0,0 +1,101 @@
+"""
+대용량 텍스트 파일 스트리밍 읽기/분할.
+
+- 인코딩 감지: 파일 앞부분 표본으로 BOM → UTF-8 → CP949(EUC-KR 상위 호환) 순으로 확인하고,
+  모두 실패하면 charset_normalizer(설치된 경우)로 추정합니다.
+- 점진적 디코딩: 블록 단위로 읽어 디코딩하므로 수 GB 로그도 전체를 메모리에 올리지 않습니다.
+  (표본 이후에 잘못된 바이트가 있어도 중단하지 않고 대체 문자로 처리)
+- 스트리밍 분할: 텍스트 분할기를 일정 크기의 창(window)에 적용하고, 창 끝에 걸친 마지막 청크는
+  다음 블록과 이어서 다시 분할하여 청크 경계와 overlap을 유지합니다.
+"""
+
+import codecs
+import sys
+from typing import Iterable, Iterator, Optional
+
+ENCODING_SAMPLE_BYTES = 64 * 1024
+READ_BLOCK_CHARS = 1024 * 1024
+
+# BOM이 있으면 그대로 사용 (utf-8-sig는 BOM을 제거하고 디코딩)
+BOM_ENCODINGS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+# 표본으로 순서대로 시도할 인코딩 (CP949는 EUC-KR의 상위 집합)
+CANDIDATE_ENCODINGS = ("utf-8", "cp949")
+
+
+def _decodes_cleanly(sample: bytes, encoding: str, is_complete: bool) -> bool:
+    """표본이 해당 인코딩으로 오류 없이 디코딩되는지 확인합니다. (표본 끝에서 잘린 멀티바이트 문자는 허용)"""
+    decoder = codecs.getincrementaldecoder(encoding)(errors="strict")
+    try:
+        decoder.decode(sample, final=is_complete)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def detect_encoding(file_path: str, sample_bytes: int = ENCODING_SAMPLE_BYTES) -> str:
+    """파일 앞부분 표본으로 인코딩을 추정합니다."""
+    with open(file_path, "rb") as f:
+        sample = f.read(sample_bytes)
+        is_complete = not f.read(1)
+
+    for bom, encoding in BOM_ENCODINGS:
+        if sample.startswith(bom):
+            return encoding
+
+    for encoding in CANDIDATE_ENCODINGS:
+        if _decodes_cleanly(sample, encoding, is_complete):
+            return encoding
+
+    try:
+        from charset_normalizer import from_bytes
+        best = from_bytes(sample).best()
+        if best is not None and best.encoding:
+            return best.encoding
+    except ImportError:
+        pass
+
+    print(f"  [인코딩] '{file_path}' 인코딩을 판별하지 못해 UTF-8(대체 문자)로 읽습니다.", file=sys.stderr)
+    return "utf-8"
+
+
+def iter_text_blocks(file_path: str, encoding: Optional[str] = None, block_chars: int = READ_BLOCK_CHARS) -> Iterator[str]:
+    """파일을 블록 단위로 점진적으로 디코딩하여 반환합니다."""
+    encoding = encoding or detect_encoding(file_path)
+    with open(file_path, "r", encoding=encoding, errors="replace", newline=None) as f:
+        for block in iter(lambda: f.read(block_chars), ""):
+            yield block
+
+
+def iter_split_text(blocks: Iterable[str], text_splitter, window_chars: int) -> Iterator[str]:
+    """
+    텍스트 블록 스트림을 청크 스트림으로 분할합니다.
+    버퍼가 window_chars 이상 쌓이면 분할하고, 마지막 청크의 시작 위치부터는 다음 블록과 이어 붙여 다시 분할합니다.
+    """
+    buffer = ""
+    for block in blocks:
+        buffer += block
+        if len(buffer) < window_chars:
+            continue
+
+        chunks = text_splitter.split_text(buffer)
+        if len(chunks) < 2:
+            continue
+
+        # 마지막 청크의 시작 위치 찾기 (overlap 때문에 앞 청크 시작 이후부터 순서대로 검색)
+        position = 0
+        for chunk in chunks[:-1]:
+            position = buffer.find(chunk, position)
+            yield chunk
+            position += 1
+        tail_start = buffer.find(chunks[-1], position)
+        buffer = buffer[tail_start:] if tail_start >= 0 else chunks[-1]
+
+    if buffer.strip():
+        yield from text_splitter.split_text(buffer)
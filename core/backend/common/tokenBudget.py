@@ -0,0 +1,238 @@
+"""
+토큰 예산 기반 청크 크기.
+
+분할기가 문자 수(length_function=len)로 청크를 자르면, 한글 1500자와 영문/코드 1500자의 토큰 수가 크게 달라
+영문/코드 청크는 임베딩 모델 입력 한도에 비해 너무 작게 잘리고 청크 수(=임베딩 요청/포인트 수)가 늘어납니다.
+TOKEN_AWARE_CHUNKING=1(기본)이면 청크 길이를 로컬 토큰 수 근사치로 재서 CHUNK_TOKEN_BUDGET에 맞춥니다.
+
+- 근사치는 Solar 토크나이저가 로컬에 없으므로 문자 종류별 평균 길이로 계산합니다.
+  (한글 약 1.5자/토큰, 영문 약 4자/토큰, 숫자 약 3자/토큰, 기호는 1개당 1토큰) 실제보다 약간 많게 세는 쪽으로 잡았습니다.
+- TOKEN_AWARE_CHUNKING=0이면 각 스크립트의 기존 문자 수 설정을 그대로 사용합니다.
+
+측정 도구: 파일/폴더를 주면 파일 종류별로 문자 기준/토큰 기준 청크 수, 토큰 채움률, 예상 임베딩 비용을 비교합니다.
+    python -m core.backend.common.tokenBudget <파일 또는 폴더> [...] [--price 1M토큰당_USD]
+"""
+
+import argparse
+import math
+import os
+import re
+import sys
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from core.config import TOKEN_AWARE_CHUNKING, CHUNK_TOKEN_BUDGET, CHUNK_TOKEN_OVERLAP, EMBED_BATCH_SIZE
+
+HANGUL_CHARS_PER_TOKEN = 1.5
+LATIN_CHARS_PER_TOKEN = 4.0
+DIGIT_CHARS_PER_TOKEN = 3.0
+WHITESPACE_CHARS_PER_TOKEN = 4.0   # 들여쓰기/연속 공백 (단어 사이 공백 한 칸은 다음 단어 토큰에 포함)
+
+TOKEN_PIECE_PATTERN = re.compile(
+    r"[가-힣ㄱ-ㅎㅏ-ㅣ]+|[A-Za-z]+|[0-9]+|\s+|[^\sA-Za-z0-9가-힣ㄱ-ㅎㅏ-ㅣ]"
+)
+
+DEFAULT_SEPARATORS = ["\n\n", "\n", " ", ""]
+LENGTH_UNIT = "토큰" if TOKEN_AWARE_CHUNKING else "자"   # 로그 표시용 길이 단위
+
+
+# -----------------------------
+# 1. 토큰 수 근사치
+# -----------------------------
+
+def estimate_tokens(text: str) -> int:
+    """문자 종류별 평균 길이로 계산한 토큰 수 근사치"""
+    tokens = 0
+    for piece in TOKEN_PIECE_PATTERN.findall(text or ""):
+        first = piece[0]
+        if "가" <= first <= "힣" or "ㄱ" <= first <= "ㅣ":
+            tokens += math.ceil(len(piece) / HANGUL_CHARS_PER_TOKEN)
+        elif first.isascii() and first.isalpha():
+            tokens += math.ceil(len(piece) / LATIN_CHARS_PER_TOKEN)
+        elif first.isascii() and first.isdigit():
+            tokens += math.ceil(len(piece) / DIGIT_CHARS_PER_TOKEN)
+        elif first.isspace():
+            if piece != " ":
+                tokens += math.ceil(len(piece) / WHITESPACE_CHARS_PER_TOKEN)
+        else:
+            tokens += 1
+    return tokens
+
+
+def chunk_length_function() -> Callable[[str], int]:
+    """현재 설정의 청크 길이 측정 함수 (토큰 근사치 또는 문자 수)"""
+    return estimate_tokens if TOKEN_AWARE_CHUNKING else len
+
+
+def text_length(text: str) -> int:
+    """현재 설정 단위(토큰 또는 문자)로 잰 텍스트 길이"""
+    return chunk_length_function()(text)
+
+
+def chunk_limit(max_chars: int) -> int:
+    """현재 설정 단위의 청크 크기 상한 (문자 기준일 때는 각 스크립트의 기존 max_chars)"""
+    return CHUNK_TOKEN_BUDGET if TOKEN_AWARE_CHUNKING else max_chars
+
+
+def make_text_splitter(max_chars: int, overlap_chars: int, separators: Optional[List[str]] = None,
+                       language=None, token_aware: bool = TOKEN_AWARE_CHUNKING) -> RecursiveCharacterTextSplitter:
+    """
+    청크 분할기를 만듭니다. token_aware이면 CHUNK_TOKEN_BUDGET/CHUNK_TOKEN_OVERLAP 토큰 기준,
+    아니면 기존 문자 기준(max_chars/overlap_chars)입니다. language를 주면 언어별 구분자를 사용합니다.
+    """
+    if token_aware:
+        settings = dict(chunk_size=CHUNK_TOKEN_BUDGET, chunk_overlap=CHUNK_TOKEN_OVERLAP, length_function=estimate_tokens)
+    else:
+        settings = dict(chunk_size=max_chars, chunk_overlap=overlap_chars, length_function=len)
+    if language is not None:
+        return RecursiveCharacterTextSplitter.from_language(language=language, **settings)
+    return RecursiveCharacterTextSplitter(separators=separators or DEFAULT_SEPARATORS, **settings)
+
+
+def group_lines(lines: Iterable[str], limit: int, length_function: Callable[[str], int]) -> List[List[str]]:
+    """줄을 순서대로 모아 묶음 길이가 limit를 넘지 않게 나눕니다. (줄 하나가 limit보다 길면 단독 묶음)"""
+    groups, current, current_length = [], [], 0
+    for line in lines:
+        line_length = length_function(line)
+        if current and current_length + line_length > limit:
+            groups.append(current)
+            current, current_length = [], 0
+        current.append(line)
+        current_length += line_length
+    if current:
+        groups.append(current)
+    return groups
+
+
+# -----------------------------
+# 2. 측정 도구 (문자 기준 vs 토큰 기준)
+# -----------------------------
+
+# 임베딩 가격 가정 (USD / 1M 토큰). 실제 요금제에 맞게 --price로 변경
+EMBEDDING_PRICE_PER_1M_TOKENS = 0.1
+MEASURE_MAX_TABLE_ROWS = 5000   # 표 파일은 앞부분 행만 측정
+
+# 파일 종류: (확장자, 기존 문자 기준 청크 크기, 겹침) - 각 typeClass 스크립트의 설정과 같음
+MEASURE_PROFILES = {
+    "문서(PDF/DOCX)": (('.pdf', '.docx'), 1500, 150),
+    "텍스트": (('.txt',), 1500, 150),
+    "코드": (('.py', '.js', '.java', '.c', '.cpp', '.go', '.rb', '.ts'), 2000, 200),
+    "HTML": (('.html', '.htm'), 1500, 150),
+    "표": (('.csv', '.xlsx'), 1500, 0),
+}
+
+
+def _profile_for(file_path: str) -> Optional[str]:
+    ext = os.path.splitext(file_path)[1].lower()
+    for kind, (extensions, _, _) in MEASURE_PROFILES.items():
+        if ext in extensions:
+            return kind
+    return None
+
+
+def _code_language(ext: str):
+    from langchain_text_splitters import Language
+
+    names = {".py": "python", ".js": "js", ".java": "java", ".c": "c", ".cpp": "cpp", ".go": "go", ".rb": "ruby", ".ts": "ts"}
+    return Language(names[ext]) if ext in names else None
+
+
+def _element_text(element: dict) -> str:
+    from bs4 import BeautifulSoup
+
+    return BeautifulSoup(element.get("content", {}).get("html", ""), "html.parser").get_text(separator="\n", strip=True)
+
+
+def _extract_text(file_path: str, kind: str):
+    """측정용 텍스트 추출 (API 호출 없음). 표는 줄 목록, 나머지는 문자열을 반환합니다."""
+    ext = os.path.splitext(file_path)[1].lower()
+    if kind == "문서(PDF/DOCX)":
+        from core.backend.common.localParse import extract_pdf_text_layer, extract_docx_elements
+
+        elements = extract_pdf_text_layer(file_path)[0] if ext == ".pdf" else extract_docx_elements(file_path)
+        return "\n\n".join(_element_text(element) for element in elements)
+    if kind == "HTML":
+        from core.backend.common.htmlText import extract_text_from_file
+
+        return extract_text_from_file(file_path)
+    if kind == "표":
+        import pandas as pd
+
+        if ext == ".csv":
+            frames = [pd.read_csv(file_path, nrows=MEASURE_MAX_TABLE_ROWS, dtype=str, on_bad_lines="skip")]
+        else:
+            frames = list(pd.read_excel(file_path, sheet_name=None, nrows=MEASURE_MAX_TABLE_ROWS, dtype=str).values())
+        return [line for frame in frames for line in frame.to_csv(index=False, header=False).splitlines()]
+
+    from core.backend.common.textStream import detect_encoding
+
+    with open(file_path, "r", encoding=detect_encoding(file_path), errors="replace") as f:
+        return f.read()
+
+
+def measure_file(file_path: str, kind: str) -> Dict[str, List[int]]:
+    """문자 기준/토큰 기준 분할 결과의 청크별 토큰 수 근사치 목록"""
+    _, max_chars, overlap_chars = MEASURE_PROFILES[kind]
+    content = _extract_text(file_path, kind)
+    result = {}
+    for mode, token_aware in (("chars", False), ("tokens", True)):
+        if kind == "표":
+            limit = CHUNK_TOKEN_BUDGET if token_aware else max_chars
+            chunks = ["\n".join(group) for group in group_lines(content, limit, estimate_tokens if token_aware else len)]
+        else:
+            language = _code_language(os.path.splitext(file_path)[1].lower()) if kind == "코드" else None
+            chunks = make_text_splitter(max_chars, overlap_chars, language=language, token_aware=token_aware).split_text(content)
+        result[mode] = [estimate_tokens(chunk) for chunk in chunks]
+    return result
+
+
+def _iter_paths(paths: Iterable[str]) -> Iterable[str]:
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def _measure(paths: List[str], price_per_1m: float):
+    totals = defaultdict(lambda: {"files": 0, "chars": [], "tokens": []})
+    for file_path in _iter_paths(paths):
+        kind = _profile_for(file_path)
+        if kind is None:
+            continue
+        try:
+            measured = measure_file(file_path, kind)
+        except Exception as e:
+            print(f"  {file_path}: 측정 실패 ({e})", file=sys.stderr)
+            continue
+        totals[kind]["files"] += 1
+        totals[kind]["chars"].extend(measured["chars"])
+        totals[kind]["tokens"].extend(measured["tokens"])
+
+    print(f"토큰 예산 {CHUNK_TOKEN_BUDGET} (겹침 {CHUNK_TOKEN_OVERLAP}), 임베딩 ${price_per_1m}/1M 토큰 가정, 배치 {EMBED_BATCH_SIZE}개")
+    for kind, total in totals.items():
+        print(f"\n[{kind}] 파일 {total['files']}개")
+        for mode, label in (("chars", "문자 기준"), ("tokens", "토큰 기준")):
+            counts = total[mode]
+            chunk_count = len(counts)
+            token_sum = sum(counts)
+            fill = (token_sum / chunk_count / CHUNK_TOKEN_BUDGET) if chunk_count else 0.0
+            print(
+                f"  {label}: 청크 {chunk_count}개, 임베딩 요청 {math.ceil(chunk_count / EMBED_BATCH_SIZE)}회, "
+                f"청크당 평균 {token_sum / max(1, chunk_count):.0f}토큰 (예산 대비 채움률 {fill:.0%}), "
+                f"총 {token_sum}토큰 ≈ ${token_sum * price_per_1m / 1_000_000:.4f}"
+            )
+        if total["chars"]:
+            print(f"  → 토큰 기준 청크 수 변화: {len(total['tokens']) / len(total['chars']) - 1:+.0%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="문자 기준/토큰 기준 청크 분할 비교")
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--price", type=float, default=EMBEDDING_PRICE_PER_1M_TOKENS, help="임베딩 가격 (USD / 1M 토큰)")
+    args = parser.parse_args()
+    _measure(args.paths, args.price)
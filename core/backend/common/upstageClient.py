@@ -0,0 +1,256 @@
+"""
+Upstage API 공용 클라이언트.
+
+모든 Upstage 호출(document-parse, chat completions, embeddings)이 이 모듈의 클라이언트 하나를 사용합니다.
+- requests.Session 연결 풀(keep-alive)로 같은 프로세스 안의 호출이 TCP/TLS 연결을 재사용
+- 연결 실패/429/5xx는 짧은 backoff로 재시도 (Retry-After 헤더 준수)
+  POST는 서버가 처리하지 않았음이 확실한 경우(요청 전송 전 연결 실패, 429)만 재시도해 중복 작업 제출/과금을 막음
+- 모든 호출에 (연결, 읽기) 타임아웃 적용
+- UPSTAGE_HTTP2=1 이고 httpx[http2]가 설치되어 있으면 JSON 요청(chat/embeddings)을 HTTP/2로 전송
+- 호출별 지연 시간을 기록하고, 프로세스 종료 시 CACHE_DIR/metrics에 요약을 남김 (pipline.py가 실행 단위로 합산)
+"""
+
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from core.config import (
+    SOLAR_API_KEY, UPSTAGE_API_BASE_URL, CACHE_DIR, SOLAR_LLM_MAX_WORKERS,
+    UPSTAGE_CONNECT_TIMEOUT, UPSTAGE_HTTP2
+)
+
+POOL_SIZE = max(10, SOLAR_LLM_MAX_WORKERS * 2)
+RETRY_STATUS = (429, 502, 503, 504)
+POST_RETRY_STATUS = (429,)   # POST는 요청을 처리하지 않았다는 응답만 재시도 (5xx는 서버가 이미 처리했을 수 있음)
+METRICS_FILE = os.path.join(CACHE_DIR, "metrics", "upstage_calls.jsonl")
+MAX_LATENCY_SAMPLES = 10000
+
+
+# -----------------------------
+# 1. 지연 시간 기록
+# -----------------------------
+
+class LatencyMetrics:
+    """엔드포인트별 호출 수 / 오류 수 / 지연 시간 분포"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples: Dict[str, List[float]] = defaultdict(list)
+        self._errors: Dict[str, int] = defaultdict(int)
+
+    def record(self, name: str, seconds: float, ok: bool):
+        with self._lock:
+            samples = self._samples[name]
+            if len(samples) < MAX_LATENCY_SAMPLES:
+                samples.append(seconds)
+            if not ok:
+                self._errors[name] += 1
+
+    def summary(self) -> List[dict]:
+        with self._lock:
+            rows = []
+            for name, samples in self._samples.items():
+                ordered = sorted(samples)
+                rows.append({
+                    "endpoint": name,
+                    "calls": len(ordered),
+                    "errors": self._errors[name],
+                    "total_s": round(sum(ordered), 3),
+                    "p50_s": round(ordered[len(ordered) // 2], 3),
+                    "p95_s": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+                    "max_s": round(ordered[-1], 3),
+                })
+            return rows
+
+    def flush(self):
+        """프로세스 종료 시 요약을 stderr와 지표 파일에 남깁니다."""
+        rows = self.summary()
+        if not rows:
+            return
+        for row in rows:
+            print(
+                f"  [Upstage] {row['endpoint']}: {row['calls']}회 (오류 {row['errors']}), "
+                f"p50 {row['p50_s']}s, p95 {row['p95_s']}s, 최대 {row['max_s']}s",
+                file=sys.stderr,
+            )
+        try:
+            os.makedirs(os.path.dirname(METRICS_FILE), exist_ok=True)
+            with open(METRICS_FILE, "a", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(json.dumps({"ts": time.time(), "pid": os.getpid(), **row}, ensure_ascii=False) + "\n")
+        except OSError as e:
+            print(f"  [Upstage] 지표 저장 실패: {e}", file=sys.stderr)
+
+
+def summarize_metrics_since(started_at: float) -> List[dict]:
+    """지표 파일에서 started_at 이후 기록을 엔드포인트별로 합산합니다. (여러 전처리/임베딩 프로세스 합계)"""
+    if not os.path.exists(METRICS_FILE):
+        return []
+    totals: Dict[str, dict] = {}
+    with open(METRICS_FILE, encoding="utf-8") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if row.get("ts", 0) < started_at:
+                continue
+            total = totals.setdefault(row["endpoint"], {"endpoint": row["endpoint"], "calls": 0, "errors": 0, "total_s": 0.0, "max_s": 0.0})
+            total["calls"] += row["calls"]
+            total["errors"] += row["errors"]
+            total["total_s"] += row["total_s"]
+            total["max_s"] = max(total["max_s"], row["max_s"])
+    return list(totals.values())
+
+
+# -----------------------------
+# 2. 클라이언트
+# -----------------------------
+
+class UpstageRetry(Retry):
+    """
+    멱등 메서드(GET 등)는 RETRY_STATUS 전체를, POST는 POST_RETRY_STATUS만 상태 코드 재시도합니다.
+    연결 실패(connect)는 요청을 보내기 전이므로 메서드와 무관하게 재시도하고,
+    요청을 보낸 뒤의 읽기 오류/연결 끊김(read/other)은 재시도하지 않습니다.
+    """
+
+    def is_retry(self, method: str, status_code: int, has_retry_after: bool = False) -> bool:
+        if method.upper() == "POST":
+            return status_code in POST_RETRY_STATUS
+        return super().is_retry(method, status_code, has_retry_after)
+
+
+class UpstageClient:
+    def __init__(self, api_key: Optional[str] = SOLAR_API_KEY, base_url: str = UPSTAGE_API_BASE_URL,
+                 connect_timeout: float = UPSTAGE_CONNECT_TIMEOUT, http2: bool = UPSTAGE_HTTP2):
+        self.base_url = base_url.rstrip("/")
+        self.connect_timeout = connect_timeout
+        self.auth_headers = {"Authorization": f"Bearer {api_key}"}
+        self.metrics = LatencyMetrics()
+
+        self.session = requests.Session()
+        retry = UpstageRetry(
+            total=3, connect=3, read=0, other=0, status=3,
+            status_forcelist=RETRY_STATUS,
+            allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+            backoff_factor=1.0,
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE, max_retries=retry)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self.http2_client = None
+        if http2:
+            try:
+                import httpx
+                self.http2_client = httpx.Client(
+                    http2=True,
+                    limits=httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE),
+                    transport=httpx.HTTPTransport(http2=True, retries=3),  # httpx는 연결 실패만 재시도
+                )
+            except ImportError:
+                print("  [Upstage] httpx[http2]가 없어 HTTP/1.1 keep-alive 연결을 사용합니다.", file=sys.stderr)
+
+    def _url(self, path: str) -> str:
+        return path if path.startswith(("http://", "https://")) else f"{self.base_url}/{path.lstrip('/')}"
+
+    def _metric_name(self, url: str) -> str:
+        if url.startswith(self.base_url):
+            return url[len(self.base_url):].split("?")[0] or "/"
+        return urlparse(url).netloc  # 결과 다운로드 등 외부 URL은 호스트 단위로 기록
+
+    def request(self, method: str, path: str, timeout: float = 60, **kwargs) -> requests.Response:
+        """
+        연결 풀을 사용해 요청을 보내고 응답을 그대로 반환합니다. (상태 코드 확인은 호출부에서)
+        base_url 아래 주소에는 인증 헤더를 붙입니다.
+        """
+        url = self._url(path)
+        headers = dict(kwargs.pop("headers", None) or {})
+        if url.startswith(self.base_url):
+            headers = {**self.auth_headers, **headers}
+
+        started = time.perf_counter()
+        ok = False
+        try:
+            response = self.session.request(method, url, headers=headers, timeout=(self.connect_timeout, timeout), **kwargs)
+            ok = response.ok
+            return response
+        finally:
+            self.metrics.record(self._metric_name(url), time.perf_counter() - started, ok)
+
+    def post_json(self, path: str, payload: dict, timeout: float = 60) -> dict:
+        """JSON 요청을 보내고 JSON 응답을 반환합니다. 실패 시 requests 예외(HTTPError/Timeout/ConnectionError)를 발생시킵니다."""
+        if self.http2_client is None:
+            response = self.request("POST", path, timeout=timeout, json=payload)
+            response.raise_for_status()
+            return response.json()
+        return self._post_json_http2(path, payload, timeout)
+
+    def _post_json_http2(self, path: str, payload: dict, timeout: float) -> dict:
+        import httpx
+
+        url = self._url(path)
+        started = time.perf_counter()
+        ok = False
+        try:
+            response = self.http2_client.post(
+                url, json=payload, headers=self.auth_headers,
+                timeout=httpx.Timeout(timeout, connect=self.connect_timeout),
+            )
+            ok = response.is_success
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(str(e)) from e
+        except httpx.HTTPError as e:
+            raise requests.exceptions.ConnectionError(str(e)) from e
+        finally:
+            self.metrics.record(self._metric_name(url), time.perf_counter() - started, ok)
+
+        if not ok:
+            # 호출부의 오류 처리를 HTTP/1.1 경로와 같게 유지
+            error = requests.Response()
+            error.status_code = response.status_code
+            error._content = response.content
+            error.url = url
+            raise requests.exceptions.HTTPError(f"{response.status_code} Error for url: {url}", response=error)
+        return response.json()
+
+    # --- 엔드포인트별 헬퍼 ---
+
+    def chat_completion(self, payload: dict, timeout: float = 60) -> str:
+        """Solar chat completions 응답 메시지 내용을 반환합니다."""
+        return self.post_json("/chat/completions", payload, timeout)['choices'][0]['message']['content']
+
+    def embed(self, texts: List[str], model: str, timeout: float = 60) -> List[List[float]]:
+        """텍스트 리스트의 임베딩을 입력 순서대로 반환합니다."""
+        data = self.post_json("/embeddings", {"model": model, "input": texts}, timeout).get("data", [])
+        return [item["embedding"] for item in sorted(data, key=lambda item: item.get("index", 0))]
+
+    def document_parse(self, file_path: str, options: dict, timeout: float = 600) -> requests.Response:
+        with open(file_path, "rb") as f:
+            return self.request("POST", "/document-digitization", timeout=timeout, data=options, files={"document": f})
+
+
+_client: Optional[UpstageClient] = None
+_client_lock = threading.Lock()
+
+
+def get_upstage_client() -> UpstageClient:
+    """프로세스당 하나의 클라이언트를 만들어 공유합니다. (스레드 안전)"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = UpstageClient()
+            atexit.register(_client.metrics.flush)
+        return _client
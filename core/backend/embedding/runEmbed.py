@@ -5,17 +5,19 @@ from qdrant_client import QdrantClient, models
 from qdrant_client.http.models import Distance
 from tqdm import tqdm
 import sys 
+import time
 
-from core.config import SOLAR_API_KEY, COLLECTION_NAME, QDRANT_API_KEY, QDRANT_URL
+from core.config import COLLECTION_NAME, QDRANT_API_KEY, QDRANT_URL, EMBED_BATCH_SIZE
+from core.backend.common.upstageClient import get_upstage_client
 
 # -----------------------------
 # 1. 설정 및 상수
 # -----------------------------
 
-# Upstage API 설정
-UPSTAGE_EMBEDDING_ENDPOINT = "https://api.upstage.ai/v1/embeddings"
+# Upstage API 설정 (호출은 공용 클라이언트 사용)
 EMBEDDING_MODEL = "embedding-passage"
-BATCH_SIZE = 100 
+BATCH_SIZE = EMBED_BATCH_SIZE
+EMBEDDING_TIMEOUT = 120 # 배치 임베딩 요청 읽기 타임아웃(초)
 
 
 VECTOR_DIMENSION = 4096 # Upstage Embeddings 모델 차원
@@ -28,42 +30,43 @@ def get_upstage_embeddings(texts: list) -> list:
     """
     Upstage Embeddings API를 호출하여 텍스트 리스트의 임베딩을 배치 처리합니다.
     """
-    headers = {
-        "Authorization": f"Bearer {SOLAR_API_KEY}",
-        "Content-Type": "application/json"
-    }
-    
-    payload = {
-        "model": EMBEDDING_MODEL,
-        "input": texts
-    }
-
     try:
-        response = requests.post(
-            UPSTAGE_EMBEDDING_ENDPOINT,
-            headers=headers,
-            json=payload
-        )
-        response.raise_for_status()
-        
-        embeddings = [item['embedding'] for item in response.json().get('data', [])]
-        return embeddings
+        return get_upstage_client().embed(texts, EMBEDDING_MODEL, timeout=EMBEDDING_TIMEOUT)
         
     except requests.exceptions.HTTPError as err:
         print(f"\n  [API Error] HTTP 오류 발생: {err}", file=sys.stderr)
-        print(f"  [API Response] {response.text}", file=sys.stderr)
+        print(f"  [API Response] {err.response.text if err.response is not None else ''}", file=sys.stderr)
         return []
     except Exception as e:
         print(f"\n  [API Error] 알 수 없는 오류: {e}", file=sys.stderr)
         return []
 
+def count_chunks(json_path: str) -> int:
+    """임시 JSON Lines 파일의 청크 수 (한 줄에 청크 하나)"""
+    with open(json_path, 'r', encoding='utf-8') as f:
+        return sum(1 for line in f if line.strip())
+
+def iter_chunk_batches(json_path: str, batch_size: int):
+    """임시 JSON Lines 파일을 batch_size개씩 읽어 반환합니다. (전체 청크를 한 번에 메모리에 올리지 않음)"""
+    batch = []
+    with open(json_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            batch.append(json.loads(line))
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
 # -----------------------------
 # 3. 메인 색인 파이프라인 (Payload 로직 수정)
 # -----------------------------
 
 def run_indexing_pipeline():
     """
-    임시 JSON 파일을 읽고 Qdrant에 벡터를 색인하는 메인 파이프라인.
+    임시 JSON Lines 파일(pipline.py가 청크 한 줄씩 기록)을 배치 단위로 읽고 Qdrant에 벡터를 색인하는 메인 파이프라인.
     명령줄 인자: [1] JSON 파일 경로, [2] 시작 Qdrant ID
     """
     
@@ -78,12 +81,10 @@ def run_indexing_pipeline():
     # Qdrant 클라이언트 초기화 
     qdrant_client = QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY)
     
-    # A. 단일 JSON 파일 로드
-    all_chunks = []
+    # A. 임시 JSON Lines 파일 확인 (청크는 배치 단위로 읽음)
     try:
-        with open(SINGLE_JSON_FILE_PATH, 'r', encoding='utf-8') as f:
-            all_chunks = json.load(f)
-        print(f"[로딩] 임시 JSON 로드 성공. (총 {len(all_chunks)} 청크, 시작 ID: {STARTING_GLOBAL_ID})", file=sys.stderr)
+        total_chunks = count_chunks(SINGLE_JSON_FILE_PATH)
+        print(f"[로딩] 임시 JSON 확인 성공. (총 {total_chunks} 청크, 시작 ID: {STARTING_GLOBAL_ID})", file=sys.stderr)
     except Exception as e:
         print(f"[오류] JSON 로드 실패: {e}", file=sys.stderr)
         sys.exit(1)
@@ -93,13 +94,12 @@ def run_indexing_pipeline():
         print(f"[오류] 컬렉션 '{COLLECTION_NAME}'을(를) 찾을 수 없습니다. 컬렉션 생성 스크립트를 먼저 실행하세요.", file=sys.stderr)
         sys.exit(1)
     
-    print(f"\n[색인 준비] 총 {len(all_chunks)}개 청크 처리 시작.", file=sys.stderr)
+    print(f"\n[색인 준비] 총 {total_chunks}개 청크 처리 시작.", file=sys.stderr)
 
     # C. 배치 임베딩 및 Qdrant 색인
-    total_chunks = len(all_chunks)
+    batches = iter_chunk_batches(SINGLE_JSON_FILE_PATH, BATCH_SIZE)
     
-    for i in tqdm(range(0, total_chunks, BATCH_SIZE), desc="배치 임베딩 및 색인 진행", file=sys.stderr):
-        batch_chunks = all_chunks[i:i + BATCH_SIZE]
+    for i, batch_chunks in zip(tqdm(range(0, total_chunks, BATCH_SIZE), desc="배치 임베딩 및 색인 진행", file=sys.stderr), batches):
         texts_to_embed = [chunk['text_for_embedding'] for chunk in batch_chunks]
         
         # 1. 임베딩 벡터 생성
@@ -113,7 +113,9 @@ def run_indexing_pipeline():
         start_id = STARTING_GLOBAL_ID + i 
         batch_ids = list(range(start_id, start_id + len(batch_vectors))) 
         
-        # 3. Qdrant Payload 준비 (summary 필드 추가)
+        # 3. Qdrant Payload 준비 (summary는 전처리에서 만든 경우에만 저장, 없으면 필요할 때 생성)
+        # indexed_at: 클러스터링 벡터 스냅샷(vectorSnapshot.py)이 변경된 포인트만 다시 가져올 때 사용
+        indexed_at = time.time()
         batch_payloads = []
         for chunk in batch_chunks:
             payload = {
@@ -121,8 +123,14 @@ def run_indexing_pipeline():
                 "page_number": chunk['page'],
                 "chunk_in_page": chunk['chunk_in_page'],
                 "text_for_embedding": chunk['text_for_embedding'],
-                "summary": chunk.get('summary', '요약 없음') # 💡 summary 필드 추가
+                "indexed_at": indexed_at,
             }
+            if chunk.get('summary'):
+                payload["summary"] = chunk['summary']
+            # doctype1 페이지/문서 요약 (SUMMARY_HIERARCHY=1, 페이지/문서의 첫 청크에만 있음)
+            for field in ("page_summary", "doc_summary"):
+                if chunk.get(field):
+                    payload[field] = chunk[field]
             batch_payloads.append(payload)
 
         # 4. Qdrant에 데이터 일괄 삽입
@@ -5,10 +5,10 @@ import sys
 # -----------------------------
 # 1. 설정 (사용자 환경에 맞게 수정)
 # -----------------------------
-from core.config import SOLAR_API_KEY
+from core.backend.common.upstageClient import get_upstage_client
 
-# 현재 스크립트들에 사용된 키를 복사하세요.
-SOLAR_LLM_ENDPOINT = "https://api.upstage.ai/v1/chat/completions"
+# 응답 캐시를 거치지 않고 공용 클라이언트로 직접 호출 (실제 API 상태 확인)
+SOLAR_LLM_PATH = "/chat/completions"
 TEST_PROMPT = "업스테이지의 Solar 모델에 대해 한 문장으로 설명해 주세요."
 
 # -----------------------------
@@ -18,10 +18,7 @@ TEST_PROMPT = "업스테이지의 Solar 모델에 대해 한 문장으로 설명
 def check_solar_api_call():
     """Solar LLM API에 테스트 요청을 보내 응답 상태와 내용을 확인합니다."""
     
-    headers = {
-        "Authorization": f"Bearer {SOLAR_API_KEY}",
-        "Content-Type": "application/json"
-    }
+    client = get_upstage_client()
 
     payload = {
         "model": "solar-pro2", # 현재 사용 중인 모델명
@@ -31,13 +28,12 @@ def check_solar_api_call():
     }
     
     print(f"--- Solar LLM API 호출 테스트 시작 ---", file=sys.stderr)
-    print(f"엔드포인트: {SOLAR_LLM_ENDPOINT}", file=sys.stderr)
+    print(f"엔드포인트: {client.base_url}{SOLAR_LLM_PATH}", file=sys.stderr)
     
     try:
         # API 호출 (타임아웃 10초 설정)
-        response = requests.post(
-            SOLAR_LLM_ENDPOINT, 
-            headers=headers, 
+        response = client.request(
+            "POST", SOLAR_LLM_PATH,
             json=payload, 
             timeout=10
         )
@@ -35,6 +35,12 @@ def create_qdrant_collection():
                 distance=VECTOR_DISTANCE
             )
         )
+        # 클러스터링 벡터 스냅샷의 변경 포인트 조회(indexed_at 범위)용 payload 인덱스
+        client.create_payload_index(
+            collection_name=COLLECTION_NAME,
+            field_name="indexed_at",
+            field_schema=models.PayloadSchemaType.FLOAT
+        )
         print(f"\n✅ 컬렉션 '{COLLECTION_NAME}' 생성 완료.")
         print(f"   > 차원: {VECTOR_DIMENSION}")
         print(f"   > 거리 측정 방식: {VECTOR_DISTANCE.value}")
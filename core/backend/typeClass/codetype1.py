@@ -6,11 +6,13 @@ pip install langchain-text-splitters requests
 import json
 import os
 import re  
-from langchain_text_splitters import RecursiveCharacterTextSplitter, Language
+from langchain_text_splitters import Language
 import sys 
 import requests # <--- 추가: LLM 호출을 위해 requests 모듈 추가
 
-from core.config import SOLAR_API_KEY
+from core.backend.common.llmCache import solar_chat_completion
+from core.backend.common.mapReduceSummary import summarize_document, split_segments
+from core.backend.common.tokenBudget import make_text_splitter
 # -----------------------------
 # 1. 설정 (LLM API 설정 추가)
 # -----------------------------
@@ -26,7 +28,7 @@ except IndexError:
 base_name = os.path.basename(file_path)
 file_name_without_extension = os.path.splitext(base_name)[0]
 
-MAX_CHUNK_CHAR_LENGTH = 2000 
+MAX_CHUNK_CHAR_LENGTH = 2000 # TOKEN_AWARE_CHUNKING=0일 때의 청크 크기 (기본은 CHUNK_TOKEN_BUDGET 토큰)
 
 LANGUAGE_MAP = {
     ".py": Language.PYTHON,
@@ -39,21 +41,13 @@ LANGUAGE_MAP = {
     ".ts": Language.TS,
 }
 
-# API 키 및 엔드포인트
-SOLAR_LLM_ENDPOINT = "https://api.upstage.ai/v1/chat/completions"
-
-# Solar API 직접 호출을 위한 헤더
-SOLAR_LLM_HEADERS = {
-    "Authorization": f"Bearer {SOLAR_API_KEY}",
-    "Content-Type": "application/json"
-}
 
 # -----------------------------
 # 2. 코드 전체 요약 함수 (새로 추가)
 # -----------------------------
 
 def call_solar_code_summary(file_name: str, full_code: str) -> str:
-    """Solar LLM을 호출하여 전체 코드 파일을 요약합니다. 파일 크기가 클 경우 중간 부분만 사용합니다."""
+    """Solar LLM을 호출하여 전체 코드 파일을 요약합니다. 파일 크기가 클 경우 구간별 요약을 합쳐 요약합니다. (map-reduce)"""
     
     # LLM 프롬프트에 들어갈 최대 텍스트 길이 (10,000자 제한)
     MAX_PROMPT_TEXT_LENGTH = 10000
@@ -61,28 +55,19 @@ def call_solar_code_summary(file_name: str, full_code: str) -> str:
     
     # 1. 길이 체크 및 프롬프트 생성
     if len(code_text) > MAX_PROMPT_TEXT_LENGTH:
-        # 코드가 너무 길면 중간 부분 10,000자만 추출
-        start_index = (len(code_text) - MAX_PROMPT_TEXT_LENGTH) // 2
-        end_index = start_index + MAX_PROMPT_TEXT_LENGTH
-        
-        truncated_content = code_text[start_index:end_index]
-        print(f"[LLM] 파일 크기가 커서 코드의 중간 부분 (총 {MAX_PROMPT_TEXT_LENGTH}자)만 사용합니다.", file=sys.stderr)
-        
-        prompt = f"""다음은 파일 제목과 코드의 중간 부분입니다.
-이 정보를 바탕으로 이 **{file_name}** 파일이 어떤 목적으로 작성되었는지, 주요 기능은 무엇인지 3문장 이내로 간결하게 요약해 주세요.
-코드의 시작과 끝이 아니며 중간 부분만 포함되어 있음을 고려해 주세요.
-
-[코드 정보]
----
-파일 제목: {file_name}
-내용:
-{truncated_content}
----
+        # 길면 중간 부분만 자르지 않고, 구간별 요약을 합쳐 파일 전체를 요약 (map-reduce)
+        try:
+            summary = summarize_document(split_segments(code_text), file_name, kind="코드 파일")
+        except (requests.exceptions.RequestException, KeyError, IndexError) as e:
+            print(f"[LLM 요약 오류] 요청 실패 또는 응답 형식 오류: {e}", file=sys.stderr)
+            summary = ""
+        if not summary:
+            return f"[코드 요약 실패: {file_name}]"
+        print(f"[LLM] 코드 요약 완료. (요약 길이: {len(summary)}자)", file=sys.stderr)
+        return summary
 
-코드 전체 요약:"""
-    else:
-        # 전체 코드 사용
-        prompt = f"""다음은 파일 제목과 코드의 전체 내용입니다. 
+    # 전체 코드 사용
+    prompt = f"""다음은 파일 제목과 코드의 전체 내용입니다. 
 이 **{file_name}** 파일이 어떤 목적으로 작성되었는지, 주요 기능은 무엇인지 3문장 이내로 간결하게 요약해 주세요.
 
 [코드 전체 내용]
@@ -93,7 +78,7 @@ def call_solar_code_summary(file_name: str, full_code: str) -> str:
 ---
 
 코드 전체 요약:"""
-        
+    
     # 2. LLM 호출
     payload = {
         "model": "solar-pro2", 
@@ -106,11 +91,7 @@ def call_solar_code_summary(file_name: str, full_code: str) -> str:
     
     try:
         print(f"[LLM] 코드 전체 요약 요청 중...", file=sys.stderr)
-        response = requests.post(SOLAR_LLM_ENDPOINT, headers=SOLAR_LLM_HEADERS, json=payload, timeout=60)
-        response.raise_for_status()
-        
-        response_json = response.json()
-        summary = response_json['choices'][0]['message']['content'].strip()
+        summary = solar_chat_completion(payload, timeout=60).strip()
         print(f"[LLM] 코드 요약 완료. (요약 길이: {len(summary)}자)", file=sys.stderr)
         return summary
         
@@ -144,12 +125,7 @@ def process_code_file(input_file, doc_id, file_name_prefix):
     
     # 2. Langchain 언어별 분할기를 사용 (기존 로직)
     language_enum = LANGUAGE_MAP[file_extension]
-    text_splitter = RecursiveCharacterTextSplitter.from_language(
-        language=language_enum,
-        chunk_size=MAX_CHUNK_CHAR_LENGTH,
-        chunk_overlap=200,
-        length_function=len
-    )
+    text_splitter = make_text_splitter(MAX_CHUNK_CHAR_LENGTH, 200, language=language_enum)
     
     # 3. 코드를 분할
     code_chunks = text_splitter.split_text(full_code)
@@ -1,16 +1,17 @@
 """
 이 스크립트를 실행하기 전에:
-pip install beautifulsoup4 langchain-text-splitters requests
+pip install langchain-text-splitters requests
 이건 html 전용
 """
 
 import json
 import os
-from bs4 import BeautifulSoup, NavigableString, Comment  
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 import sys 
 import requests # <--- 추가: LLM 호출을 위해 requests 모듈 추가
-from core.config import SOLAR_API_KEY
+from core.backend.common.llmCache import solar_chat_completion
+from core.backend.common.mapReduceSummary import summarize_document, split_segments
+from core.backend.common.htmlText import extract_text, extract_text_from_file
+from core.backend.common.tokenBudget import make_text_splitter
 # -----------------------------
 # 1. 설정 (LLM API 설정 추가)
 # -----------------------------
@@ -26,45 +27,18 @@ except IndexError:
 base_name = os.path.basename(file_path)
 file_name_without_extension = os.path.splitext(base_name)[0]
 
-MAX_CHUNK_CHAR_LENGTH = 1500 
+MAX_CHUNK_CHAR_LENGTH = 1500 # TOKEN_AWARE_CHUNKING=0일 때의 청크 크기 (기본은 CHUNK_TOKEN_BUDGET 토큰)
 
-# API 키 및 엔드포인트
-SOLAR_LLM_ENDPOINT = "https://api.upstage.ai/v1/chat/completions"
-
-# Solar API 직접 호출을 위한 헤더
-SOLAR_LLM_HEADERS = {
-    "Authorization": f"Bearer {SOLAR_API_KEY}",
-    "Content-Type": "application/json"
-}
 
 # -----------------------------
-# 2. HTML 정제 함수 (기존 유지)
+# 2. HTML 정제 함수
 # -----------------------------
 def clean_html_content(html_body):
     """
-    BeautifulSoup을 사용해 HTML에서 불필요한 태그를 모두 제거하고,
-    본문 텍스트만 추출합니다.
+    HTML에서 불필요한 태그(script, style, nav 등)의 내용과 주석을 제외하고,
+    본문 텍스트만 추출합니다. (트리를 만들지 않는 스트리밍 토크나이저, BeautifulSoup get_text와 동일한 결과)
     """
-    
-    JUNK_TAGS = [
-        'script', 'style', 'nav', 'header', 'footer', 
-        'aside', 'form', 'button', 'iframe', 'svg'
-    ]
-    
-    soup = BeautifulSoup(html_body, 'html.parser')
-
-    # 1. 모든 정크 태그 제거
-    for tag in soup(JUNK_TAGS):
-        tag.decompose() 
-
-    # 2. 주석(Comments) 제거
-    for element in soup(text=lambda text: isinstance(text, Comment)):
-        element.extract()
-
-    # 3. 정제된 텍스트 추출
-    clean_text = soup.get_text(separator='\n', strip=True)
-    
-    return clean_text
+    return extract_text(html_body)
 
 
 # -----------------------------
@@ -72,7 +46,7 @@ def clean_html_content(html_body):
 # -----------------------------
 
 def call_solar_html_summary(file_name: str, full_text: str) -> str:
-    """Solar LLM을 호출하여 HTML 파일의 정제된 텍스트 전체를 요약합니다. 파일 크기가 클 경우 중간 부분만 사용합니다."""
+    """Solar LLM을 호출하여 HTML 파일의 정제된 텍스트 전체를 요약합니다. 파일 크기가 클 경우 구간별 요약을 합쳐 요약합니다. (map-reduce)"""
     
     # LLM 프롬프트에 들어갈 최대 텍스트 길이 (10,000자 제한)
     MAX_PROMPT_TEXT_LENGTH = 10000
@@ -80,28 +54,19 @@ def call_solar_html_summary(file_name: str, full_text: str) -> str:
     
     # 1. 길이 체크 및 프롬프트 생성
     if len(text_content) > MAX_PROMPT_TEXT_LENGTH:
-        # 텍스트가 너무 길면 중간 부분 10,000자만 추출
-        start_index = (len(text_content) - MAX_PROMPT_TEXT_LENGTH) // 2
-        end_index = start_index + MAX_PROMPT_TEXT_LENGTH
-        
-        truncated_content = text_content[start_index:end_index]
-        print(f"[LLM] 파일 크기가 커서 정제된 텍스트의 중간 부분 (총 {MAX_PROMPT_TEXT_LENGTH}자)만 사용합니다.", file=sys.stderr)
-        
-        prompt = f"""다음은 HTML 파일에서 정제된 텍스트의 중간 부분입니다.
-이 정보를 바탕으로 이 **{file_name}** 파일이 어떤 내용을 담고 있는지, 핵심 주제는 무엇인지 3문장 이내로 간결하게 요약해 주세요.
-텍스트의 시작과 끝이 아니며 중간 부분만 포함되어 있음을 고려해 주세요.
-
-[정제된 텍스트 정보]
----
-파일 제목: {file_name}
-내용:
-{truncated_content}
----
+        # 길면 중간 부분만 자르지 않고, 구간별 요약을 합쳐 파일 전체를 요약 (map-reduce)
+        try:
+            summary = summarize_document(split_segments(text_content), file_name, kind="HTML 문서")
+        except (requests.exceptions.RequestException, KeyError, IndexError) as e:
+            print(f"[LLM 요약 오류] 요청 실패 또는 응답 형식 오류: {e}", file=sys.stderr)
+            summary = ""
+        if not summary:
+            return f"[문서 요약 실패: {file_name}]"
+        print(f"[LLM] 문서 요약 완료. (요약 길이: {len(summary)}자)", file=sys.stderr)
+        return summary
 
-문서 전체 요약:"""
-    else:
-        # 전체 텍스트 사용
-        prompt = f"""다음은 HTML 파일에서 정제된 텍스트의 전체 내용입니다. 
+    # 전체 텍스트 사용
+    prompt = f"""다음은 HTML 파일에서 정제된 텍스트의 전체 내용입니다. 
 이 **{file_name}** 파일이 어떤 목적으로 작성되었는지, 주요 기능은 무엇인지 3문장 이내로 간결하게 요약해 주세요.
 
 [정제된 텍스트 전체 내용]
@@ -112,7 +77,7 @@ def call_solar_html_summary(file_name: str, full_text: str) -> str:
 ---
 
 문서 전체 요약:"""
-        
+    
     # 2. LLM 호출
     payload = {
         "model": "solar-pro2", 
@@ -125,11 +90,7 @@ def call_solar_html_summary(file_name: str, full_text: str) -> str:
     
     try:
         print(f"[LLM] 문서 전체 요약 요청 중...", file=sys.stderr)
-        response = requests.post(SOLAR_LLM_ENDPOINT, headers=SOLAR_LLM_HEADERS, json=payload, timeout=60)
-        response.raise_for_status()
-        
-        response_json = response.json()
-        summary = response_json['choices'][0]['message']['content'].strip()
+        summary = solar_chat_completion(payload, timeout=60).strip()
         print(f"[LLM] 문서 요약 완료. (요약 길이: {len(summary)}자)", file=sys.stderr)
         return summary
         
@@ -146,24 +107,15 @@ def process_html_file(input_file, doc_id, file_name_prefix):
     최종 임베딩용 JSON을 stdout으로 출력합니다.
     """
     
+    print(f"\n[HTML 처리] '{input_file}' 파일 처리 시작...", file=sys.stderr)
+
+    # 1. HTML 정제 (파일을 블록 단위로 읽으며 본문 텍스트만 추출)
+    print("  > HTML 정제 중 (스크립트, 스타일, 네비게이션 태그 제거)...", file=sys.stderr)
     try:
-        # 파일 인코딩 처리
-        try:
-            with open(input_file, "r", encoding="utf-8") as f:
-                full_html = f.read()
-        except UnicodeDecodeError:
-            with open(input_file, "r", encoding="latin-1") as f:
-                full_html = f.read()
-                
+        body_text = extract_text_from_file(input_file)
     except Exception as e:
         print(f"파일 읽기 중 오류 발생: {e}", file=sys.stderr)
         return
-
-    print(f"\n[HTML 처리] '{input_file}' 파일 처리 시작...", file=sys.stderr)
-
-    # 1. HTML 정제
-    print("  > HTML 정제 중 (스크립트, 스타일, 네비게이션 태그 제거)...", file=sys.stderr)
-    body_text = clean_html_content(full_html)
     
     if not body_text.strip():
         print("파일 내용이 비어있거나, 본문 텍스트가 없어 처리를 중단합니다.", file=sys.stderr)
@@ -173,12 +125,7 @@ def process_html_file(input_file, doc_id, file_name_prefix):
     document_summary = call_solar_html_summary(file_name_prefix, body_text)
 
     # 3. 텍스트 분할기
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=MAX_CHUNK_CHAR_LENGTH,
-        chunk_overlap=150,
-        length_function=len,
-        separators=["\n\n", "\n", " ", ""]
-    )
+    text_splitter = make_text_splitter(MAX_CHUNK_CHAR_LENGTH, 150, separators=["\n\n", "\n", " ", ""])
 
     # 4. "정제된 텍스트"를 청크로 분할
     text_chunks = text_splitter.split_text(body_text)
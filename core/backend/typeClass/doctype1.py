@@ -5,33 +5,38 @@ pip install requests beautifulsoup4 langchain-text-splitters
 
 import json
 import os
-import requests
+import tempfile
+import time
 from bs4 import BeautifulSoup
 from collections import defaultdict
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from concurrent.futures import ThreadPoolExecutor
 import sys
-from core.config import SOLAR_API_KEY
+from core.config import (
+    SOLAR_LLM_MAX_WORKERS, LOCAL_TEXT_LAYER, LAZY_CHUNK_SUMMARY, BOILERPLATE_FILTER,
+    PARSE_SHARD_PAGES, PARSE_SHARD_MAX_WORKERS, PARSE_SHARD_RETRIES, SUMMARY_HIERARCHY
+)
+from core.backend.common.llmCache import solar_chat_completion
+from core.backend.common.chunkSummary import summarize_chunks
+from core.backend.common.mapReduceSummary import summarize_pages, reduce_summaries
+from core.backend.common.chunkFilter import find_repeated_lines, strip_lines, is_low_information
+from core.backend.common.tokenBudget import make_text_splitter, text_length, chunk_limit
+from core.backend.common.upstageClient import get_upstage_client
+from core.backend.common.parseCache import (
+    DOCUMENT_PARSE_OPTIONS, make_parse_cache_key, load_cached_parse, save_cached_parse
+)
+from core.backend.common.localParse import (
+    extract_pdf_text_layer, extract_docx_elements, write_pdf_pages, remap_pages, finalize_elements,
+    count_pdf_pages
+)
 # -----------------------------
 # 1. 설정
 # -----------------------------
 
-# [ 1. 입력 ] 처리할 PDF 파일 경로
-try:
-    file_path = sys.argv[1] # 명령줄 인자로 경로 받음
-except IndexError:
-    print("오류: 처리할 파일 경로를 명령줄 인자로 제공해야 합니다.", file=sys.stderr)
-    sys.exit(1)
+# [ 1. 입력 ] 처리할 PDF 파일 경로는 명령줄 인자로 받음 (아래 실행부. 다른 모듈/테스트에서 import할 수 있도록 import 시점에는 읽지 않음)
 
-# API 키 및 엔드포인트
-# 경고: 실제 실행 환경에서는 환경 변수를 사용하는 것이 더 안전합니다.
-UPSTAGE_PARSE_ENDPOINT = "https://api.upstage.ai/v1/document-digitization"
-SOLAR_LLM_ENDPOINT = "https://api.upstage.ai/v1/chat/completions"
-
-# Solar API 직접 호출을 위한 헤더
-SOLAR_LLM_HEADERS = {
-    "Authorization": f"Bearer {SOLAR_API_KEY}",
-    "Content-Type": "application/json"
-}
+# document-parse 요청 옵션 (캐시 키에도 사용)
+# Upstage 호출은 공용 클라이언트(common/upstageClient.py)가 인증/연결 재사용/타임아웃을 처리
+PARSE_OPTIONS = DOCUMENT_PARSE_OPTIONS
 
 # -----------------------------
 # 2. LLM 프롬프트 정의
@@ -47,44 +52,115 @@ PROMPT_TABLE_CHART = """다음은 기술 문서에서 추출한 HTML <table> 형
 {HTML_DATA}
 """
 
-# 청크 텍스트를 요약하는 프롬프트 (새로 추가됨)
-PROMPT_SUMMARY = """다음 텍스트는 문서의 일부에서 추출한 청크입니다.
-이 텍스트의 핵심 내용을 3줄 이내의 간결한 문장으로 요약해주세요.
-결과 외에 다른 설명이나 서론/결론은 포함하지 마세요.
-
-[텍스트]
-{CHUNK_TEXT}
-"""
-
 # -----------------------------
 # 3. 함수 정의
 # -----------------------------
 
-def call_document_parse(input_file):
-    """PDF/DOCX/PPTX 파일을 파싱하여 원본 JSON 객체를 반환합니다."""
-    with open(input_file, "rb") as f:
-        files = {"document": f}
-        data = {
-            "ocr": "force",
-            "model": "document-parse"
-        }
-        headers = {"Authorization": f"Bearer {SOLAR_API_KEY}"}
-        
-        print(f"[Step 1] Upstage API로 파싱 요청 중...", file=sys.stderr)
-        response = requests.post(
-            UPSTAGE_PARSE_ENDPOINT,
-            headers=headers,
-            data=data,
-            files=files
-        )
+def call_document_parse(input_file, cache_key=None):
+    """PDF/DOCX/PPTX 파일을 파싱하여 원본 JSON 객체를 반환합니다. (파일 해시 기준 캐시 사용)"""
+    data = PARSE_OPTIONS
+
+    # 파일 내용과 파싱 옵션이 같으면 이전 파싱 결과를 재사용
+    cache_key = cache_key or make_parse_cache_key(input_file, data)
+    cached = load_cached_parse(cache_key)
+    if cached is not None:
+        print(f"[Step 1] 파싱 캐시 사용 (API 호출 생략).", file=sys.stderr)
+        return cached
+
+    print(f"[Step 1] Upstage API로 파싱 요청 중...", file=sys.stderr)
+    response = get_upstage_client().document_parse(input_file, data, timeout=600)
     
     if response.status_code == 200:
         print(f"[Step 1] 파싱 완료.", file=sys.stderr)
-        return response.json()
+        parsed_data = response.json()
+        save_cached_parse(cache_key, parsed_data)
+        return parsed_data
     else:
         error_text = response.text if response.text else "알 수 없는 API 에러"
         raise ValueError(f"[Step 1] API 호출 실패: HTTP {response.status_code}: {error_text}")
 
+def parse_pdf_shard(input_file, pages):
+    """PDF의 지정한 페이지만 잘라 원격 OCR로 파싱하고, 페이지 번호를 원본 기준으로 되돌립니다. (shard별 재시도)"""
+    # 부분 PDF는 만들 때마다 바이트가 달라질 수 있으므로 원본 파일 + 페이지 목록으로 캐시 키 생성
+    cache_key = make_parse_cache_key(input_file, {**PARSE_OPTIONS, "pages": pages})
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp_file:
+        temp_pdf_path = tmp_file.name
+    try:
+        write_pdf_pages(input_file, pages, temp_pdf_path)
+        for attempt in range(1, PARSE_SHARD_RETRIES + 1):
+            try:
+                parsed_data = call_document_parse(temp_pdf_path, cache_key=cache_key)
+                break
+            except Exception as e:
+                if attempt == PARSE_SHARD_RETRIES:
+                    raise
+                print(f"  > [재시도 {attempt}/{PARSE_SHARD_RETRIES}] 페이지 {pages[0]}~{pages[-1]} 파싱 실패: {e}", file=sys.stderr)
+                time.sleep(2 ** attempt)
+    finally:
+        os.remove(temp_pdf_path)
+    return remap_pages(parsed_data, {index: page for index, page in enumerate(pages, start=1)})
+
+def parse_pdf_pages_remote(input_file, pages):
+    """지정한 페이지들을 PARSE_SHARD_PAGES 단위 shard로 나눠 동시에 파싱하고, 페이지 순서대로 합칩니다."""
+    shards = [pages[i:i + PARSE_SHARD_PAGES] for i in range(0, len(pages), PARSE_SHARD_PAGES)]
+    if len(shards) > 1:
+        print(f"[Step 1] {len(pages)}페이지를 {len(shards)}개 shard로 나눠 동시 파싱합니다.", file=sys.stderr)
+    max_workers = max(1, min(PARSE_SHARD_MAX_WORKERS, len(shards)))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        shard_results = list(executor.map(lambda shard: parse_pdf_shard(input_file, shard), shards))
+    return [element for elements in shard_results for element in elements]
+
+def parse_whole_document_remote(input_file):
+    """문서 전체를 원격 파싱합니다. 페이지 수가 많은 PDF는 페이지 범위로 나눠 동시에 파싱합니다."""
+    # 파이프라인의 비동기 파싱 등으로 문서 전체 결과가 이미 캐시에 있으면 그대로 사용
+    cached = load_cached_parse(make_parse_cache_key(input_file, PARSE_OPTIONS))
+    if cached is not None:
+        print(f"[Step 1] 파싱 캐시 사용 (API 호출 생략).", file=sys.stderr)
+        return cached
+
+    if os.path.splitext(input_file)[1].lower() == ".pdf":
+        try:
+            page_count = count_pdf_pages(input_file)
+        except Exception as e:
+            print(f"[Step 1] PDF 페이지 수 확인 실패, 한 번에 파싱합니다: {e}", file=sys.stderr)
+            page_count = 0
+        if page_count > PARSE_SHARD_PAGES:
+            return finalize_elements(parse_pdf_pages_remote(input_file, list(range(1, page_count + 1))))
+    return call_document_parse(input_file)
+
+def parse_document(input_file):
+    """
+    PDF/DOCX는 로컬 텍스트 레이어를 먼저 추출하고, 텍스트 레이어가 없는(스캔/이미지) 페이지만 원격 OCR로 보냅니다.
+    그 외 형식이거나 로컬 추출이 실패하면 문서 전체를 원격 파싱합니다.
+    """
+    file_extension = os.path.splitext(input_file)[1].lower()
+    if not LOCAL_TEXT_LAYER or file_extension not in (".pdf", ".docx"):
+        return parse_whole_document_remote(input_file)
+
+    try:
+        if file_extension == ".docx":
+            elements = extract_docx_elements(input_file)
+            if not elements:
+                print(f"[Step 1] DOCX 로컬 텍스트 없음. 원격 파싱으로 전환합니다.", file=sys.stderr)
+                return parse_whole_document_remote(input_file)
+            print(f"[Step 1] DOCX 로컬 추출 완료. ({len(elements)}개 요소, API 호출 생략)", file=sys.stderr)
+            return finalize_elements(elements)
+
+        elements, ocr_pages = extract_pdf_text_layer(input_file)
+    except Exception as e:
+        print(f"[Step 1] 로컬 텍스트 추출 실패, 원격 파싱으로 전환합니다: {e}", file=sys.stderr)
+        return parse_whole_document_remote(input_file)
+
+    local_pages = len({el["page"] for el in elements})
+    print(f"[Step 1] 로컬 텍스트 레이어 사용: {local_pages}페이지, 원격 OCR 필요: {len(ocr_pages)}페이지", file=sys.stderr)
+
+    if ocr_pages and not elements:
+        # 전체가 스캔본이면 원본 파일 그대로 파싱
+        return parse_whole_document_remote(input_file)
+    if ocr_pages:
+        elements.extend(parse_pdf_pages_remote(input_file, ocr_pages))
+    return finalize_elements(elements)
+
 def structure_parsed_json(parsed_data, doc_id):
     """파싱된 JSON 객체를 받아, 정제된 재료 리스트를 반환합니다."""
     
@@ -133,56 +209,131 @@ def structure_parsed_json(parsed_data, doc_id):
     print(f"[Step 2] 정제 완료. {len(structured_chunks)}개 재료 생성.", file=sys.stderr)
     return structured_chunks
 
+def post_solar_chat(prompt):
+    """Solar LLM에 프롬프트 하나를 요청하고 응답 텍스트를 반환합니다. (응답 캐시 사용, 실패 시 예외 발생)"""
+    payload = {
+        "model": "solar-pro2",
+        "messages": [{"role": "user", "content": prompt}]
+    }
+    
+    return solar_chat_completion(payload, timeout=60).strip()
+
 # --- [ 수정: task 인자를 받아 HTML 요약 또는 텍스트 요약 수행 ] ---
 def call_solar_llm(content, task="table_chart"):
-    """requests를 사용해 Solar LLM을 호출하여 HTML을 요약하거나 텍스트를 요약합니다."""
+    """Solar LLM을 호출하여 HTML을 요약합니다. (공용 Upstage 클라이언트 사용, 청크 요약은 common/chunkSummary.py)"""
     
     # task에 따라 프롬프트 선택
     if task == "table_chart":
         formatted_prompt = PROMPT_TABLE_CHART.format(HTML_DATA=content)
-    elif task == "summary":
-        if not content or content.isspace(): # 내용이 없거나 공백만 있는 경우
-            return ""
-        formatted_prompt = PROMPT_SUMMARY.format(CHUNK_TEXT=content)
     else:
         return content # 알 수 없는 task일 경우 원본 내용 반환
 
     try:
-        payload = {
-            "model": "solar-pro2",
-            "messages": [{"role": "user", "content": formatted_prompt}]
-        }
-        
-        response = requests.post(
-            SOLAR_LLM_ENDPOINT,
-            headers=SOLAR_LLM_HEADERS,
-            json=payload
-        )
-        response.raise_for_status()
-        
-        return response.json()['choices'][0]['message']['content'].strip()
+        return post_solar_chat(formatted_prompt)
         
     except Exception as e:
         print(f"  > [LLM Error] Solar 2 Pro 호출 실패 ({task}): {e}", file=sys.stderr)
         return f"[LLM 오류: {task} 처리 실패]"
 
+def call_solar_llm_concurrently(contents, task):
+    """여러 내용을 Solar LLM에 동시에 요청하고, 입력 순서대로 결과를 반환합니다. (동시 호출 수 제한)"""
+    if not contents:
+        return []
+    max_workers = max(1, min(SOLAR_LLM_MAX_WORKERS, len(contents)))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(lambda content: call_solar_llm(content, task=task), contents))
+
+def filter_boilerplate_elements(structured_elements):
+    """
+    여러 페이지에 반복되는 머리글/바닥글/쪽 번호 줄을 제거하고,
+    내용이 거의 없는 표/차트(LLM 변환 생략)와 그림 OCR 조각을 제외합니다.
+    """
+    page_texts = defaultdict(list)
+    for el in structured_elements:
+        if el["category"] not in ["table", "chart"]:
+            page_texts[el["page"]].append(el["content_to_process"])
+    repeated_lines = find_repeated_lines(page_texts)
+
+    kept_elements = []
+    removed_lines = skipped_tables = dropped_fragments = 0
+    for el in structured_elements:
+        if el["category"] in ["table", "chart"]:
+            table_text = BeautifulSoup(el["content_to_process"], 'html.parser').get_text(separator=" ", strip=True)
+            if is_low_information(table_text):
+                skipped_tables += 1
+                continue
+        else:
+            text, removed = strip_lines(el["content_to_process"], repeated_lines)
+            removed_lines += removed
+            if not text or (el["category"] == "figure" and is_low_information(text)):
+                dropped_fragments += 1
+                continue
+            el["content_to_process"] = text
+        kept_elements.append(el)
+
+    print(
+        f"  - 반복 문구 {len(repeated_lines)}종 {removed_lines}줄 제거, 빈 조각 {dropped_fragments}개 제외, "
+        f"내용 없는 표/차트 {skipped_tables}개 LLM 변환 생략", file=sys.stderr
+    )
+    return kept_elements
+
+def add_page_and_document_summaries(chunks, page_texts, doc_id):
+    """
+    페이지 요약과 문서 요약을 만들어 추가합니다. (실패한 요약은 생략)
+    page_summary는 각 페이지의 첫 청크에만, doc_summary는 문서의 첫 청크에만 넣어 문서/페이지당 한 번만 저장합니다.
+    """
+    title = os.path.splitext(os.path.basename(doc_id))[0]
+    chunk_summaries = defaultdict(list)
+    for chunk in chunks:
+        if chunk.get("summary"):
+            chunk_summaries[chunk["page"]].append(chunk["summary"])
+
+    page_summaries = summarize_pages(page_texts, title, chunk_summaries)
+    try:
+        document_summary = reduce_summaries([page_summaries[page] for page in sorted(page_summaries)], title, kind="문서")
+    except Exception as e:
+        print(f"  > [LLM Error] 문서 요약 실패: {e}", file=sys.stderr)
+        document_summary = ""
+    print(f"  - 페이지 요약 {len(page_summaries)}개, 문서 요약 {'생성' if document_summary else '실패'}", file=sys.stderr)
+
+    first_chunks = {}
+    for chunk in chunks:
+        first_chunks.setdefault(chunk["page"], chunk)
+    for page, chunk in first_chunks.items():
+        if page in page_summaries:
+            chunk["page_summary"] = page_summaries[page]
+    if document_summary and first_chunks:
+        first_chunks[min(first_chunks)]["doc_summary"] = document_summary
+
 # output_chunk_file 인자 제거
 def group_and_chunk_by_page(structured_elements, doc_id): 
     """정제된 재료 리스트를 받아, 페이지 그룹핑, LLM 요약/변환을 수행하고 최종 청크 리스트를 stdout으로 출력합니다."""
     
     print(f"[Step 3] 페이지 그룹핑 및 LLM 처리 시작...", file=sys.stderr)
     
+    # 0. 반복 머리글/바닥글/쪽 번호 제거 및 빈 표/그림 조각 제외 (요약/임베딩 대상에서 빠짐)
+    if BOILERPLATE_FILTER:
+        structured_elements = filter_boilerplate_elements(structured_elements)
+
     pages_data = defaultdict(list)
     for el in structured_elements:
         pages_data[el["page"]].append(el)
 
     final_chunks_for_embedding = []
-    MAX_CHUNK_CHAR_LENGTH = 1500 
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=MAX_CHUNK_CHAR_LENGTH, chunk_overlap=150,
-        length_function=len, separators=["\n\n", "\n", " ", ""]
-    )
-
+    page_texts = [] # (페이지 번호, 페이지 텍스트): 페이지/문서 요약 입력
+    MAX_CHUNK_CHAR_LENGTH = 1500 # TOKEN_AWARE_CHUNKING=0일 때의 청크 크기 (기본은 CHUNK_TOKEN_BUDGET 토큰)
+    text_splitter = make_text_splitter(MAX_CHUNK_CHAR_LENGTH, 150, separators=["\n\n", "\n", " ", ""])
+
+    # 1. 테이블/차트 LLM 변환을 전체 문서에 대해 한 번에 동시 요청
+    table_elements = [
+        el for _, page_elements in sorted(pages_data.items())
+        for el in page_elements if el["category"] in ["table", "chart"]
+    ]
+    print(f"  - 테이블/차트 {len(table_elements)}개 LLM 변환 중... (동시 {SOLAR_LLM_MAX_WORKERS}개)", file=sys.stderr)
+    table_texts = call_solar_llm_concurrently([el["content_to_process"] for el in table_elements], task="table_chart")
+    table_text_by_element = {id(el): text for el, text in zip(table_elements, table_texts)}
+
+    # 2. 페이지별 텍스트 구성 및 청크 분할 (요약은 아래에서 일괄 처리)
     for page_num, page_elements in sorted(pages_data.items()):
         print(f"  - 페이지 {page_num} 처리 중...", file=sys.stderr)
         page_content_buffer = []
@@ -192,7 +343,7 @@ def group_and_chunk_by_page(structured_elements, doc_id):
             
             # 테이블/차트는 LLM 요약으로 변환
             if category in ["table", "chart"]:
-                processed_text = call_solar_llm(content, task="table_chart") # task='table_chart'
+                processed_text = table_text_by_element.get(id(el))
                 if processed_text: page_content_buffer.append(f"[{category.upper()} 요약]: {processed_text}")
             # 일반 텍스트 및 이미지 OCR은 그대로 추가
             elif category in ["heading1", "paragraph", "list", "caption", "equation", "figure"]:
@@ -202,41 +353,47 @@ def group_and_chunk_by_page(structured_elements, doc_id):
 
         if not full_page_text:
             continue
+        page_texts.append((page_num, full_page_text))
             
         full_document_content = full_page_text
 
-        # 1. 페이지 전체가 청크 크기 제한을 초과하지 않는 경우 (단일 청크)
-        if len(full_document_content) <= MAX_CHUNK_CHAR_LENGTH * 1.1:
+        # 2-1. 페이지 전체가 청크 크기 제한을 초과하지 않는 경우 (단일 청크)
+        if text_length(full_document_content) <= chunk_limit(MAX_CHUNK_CHAR_LENGTH) * 1.1:
             if full_document_content.strip():
-                # --- [추가] 요약 생성 ---
-                summary_text = call_solar_llm(full_document_content, task="summary")
-                
                 final_chunks_for_embedding.append({
                     "doc_id": doc_id, 
                     "page": page_num, 
                     "chunk_in_page": 0,
                     "text_for_embedding": full_document_content,
-                    "summary": summary_text # <--- summary 필드 추가
                 })
-        # 2. 페이지를 분할해야 하는 경우
+        # 2-2. 페이지를 분할해야 하는 경우
         else:
             print(f"    > 페이지 {page_num} 분할...", file=sys.stderr)
             # 문맥 없는 텍스트만 분할
             text_chunks = text_splitter.split_text(full_page_text)
             for i, chunk_text in enumerate(text_chunks):
-                chunk_content = chunk_text # 순수한 내용만
-
-                # --- [추가] 요약 생성 ---
-                summary_text = call_solar_llm(chunk_content, task="summary")
-
                 final_chunks_for_embedding.append({
                     "doc_id": doc_id, 
                     "page": page_num, 
                     "chunk_in_page": i,
-                    "text_for_embedding": chunk_content,
-                    "summary": summary_text # <--- summary 필드 추가
+                    "text_for_embedding": chunk_text, # 순수한 내용만
                 })
 
+    # 3. 청크 요약 생성 (여러 청크를 한 요청으로 묶어 동시 요청, 출력 순서 유지)
+    # LAZY_CHUNK_SUMMARY=1이면 생략하고, 클러스터 대표 청크로 선택될 때 생성 (common/chunkSummary.py)
+    if LAZY_CHUNK_SUMMARY:
+        print(f"  - 청크 요약 생략 (필요할 때 생성)", file=sys.stderr)
+    else:
+        print(f"  - 청크 {len(final_chunks_for_embedding)}개 요약 생성 중... (동시 {SOLAR_LLM_MAX_WORKERS}개)", file=sys.stderr)
+        summaries = summarize_chunks([chunk["text_for_embedding"] for chunk in final_chunks_for_embedding])
+        for chunk, summary_text in zip(final_chunks_for_embedding, summaries):
+            if summary_text:
+                chunk["summary"] = summary_text # <--- summary 필드 추가
+
+    # 4. SUMMARY_HIERARCHY=1이면 페이지 요약 -> 문서 요약 (map-reduce, common/mapReduceSummary.py). 청크 요약이 있으면 페이지 요약에 재사용
+    if SUMMARY_HIERARCHY and page_texts:
+        add_page_and_document_summaries(final_chunks_for_embedding, page_texts, doc_id)
+
     # 최종 청크 리스트를 JSON 문자열로 stdout에 출력
     print(json.dumps(final_chunks_for_embedding, ensure_ascii=False)) 
 
@@ -248,7 +405,12 @@ def group_and_chunk_by_page(structured_elements, doc_id):
 # -----------------------------
 if __name__ == "__main__":
     try:
-        # file_path는 이미 위에서 sys.argv[1]로 설정됨
+        file_path = sys.argv[1] # 명령줄 인자로 경로 받음
+    except IndexError:
+        print("오류: 처리할 파일 경로를 명령줄 인자로 제공해야 합니다.", file=sys.stderr)
+        sys.exit(1)
+
+    try:
         if not os.path.exists(file_path):
             print(f"오류: PDF/DOCX/PPTX 파일을 찾을 수 없습니다: {file_path}", file=sys.stderr)
             sys.exit(1)
@@ -256,8 +418,8 @@ if __name__ == "__main__":
             # 1. doc_id를 파일의 절대 경로로 설정 (고유성 보장)
             absolute_path = os.path.abspath(file_path)
             
-            # 2. API 파싱 (메모리로 반환)
-            parsed_data = call_document_parse(file_path)
+            # 2. 파싱 (로컬 텍스트 레이어 우선, 필요한 페이지만 API 파싱 / 메모리로 반환)
+            parsed_data = parse_document(file_path)
             
             # 3. 텍스트 정제 (메모리로 반환)
             structured_data = structure_parsed_json(parsed_data, absolute_path)
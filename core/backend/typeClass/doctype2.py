@@ -4,11 +4,17 @@ pip install langchain-text-splitters requests
 """
 
 import json
+import math
 import os
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from itertools import chain
 import sys 
 import requests # <--- 추가: LLM 호출을 위해 requests 모듈 추가
-from core.config import SOLAR_API_KEY
+from core.backend.common.llmCache import solar_chat_completion
+from core.backend.common.streamOutput import JsonArrayWriter
+from core.backend.common.textStream import detect_encoding, iter_text_blocks, iter_split_text
+from core.backend.common.mapReduceSummary import summarize_document, split_segments, make_segment_splitter
+from core.backend.common.tokenBudget import make_text_splitter
+from core.config import SUMMARY_SEGMENT_CHARS
 # ----------------------------- 
 # 1. 설정 (LLM API 설정 추가)
 # -----------------------------
@@ -24,48 +30,44 @@ except IndexError:
 base_name = os.path.basename(file_path)
 file_name_without_extension = os.path.splitext(base_name)[0]
 
-MAX_CHUNK_CHAR_LENGTH = 1500 
+MAX_CHUNK_CHAR_LENGTH = 1500 # TOKEN_AWARE_CHUNKING=0일 때의 청크 크기 (기본은 CHUNK_TOKEN_BUDGET 토큰)
+SPLIT_WINDOW_CHARS = MAX_CHUNK_CHAR_LENGTH * 100 # 한 번에 분할할 텍스트 창 크기 (이 크기 단위로 스트리밍 분할)
 
-# API 키 및 엔드포인트
-SOLAR_LLM_ENDPOINT = "https://api.upstage.ai/v1/chat/completions"
-
-# Solar API 직접 호출을 위한 헤더
-SOLAR_LLM_HEADERS = {
-    "Authorization": f"Bearer {SOLAR_API_KEY}",
-    "Content-Type": "application/json"
-}
 
 # -----------------------------
 # 2. 문서 전체 요약 함수 (새로 추가)
 # -----------------------------
 
-def call_solar_file_summary(file_name: str, full_text: str) -> str:
-    """Solar LLM을 호출하여 전체 파일을 요약합니다. 파일 크기가 클 경우 일부만 사용합니다."""
+def call_solar_file_summary(file_name: str, full_text: str, segments=None, estimated_segments=None) -> str:
+    """
+    Solar LLM을 호출하여 전체 파일을 요약합니다.
+    파일이 길면(segments가 주어지면) 앞부분만 자르지 않고 구간별 요약을 합쳐 문서 전체를 요약합니다. (map-reduce)
+    """
     
-    # LLM 프롬프트에 들어갈 최대 텍스트 길이 (10,000자 제한)
-    MAX_PROMPT_TEXT_LENGTH = 1500
+    # 한 번의 프롬프트에 전체 내용을 넣을 최대 텍스트 길이
+    MAX_PROMPT_TEXT_LENGTH = SUMMARY_SEGMENT_CHARS
     
     # 파일 제목 포함
     prompt_text = f"문서 제목: {file_name}\n\n내용:\n{full_text}"
     
     # 1. 길이 체크 및 프롬프트 생성
-    if len(prompt_text) > MAX_PROMPT_TEXT_LENGTH:
-        # 텍스트가 너무 길면 앞부분만 사용
-        truncated_content = prompt_text[:MAX_PROMPT_TEXT_LENGTH]
-        print(f"[LLM] 파일 크기가 커서 텍스트 앞 {MAX_PROMPT_TEXT_LENGTH}자만 사용합니다.", file=sys.stderr)
-        
-        prompt = f"""다음은 문서의 제목과 내용의 시작 부분입니다.
-이 정보를 바탕으로 문서 전체의 주제와 핵심 내용을 3문장 이내로 간결하게 요약해 주세요.
-
-[문서 정보]
----
-{truncated_content}
----
+    if segments is not None or len(prompt_text) > MAX_PROMPT_TEXT_LENGTH:
+        # 텍스트가 길면 구간별 요약 -> 통합 요약
+        try:
+            summary = summarize_document(
+                segments if segments is not None else split_segments(full_text),
+                file_name, kind="문서", estimated_total=estimated_segments
+            )
+        except (requests.exceptions.RequestException, KeyError, IndexError) as e:
+            print(f"[LLM 요약 오류] 요청 실패 또는 응답 형식 오류: {e}", file=sys.stderr)
+            summary = ""
+        if not summary:
+            return f"[문서 요약 실패: {file_name}]"
+        print(f"[LLM] 문서 요약 완료. (요약 길이: {len(summary)}자)", file=sys.stderr)
+        return summary
 
-문서 전체 요약:"""
-    else:
-        # 전체 텍스트 사용
-        prompt = f"""다음은 문서의 전체 내용입니다. 
+    # 전체 텍스트 사용
+    prompt = f"""다음은 문서의 전체 내용입니다. 
 이 문서의 주제와 핵심 내용을 3문장 이내로 간결하게 요약해 주세요.
 
 [문서 전체 내용]
@@ -87,11 +89,7 @@ def call_solar_file_summary(file_name: str, full_text: str) -> str:
     
     try:
         print(f"[LLM] 문서 전체 요약 요청 중...", file=sys.stderr)
-        response = requests.post(SOLAR_LLM_ENDPOINT, headers=SOLAR_LLM_HEADERS, json=payload, timeout=60)
-        response.raise_for_status()
-        
-        response_json = response.json()
-        summary = response_json['choices'][0]['message']['content'].strip()
+        summary = solar_chat_completion(payload, timeout=60).strip()
         print(f"[LLM] 문서 요약 완료. (요약 길이: {len(summary)}자)", file=sys.stderr)
         return summary
         
@@ -109,9 +107,11 @@ def process_text_file(input_file, doc_id, file_name_prefix):
     최종 임베딩용 JSON을 stdout으로 출력합니다.
     """
     
+    # 1. 인코딩 감지 (앞부분 표본 기준: BOM / UTF-8 / CP949 / charset_normalizer)
     try:
-        with open(input_file, "r", encoding="utf-8") as f:
-            full_text = f.read()
+        encoding = detect_encoding(input_file)
+        blocks = iter_text_blocks(input_file, encoding)
+        first_block = next(blocks, "")
     except FileNotFoundError:
         print(f"오류: '{input_file}'을 찾을 수 없습니다.", file=sys.stderr)
         return
@@ -119,45 +119,57 @@ def process_text_file(input_file, doc_id, file_name_prefix):
         print(f"파일 읽기 오류: {e}", file=sys.stderr)
         return
 
-    if not full_text.strip():
+    print(f"  > 감지된 인코딩: {encoding}", file=sys.stderr)
+
+    # 첫 블록이 공백뿐이면 내용이 나올 때까지 읽음 (공백만 있는 파일은 중단)
+    head_blocks = [first_block]
+    while head_blocks[-1] and not "".join(head_blocks).strip():
+        head_blocks.append(next(blocks, ""))
+    head_text = "".join(head_blocks)
+
+    if not head_text.strip():
         print(f"오류: '{input_file}'의 내용이 비어있어 처리를 중단합니다.", file=sys.stderr)
         return
 
-    # 🌟 1. 문서 전체 요약 생성 (LLM 호출) 🌟
-    document_summary = call_solar_file_summary(file_name_prefix, full_text)
-    
-    # 2. 청크 분할 (기존 로직)
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=MAX_CHUNK_CHAR_LENGTH, chunk_overlap=150,
-        length_function=len, separators=["\n\n", "\n", " ", ""]
-    )
-    text_chunks = text_splitter.split_text(full_text)
+    # 다음 블록이 없으면 파일 전체가 이미 메모리에 있음
+    next_block = next(blocks, "")
+    blocks = chain([next_block], blocks)
+
+    # 🌟 2. 문서 전체 요약 생성 (LLM 호출, 긴 파일은 파일을 한 번 더 스트리밍하며 구간별 map-reduce) 🌟
+    if next_block:
+        segments = iter_split_text(iter_text_blocks(input_file, encoding), make_segment_splitter(), SPLIT_WINDOW_CHARS)
+        # 구간 크기는 문자 수 기준이므로, 앞부분 표본의 바이트당 문자 수로 파일 전체 문자 수를 추정
+        chars_per_byte = len(head_text) / max(1, len(head_text.encode(encoding, errors="replace")))
+        estimated_segments = math.ceil(os.path.getsize(input_file) * chars_per_byte / SUMMARY_SEGMENT_CHARS)
+        document_summary = call_solar_file_summary(file_name_prefix, "", segments, estimated_segments)
+    else:
+        document_summary = call_solar_file_summary(file_name_prefix, head_text)
     
-    if not text_chunks:
-        print(f"오류: 텍스트 분할 결과 청크가 없어 처리를 중단합니다.", file=sys.stderr)
-        return
-
-    print(f"  > 텍스트를 총 {len(text_chunks)}개 청크로 분할했습니다.", file=sys.stderr)
+    # 3. 청크 분할 (기존 분할 규칙을 창 단위로 스트리밍 적용)
+    text_splitter = make_text_splitter(MAX_CHUNK_CHAR_LENGTH, 150, separators=["\n\n", "\n", " ", ""])
+    text_chunks = iter_split_text(chain([head_text], blocks), text_splitter, SPLIT_WINDOW_CHARS)
 
-    # 3. 최종 JSON 형식으로 변환 (summary 필드 추가)
-    final_chunks_for_embedding = []
+    # 4. 청크를 만들어지는 즉시 JSON 배열 원소로 출력 (summary 필드 추가)
+    writer = JsonArrayWriter()
     for i, chunk_text in enumerate(text_chunks):
         
         final_text_to_embed = f"파일 제목: {file_name_prefix}\n\n내용: {chunk_text}"
         
-        final_chunks_for_embedding.append({
+        writer.write({
             "doc_id": doc_id,
             "page": 1,
             "chunk_in_page": i,
             "text_for_embedding": final_text_to_embed,
             "summary": document_summary # <--- 💡 문서 전체 요약을 모든 청크에 추가
         })
+    writer.close()
 
-    # <--- 핵심 수정: 최종 청크 리스트를 JSON 문자열로 stdout에 출력
-    print(json.dumps(final_chunks_for_embedding, ensure_ascii=False)) 
+    if not writer.count:
+        print(f"오류: 텍스트 분할 결과 청크가 없어 처리를 중단합니다.", file=sys.stderr)
+        return
     
     # 로그는 stderr로 출력
-    print(f"\n[텍스트 처리] 최종 청킹 완료! (파일 제목 포함) {len(final_chunks_for_embedding)}개 청크 생성.", file=sys.stderr)
+    print(f"\n[텍스트 처리] 최종 청킹 완료! (파일 제목 포함) {writer.count}개 청크 생성.", file=sys.stderr)
 
 # -----------------------------
 # 4. 실행 (기존 로직 유지)
@@ -7,11 +7,15 @@ xlsx,csv
 import pandas as pd
 import json
 import os
-import requests
+import openpyxl
+import math
 from io import StringIO
-from collections import defaultdict
+from collections import Counter, defaultdict
+from itertools import chain
 import sys 
-from core.config import SOLAR_API_KEY
+from core.backend.common.llmCache import solar_chat_completion
+from core.backend.common.streamOutput import JsonArrayWriter
+from core.backend.common.tokenBudget import text_length, chunk_limit, chunk_length_function, group_lines, LENGTH_UNIT
 
 # -----------------------------
 # 1. 설정 (기존 유지)
@@ -29,14 +33,13 @@ except IndexError:
 base_name = os.path.basename(file_path)
 file_name_prefix = os.path.splitext(base_name)[0]
 
-
-SOLAR_LLM_ENDPOINT = "https://api.upstage.ai/v1/chat/completions"
-SOLAR_LLM_HEADERS = {
-    "Authorization": f"Bearer {SOLAR_API_KEY}",
-    "Content-Type": "application/json"
-}
-
-ROWS_PER_CHUNK = 5 # 상세 청크당 묶을 행의 개수
+ROWS_PER_CHUNK = 5 # 요약 샘플 행 수 및 상세 청크당 최소 행 수
+MAX_ROWS_PER_CHUNK = 200 # 상세 청크당 최대 행 수
+TARGET_CHUNK_CHARS = 1500 # 상세 청크 하나의 목표 문자 수 (행 너비로 청크당 행 수를 결정, TOKEN_AWARE_CHUNKING=1이면 CHUNK_TOKEN_BUDGET 토큰)
+MAX_BLOCK_CHUNKS = 300 # 파일당 상세 블록 청크 상한 (시트 첫 블록 제외. 초과 시 블록 간격을 두 배로 늘려 전체 행에서 균등 표본 추출)
+READ_CHUNK_ROWS = 10000 # 파일에서 한 번에 읽어 메모리에 올릴 최대 행 수 (CSV chunksize / XLSX 행 스트리밍)
+DISTINCT_TRACK_LIMIT = 1000 # 열별로 추적할 고유값 최대 개수 (초과 시 상위 값만 유지)
+TOP_VALUES_PER_COLUMN = 5 # 열 통계 청크에 표시할 상위 값 개수
 
 # -----------------------------
 # 2. LLM 프롬프트 및 호출 함수 (기존 유지)
@@ -70,11 +73,8 @@ def call_solar_llm_for_data_summary(file_name_prefix, column_names_str, data_sam
             "messages": [{"role": "user", "content": formatted_prompt}]
         }
         
-        # API 호출
-        response = requests.post(SOLAR_LLM_ENDPOINT, headers=SOLAR_LLM_HEADERS, json=payload)
-        response.raise_for_status() 
-        
-        return response.json()['choices'][0]['message']['content']
+        # API 호출 (같은 파일 제목/열/샘플이면 캐시된 요약 사용)
+        return solar_chat_completion(payload, timeout=60)
         
     except Exception as e:
         print(f"  > [LLM Error] Solar LLM 요약 호출 실패: {e}", file=sys.stderr)
@@ -82,7 +82,208 @@ def call_solar_llm_for_data_summary(file_name_prefix, column_names_str, data_sam
 
 
 # -----------------------------
-# 3. 데이터 처리 메인 함수 (수정: summary 필드 추가)
+# 3. 스트리밍 로더 (파일 크기와 무관하게 메모리 사용 제한)
+# -----------------------------
+
+def iter_csv_frames(input_file):
+    """CSV를 READ_CHUNK_ROWS 행씩 읽어 (시트 이름, DataFrame)을 반환합니다. (CSV는 시트 이름 None)"""
+    for frame in pd.read_csv(input_file, chunksize=READ_CHUNK_ROWS):
+        yield None, frame
+
+def iter_excel_frames(input_file):
+    """엑셀의 모든 시트를 행 단위로 스트리밍하여 READ_CHUNK_ROWS 행씩 (시트 이름, DataFrame)을 반환합니다."""
+    if input_file.lower().endswith('.xls'):
+        # 구형 .xls는 openpyxl 스트리밍을 지원하지 않으므로 시트 단위로 로드
+        for sheet_name, frame in pd.read_excel(input_file, sheet_name=None).items():
+            yield sheet_name, frame
+        return
+
+    workbook = openpyxl.load_workbook(input_file, read_only=True, data_only=True)
+    try:
+        for worksheet in workbook.worksheets:
+            header = None
+            rows = []
+            for values in worksheet.iter_rows(values_only=True):
+                if all(value is None for value in values):
+                    continue
+                # 첫 번째 비어있지 않은 행을 헤더로 사용 (pd.read_excel과 동일)
+                if header is None:
+                    width = max(i for i, value in enumerate(values) if value is not None) + 1  # 뒤쪽 빈 열 제외
+                    header = [str(value) if value is not None else f"Unnamed: {i}" for i, value in enumerate(values[:width])]
+                    continue
+                row = list(values[:len(header)])
+                row += [None] * (len(header) - len(row))
+                rows.append(row)
+                if len(rows) >= READ_CHUNK_ROWS:
+                    yield worksheet.title, pd.DataFrame(rows, columns=header)
+                    rows = []
+            if rows:
+                yield worksheet.title, pd.DataFrame(rows, columns=header)
+    finally:
+        workbook.close()
+
+def iter_row_blocks(frames, rows_per_block):
+    """
+    읽어 들인 DataFrame 조각들을 시트별로 rows_per_block 행씩 잘라 (시트 이름, 블록 DataFrame, 시트 내 시작 행)을 반환합니다.
+    """
+    current_sheet = object()
+    buffer = None
+    row_offset = 0
+
+    for sheet_name, frame in frames:
+        if sheet_name != current_sheet:
+            if buffer is not None and len(buffer):
+                yield current_sheet, buffer, row_offset
+            current_sheet, buffer, row_offset = sheet_name, None, 0
+
+        buffer = frame if buffer is None else pd.concat([buffer, frame], ignore_index=True)
+        while len(buffer) >= rows_per_block:
+            yield sheet_name, buffer.iloc[:rows_per_block], row_offset
+            row_offset += rows_per_block
+            buffer = buffer.iloc[rows_per_block:]
+
+    if buffer is not None and len(buffer):
+        yield current_sheet, buffer, row_offset
+
+def measure_row_width(frame):
+    """샘플 행을 CSV로 직렬화했을 때의 행당 평균 (청크 길이: 토큰 또는 문자 수, UTF-8 바이트 수)"""
+    sample = frame.head(200)
+    sample_text = sample.to_csv(index=False, header=False)
+    rows = max(1, len(sample))
+    return text_length(sample_text) / rows, len(sample_text.encode("utf-8")) / rows
+
+def choose_rows_per_chunk(avg_row_length):
+    """행 너비에 맞춰 청크 하나가 청크 크기 상한(토큰 예산 또는 TARGET_CHUNK_CHARS)에 가깝도록 청크당 행 수를 정합니다."""
+    rows = int(chunk_limit(TARGET_CHUNK_CHARS) // max(1.0, avg_row_length))
+    return max(ROWS_PER_CHUNK, min(MAX_ROWS_PER_CHUNK, rows))
+
+def estimate_total_rows(input_file, avg_row_bytes):
+    """전체 행 수 추정 (CSV: 파일 크기 / 행 바이트, XLSX: 시트 dimension). 알 수 없으면 None"""
+    file_extension = os.path.splitext(input_file)[1].lower()
+    if file_extension == '.csv':
+        return int(os.path.getsize(input_file) / max(1.0, avg_row_bytes))
+    if file_extension == '.xlsx':
+        workbook = openpyxl.load_workbook(input_file, read_only=True)
+        try:
+            max_rows = [worksheet.max_row for worksheet in workbook.worksheets]
+        finally:
+            workbook.close()
+        return None if any(rows is None for rows in max_rows) else sum(max_rows)
+    return None
+
+class ColumnProfile:
+    """시트 하나의 열별 통계를 읽은 조각 단위로 누적합니다. (수치형: 벡터 연산 / 범주형: 고유값 빈도)"""
+
+    def __init__(self):
+        self.rows = 0
+        self.columns = []
+        self.nulls = Counter()
+        self.numeric = {} # {열: [개수, 합, 제곱합, 최소, 최대]}
+        self.distinct = defaultdict(Counter) # {열: Counter(값 -> 빈도)}
+        self.distinct_overflow = set()
+
+    def update(self, frame):
+        self.rows += len(frame)
+        for column in frame.columns:
+            if column not in self.columns:
+                self.columns.append(column)
+        self.nulls.update(frame.isna().sum().to_dict())
+
+        numeric_frame = frame.select_dtypes(include="number")
+        if not numeric_frame.empty:
+            stats = numeric_frame.agg(["count", "sum", "min", "max"])
+            squares = (numeric_frame.astype(float) ** 2).sum()
+            for column in numeric_frame.columns:
+                count, total, low, high = stats[column]
+                if not count:
+                    continue
+                if column not in self.numeric:
+                    self.numeric[column] = [0, 0.0, 0.0, low, high]
+                entry = self.numeric[column]
+                entry[0] += count
+                entry[1] += total
+                entry[2] += squares[column]
+                entry[3] = min(entry[3], low)
+                entry[4] = max(entry[4], high)
+
+        for column in frame.columns.difference(numeric_frame.columns):
+            counter = self.distinct[column]
+            counter.update(frame[column].dropna().astype(str).value_counts().to_dict())
+            if len(counter) > DISTINCT_TRACK_LIMIT:
+                self.distinct[column] = Counter(dict(counter.most_common(DISTINCT_TRACK_LIMIT)))
+                self.distinct_overflow.add(column)
+
+    def describe_lines(self):
+        lines = []
+        for column in self.columns:
+            null_count = self.nulls.get(column, 0)
+            if column in self.numeric:
+                count, total, square_total, low, high = self.numeric[column]
+                mean = total / count
+                std = math.sqrt(max(0.0, square_total / count - mean ** 2))
+                lines.append(f"- {column}: 수치형, 값 {int(count)}개, 평균 {mean:.4g}, 표준편차 {std:.4g}, 최소 {low}, 최대 {high}, 결측 {null_count}")
+            elif column in self.distinct:
+                counter = self.distinct[column]
+                distinct_text = f"{DISTINCT_TRACK_LIMIT}개 이상" if column in self.distinct_overflow else f"{len(counter)}개"
+                top_values = ", ".join(f"{value}({freq})" for value, freq in counter.most_common(TOP_VALUES_PER_COLUMN))
+                lines.append(f"- {column}: 범주형, 고유값 {distinct_text}, 상위 값: {top_values}, 결측 {null_count}")
+            else:
+                lines.append(f"- {column}: 값 없음 (결측 {null_count})")
+        return lines
+
+class BlockSampler:
+    """
+    행 블록을 MAX_BLOCK_CHUNKS 개 이하로 계통 추출합니다. (추정 행 수가 없거나 틀려도 끝까지 읽은 행 전체에서 균등하게 유지)
+
+    - 시트마다 첫 블록은 항상 유지 (헤더와 시트 존재를 보장)
+    - 나머지 블록은 step 간격으로 유지하고, 상한에 닿으면 유지된 블록을 하나 건너 하나씩 버리고 step을 두 배로 늘림
+    - 블록은 CSV 텍스트(헤더 제외)로만 보관하므로 메모리는 상한 개수의 청크 텍스트 크기로 제한됨
+    """
+
+    def __init__(self, max_blocks):
+        self.max_blocks = max_blocks
+        self.step = 1
+        self.seen = 0              # 시트 첫 블록을 제외하고 지금까지 본 블록 수
+        self.sheet_heads = {}      # 시트 이름 -> (헤더 CSV 텍스트, 첫 블록)
+        self.sampled = []          # (본 순서, 블록). 블록 = (시트 이름, 시작 행, 블록 행 수, 추출 행 수, CSV 텍스트)
+        self.dropped_rows = 0      # 표본에서 빠진 블록의 행 수 (열 통계에는 반영됨)
+
+    def add(self, sheet_name, block_df, row_start, chunk_df):
+        if sheet_name not in self.sheet_heads:
+            header_text = chunk_df.head(0).to_csv(index=False)
+            self.sheet_heads[sheet_name] = (header_text, self._block(sheet_name, block_df, row_start, chunk_df))
+            return
+        position = self.seen
+        self.seen += 1
+        if position % self.step:
+            self.dropped_rows += len(block_df)
+            return
+        self.sampled.append((position, self._block(sheet_name, block_df, row_start, chunk_df)))
+        if len(self.sampled) > self.max_blocks:
+            self.step *= 2
+            kept = []
+            for position, block in self.sampled:
+                if position % self.step:
+                    self.dropped_rows += block[2]
+                else:
+                    kept.append((position, block))
+            self.sampled = kept
+
+    def _block(self, sheet_name, block_df, row_start, chunk_df):
+        return sheet_name, row_start, len(block_df), len(chunk_df), chunk_df.to_csv(index=False, header=False).strip()
+
+    def blocks(self):
+        """(시트 이름, 시작 행, 블록 행 수, 추출 행 수, CSV 텍스트, 헤더 포함 여부)를 시트/행 순서대로 반환합니다."""
+        by_sheet = defaultdict(list)
+        for _, block in self.sampled:
+            by_sheet[block[0]].append(block)
+        for sheet_name, (header_text, head_block) in self.sheet_heads.items():
+            yield head_block + (header_text,)
+            for block in by_sheet[sheet_name]:
+                yield block + ("",)
+
+# -----------------------------
+# 4. 데이터 처리 메인 함수 (수정: 스트리밍 처리, 모든 시트 처리)
 # -----------------------------
 
 def process_data_file(input_file, doc_id): 
@@ -91,34 +292,56 @@ def process_data_file(input_file, doc_id):
     base_name = os.path.basename(input_file)
     file_name_prefix = os.path.splitext(base_name)[0]
     
-    df = None
-    final_chunks = []
-    
-    # 1. 파일 로드
+    # 1. 파일 스트리밍 로더 준비 및 첫 조각 읽기
     try:
         if file_extension == '.csv':
-            df = pd.read_csv(input_file)
+            frames = iter_csv_frames(input_file)
         elif file_extension in ['.xlsx', '.xls']:
-            df = pd.read_excel(input_file, engine='openpyxl')
+            frames = iter_excel_frames(input_file)
         else:
             print(f"오류: 지원하지 않는 데이터 파일 형식입니다.", file=sys.stderr)
             return
+        first_frame = next(frames, None)
     except Exception as e:
         print(f"오류: 파일을 pandas로 로드하는 데 실패했습니다. {e}", file=sys.stderr)
         return
 
-    print(f"\n[데이터 처리] '{base_name}' 로드 성공. (총 {len(df)} 행)", file=sys.stderr)
+    if first_frame is None or first_frame[1].empty:
+        print(f"오류: '{base_name}'에 데이터 행이 없어 처리를 중단합니다.", file=sys.stderr)
+        return
 
-    # 1-1. LLM에게 전달할 메타데이터 준비 (열 이름 추출)
-    column_names = df.columns.tolist()
+    print(f"\n[데이터 처리] '{base_name}' 스트리밍 로드 시작.", file=sys.stderr)
+
+    # 1-1. 행 너비와 예상 행 수로 블록 크기/표본 간격 결정
+    avg_row_length, avg_row_bytes = measure_row_width(first_frame[1])
+    rows_per_chunk = choose_rows_per_chunk(avg_row_length)
+    estimated_rows = estimate_total_rows(input_file, avg_row_bytes)
+    stride = 1
+    if estimated_rows:
+        estimated_blocks = math.ceil(estimated_rows / rows_per_chunk)
+        stride = max(1, math.ceil(estimated_blocks / MAX_BLOCK_CHUNKS))
+    print(f"  > 행당 약 {avg_row_length:.0f}{LENGTH_UNIT} → 청크당 {rows_per_chunk}행, 예상 행 수 {estimated_rows or '알 수 없음'}, 표본 간격 {stride}", file=sys.stderr)
+
+    # 1-2. LLM에게 전달할 메타데이터 준비 (열 이름 추출)
+    sample_df = first_frame[1].head(ROWS_PER_CHUNK)
+    column_names = [str(column) for column in sample_df.columns]
     column_names_str = ", ".join(column_names)
     print(f"  > 추출된 열 이름: {column_names_str}", file=sys.stderr)
 
+    # 1-3. 모든 행은 읽는 즉시 열 통계에 반영 (표본 추출과 무관하게 전체 데이터 기준)
+    profiles = {}
+    def profiled(frames):
+        for sheet_name, frame in frames:
+            profiles.setdefault(sheet_name, ColumnProfile()).update(frame)
+            yield sheet_name, frame
+
+    blocks = iter_row_blocks(profiled(chain([first_frame], frames)), rows_per_chunk * stride)
+
+    writer = JsonArrayWriter()
 
     # --- Layer 1: 요약 청크 (Chunk 0) ---
     
-    # 2. 샘플 추출 및 CSV 변환
-    sample_df = df.head(ROWS_PER_CHUNK)
+    # 2. 샘플 추출 및 CSV 변환 (첫 ROWS_PER_CHUNK 행)
     csv_buffer = StringIO()
     sample_df.to_csv(csv_buffer, index=False)
     data_sample_text = csv_buffer.getvalue()
@@ -126,8 +349,8 @@ def process_data_file(input_file, doc_id):
     # 3. LLM 요약 호출
     llm_summary_text = call_solar_llm_for_data_summary(file_name_prefix, column_names_str, data_sample_text)
     
-    # 4. Chunk 0 (요약) 최종 저장 (summary 필드 추가)
-    final_chunks.append({
+    # 4. Chunk 0 (요약) 즉시 출력 (summary 필드 추가)
+    writer.write({
         "doc_id": doc_id, 
         "page": 1, 
         "chunk_in_page": 0, 
@@ -138,44 +361,66 @@ def process_data_file(input_file, doc_id):
 
     # --- Layer 2: 상세 블록 청크 (Chunk 1+) ---
 
-    num_rows = len(df)
-    
-    # 5. 5행 단위(ROWS_PER_CHUNK)로 반복하며 블록 청크 생성
-    for i in range(0, num_rows, ROWS_PER_CHUNK):
-        chunk_df = df.iloc[i:i + ROWS_PER_CHUNK]
-        chunk_index = i // ROWS_PER_CHUNK + 1 
-        
-        # 6. 블록 데이터를 CSV 텍스트로 직렬화
-        csv_buffer = StringIO()
-        
-        # 첫 번째 상세 청크(Chunk 1)에만 헤더를 포함
-        include_header = (i == 0) 
-        
-        chunk_df.to_csv(csv_buffer, index=False, header=include_header)
-        data_block_text = csv_buffer.getvalue().strip()
+    # 5. 읽는 즉시 블록 표본 갱신 (모든 시트). 블록 안에서는 표본 간격(stride)으로 행을 균등하게 추출하고,
+    #    블록 수가 상한을 넘으면 BlockSampler가 블록 간격을 두 배로 늘려 나머지 행에서도 계속 표본을 뽑음
+    sampler = BlockSampler(MAX_BLOCK_CHUNKS)
+    for sheet_name, stratum_df, row_start in blocks:
+        sampler.add(sheet_name, stratum_df, row_start, stratum_df.iloc[::stride])
+
+    chunk_index = 0
+    for sheet_name, row_start, block_rows, sampled_rows, data_block_text, header_text in sampler.blocks():
+        chunk_index += 1
+
+        # 6. 각 시트의 첫 번째 상세 청크에만 헤더를 포함
+        if header_text:
+            data_block_text = header_text.strip() + "\n" + data_block_text
         
-        # 7. 최종 텍스트 포맷
-        final_text_to_embed = f"파일 제목: {file_name_prefix}\n\n[데이터 블록 {chunk_index} (행 {i+1}~{min(i+ROWS_PER_CHUNK, num_rows)})]\n{data_block_text}"
+        # 7. 최종 텍스트 포맷 (엑셀은 시트 이름 포함)
+        sheet_label = f"[시트: {sheet_name}] " if sheet_name is not None else ""
+        row_range = f"행 {row_start+1}~{row_start+block_rows}"
+        if sampled_rows < block_rows:
+            row_range += f" 구간에서 {sampled_rows}행 균등 추출"
+        final_text_to_embed = f"파일 제목: {file_name_prefix}\n\n{sheet_label}[데이터 블록 {chunk_index} ({row_range})]\n{data_block_text}"
         
-        # 8. Chunk 1+ (상세) 최종 저장 (summary 필드 추가)
-        final_chunks.append({
+        # 8. Chunk 1+ (상세) 출력 (summary 필드 추가)
+        writer.write({
             "doc_id": doc_id,
             "page": 1, 
             "chunk_in_page": chunk_index,
             "text_for_embedding": final_text_to_embed,
             "summary": llm_summary_text # <--- 💡 summary 필드 추가 (상세 청크) 💡
         })
+
+    total_rows = sum(profile.rows for profile in profiles.values())
+    print(f"[Layer 2] 상세 블록 청크 ({chunk_index}개) 생성 완료. (시트 {len(profiles)}개, 총 {total_rows} 행, 블록 간격 {sampler.step}, 표본 제외 {sampler.dropped_rows} 행)", file=sys.stderr)
+
+    # --- Layer 3: 열 통계 청크 (전체 행 기준 수치 통계 / 고유값 요약) ---
+    for sheet_name, profile in profiles.items():
+        sheet_label = f"[시트: {sheet_name}] " if sheet_name is not None else ""
+        header_text = f"파일 제목: {file_name_prefix}\n\n{sheet_label}[열 통계 (총 {profile.rows}행)]"
+        lines = profile.describe_lines()
+
+        # 열이 많으면 여러 청크로 나눔
+        groups = group_lines(lines, chunk_limit(TARGET_CHUNK_CHARS), chunk_length_function())
+
+        for group in groups:
+            chunk_index += 1
+            writer.write({
+                "doc_id": doc_id,
+                "page": 1,
+                "chunk_in_page": chunk_index,
+                "text_for_embedding": header_text + "\n" + "\n".join(group),
+                "summary": llm_summary_text
+            })
     
-    print(f"[Layer 2] 상세 블록 청크 ({len(final_chunks) - 1}개) 생성 완료.", file=sys.stderr)
-    
-    # <--- 핵심 수정: 최종 청크 리스트를 JSON 문자열로 stdout에 출력
-    print(json.dumps(final_chunks, ensure_ascii=False)) 
-    
-    print(f"\n[최종] 총 {len(final_chunks)}개 청크 생성 완료.", file=sys.stderr)
+    writer.close()
+
+    print(f"[Layer 3] 열 통계 청크 생성 완료.", file=sys.stderr)
+    print(f"\n[최종] 총 {writer.count}개 청크 생성 완료.", file=sys.stderr)
 
 
 # -----------------------------
-# 4. 실행 (기존 유지)
+# 5. 실행 (기존 유지)
 # -----------------------------
 if __name__ == "__main__":
     try:
@@ -8,10 +8,89 @@ load_dotenv()
 # ---------- Upstage ----------
 SOLAR_API_KEY = os.getenv("SOLAR_API_KEY")
 
+# Upstage API 기본 주소 (로컬 대체 서버로 확인할 때 변경)
+UPSTAGE_API_BASE_URL = os.getenv("UPSTAGE_API_BASE_URL", "https://api.upstage.ai/v1")
+
 # Upstage Embedding 엔드포인트 & 모델
 UPSTAGE_EMBEDDING_URL = "https://api.upstage.ai/v1/embeddings"
 UPSTAGE_EMBEDDING_MODEL = "solar-embedding-1-large-passage"
 
+# 임베딩 요청 한 번에 보낼 청크 수 (runEmbed.py)
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "100"))
+
+# Upstage 공용 클라이언트: 연결 타임아웃(초) / HTTP/2 사용 (httpx[http2] 설치 시, chat/embeddings 요청)
+UPSTAGE_CONNECT_TIMEOUT = float(os.getenv("UPSTAGE_CONNECT_TIMEOUT", "10"))
+UPSTAGE_HTTP2 = os.getenv("UPSTAGE_HTTP2", "0") == "1"
+
+# Solar LLM 동시 호출 수 (청크 요약/표 변환 병렬 처리 상한)
+SOLAR_LLM_MAX_WORKERS = int(os.getenv("SOLAR_LLM_MAX_WORKERS", "8"))
+
+# 배치 요약: 한 요청에 묶을 청크 수 (1 이하면 청크별 단건 요청) / 한 요청의 최대 입력 문자 수
+SOLAR_SUMMARY_BATCH_SIZE = int(os.getenv("SOLAR_SUMMARY_BATCH_SIZE", "8"))
+SOLAR_SUMMARY_BATCH_MAX_CHARS = int(os.getenv("SOLAR_SUMMARY_BATCH_MAX_CHARS", "12000"))
+
+# 긴 문서 요약 (map-reduce): 구간 크기(문자) / 한 번에 합칠 요약 수 / 문서당 최대 구간 수 (넘으면 고르게 표본 추출)
+SUMMARY_SEGMENT_CHARS = int(os.getenv("SUMMARY_SEGMENT_CHARS", "8000"))
+SUMMARY_REDUCE_FAN_IN = int(os.getenv("SUMMARY_REDUCE_FAN_IN", "8"))
+SUMMARY_MAX_SEGMENTS = int(os.getenv("SUMMARY_MAX_SEGMENTS", "64"))
+# 계층 요약 생성 (1이면 doctype1 수집 시 페이지 -> 문서 요약, ClusterLabel.py에서 카테고리 요약). 페이지가 SUMMARY_MAX_SEGMENTS개보다 많으면 표본 페이지만 요약
+# 페이지 원문을 LLM에 보내므로 수집 비용이 늘어남 (LAZY_CHUNK_SUMMARY=1이면 재사용할 청크 요약도 없음). 읽는 곳이 생기기 전까지 기본 0
+SUMMARY_HIERARCHY = os.getenv("SUMMARY_HIERARCHY", "0") == "1"
+
+# 청크 크기를 문자 수 대신 토큰 수(로컬 근사치)로 정함: 사용 여부 / 청크당 토큰 예산 / 겹치는 토큰 수 (0이면 기존 문자 기준)
+TOKEN_AWARE_CHUNKING = os.getenv("TOKEN_AWARE_CHUNKING", "1") == "1"
+CHUNK_TOKEN_BUDGET = int(os.getenv("CHUNK_TOKEN_BUDGET", "1000"))
+CHUNK_TOKEN_OVERLAP = int(os.getenv("CHUNK_TOKEN_OVERLAP", "100"))
+
+# 청크 요약을 수집 단계에서 만들지 않고, 클러스터 대표 청크로 선택되거나 조회될 때 생성 (0이면 doctype1에서 즉시 생성)
+LAZY_CHUNK_SUMMARY = os.getenv("LAZY_CHUNK_SUMMARY", "1") == "1"
+
+# 반복 문구(머리글/바닥글/쪽 번호/고지문) 제거 및 정보량이 낮은 청크 제외 (0이면 사용 안 함)
+# 다른 문서 BOILERPLATE_MIN_DOCS개 이상에서 나온 줄은 반복 문구 / 서로 다른 단어 수가 MIN_CHUNK_UNIQUE_TOKENS 미만이면 제외
+BOILERPLATE_FILTER = os.getenv("BOILERPLATE_FILTER", "1") == "1"
+BOILERPLATE_MIN_DOCS = int(os.getenv("BOILERPLATE_MIN_DOCS", "5"))
+MIN_CHUNK_UNIQUE_TOKENS = int(os.getenv("MIN_CHUNK_UNIQUE_TOKENS", "5"))
+
+# PDF/DOCX는 로컬 텍스트 레이어를 먼저 사용하고, 스캔/이미지 페이지만 원격 OCR로 파싱 (0이면 항상 원격 파싱)
+LOCAL_TEXT_LAYER = os.getenv("LOCAL_TEXT_LAYER", "1") == "1"
+
+# 큰 PDF는 페이지 범위(shard)로 나눠 동시에 파싱: shard당 페이지 수 / 동시 요청 수 / shard별 재시도 횟수
+PARSE_SHARD_PAGES = int(os.getenv("PARSE_SHARD_PAGES", "20"))
+PARSE_SHARD_MAX_WORKERS = int(os.getenv("PARSE_SHARD_MAX_WORKERS", "4"))
+PARSE_SHARD_RETRIES = int(os.getenv("PARSE_SHARD_RETRIES", "3"))
+
+# 이미지/작은 PDF(OCR_PACK_MAX_FILE_PAGES 이하, 스캔본)를 OCR_PACK_PAGES 페이지 단위로 묶어 한 번에 원격 파싱
+OCR_PACK = os.getenv("OCR_PACK", "1") == "1"
+OCR_PACK_PAGES = int(os.getenv("OCR_PACK_PAGES", "20"))
+OCR_PACK_MAX_FILE_PAGES = int(os.getenv("OCR_PACK_MAX_FILE_PAGES", "2"))
+
+# document-parse 비동기 작업 모드: 원격 파싱이 필요한 문서를 한꺼번에 제출하고 완료 순서대로 처리
+ASYNC_DOCUMENT_PARSE = os.getenv("ASYNC_DOCUMENT_PARSE", "0") == "1"
+ASYNC_PARSE_MAX_IN_FLIGHT = int(os.getenv("ASYNC_PARSE_MAX_IN_FLIGHT", "32"))
+ASYNC_PARSE_POLL_INTERVAL = float(os.getenv("ASYNC_PARSE_POLL_INTERVAL", "5"))
+ASYNC_PARSE_TIMEOUT = float(os.getenv("ASYNC_PARSE_TIMEOUT", "1800"))
+
+# 코드 파일 수집 시 .gitignore / 외부 의존성 / 생성 / minified 파일 제외 (0이면 모든 코드 파일 처리)
+CODE_REPO_FILTER = os.getenv("CODE_REPO_FILTER", "1") == "1"
+
+# ---------- 로컬 캐시 ----------
+# 프로젝트 루트의 .cache 디렉토리 (SSAG_CACHE_DIR로 변경 가능)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.getenv("SSAG_CACHE_DIR", os.path.join(PROJECT_ROOT, ".cache"))
+
+# document-parse 결과 캐시 (파일 해시 + 파싱 옵션 기준) 및 최대 크기(MB)
+PARSE_CACHE_DIR = os.path.join(CACHE_DIR, "document_parse")
+PARSE_CACHE_MAX_MB = int(os.getenv("PARSE_CACHE_MAX_MB", "1024"))
+
+# Solar LLM 응답 캐시 (모델 + 프롬프트 + 파라미터 기준): 사용 여부 / 보관 기간(일) / 최대 크기(MB)
+LLM_CACHE = os.getenv("LLM_CACHE", "1") == "1"
+LLM_CACHE_DIR = os.path.join(CACHE_DIR, "llm")
+LLM_CACHE_TTL_DAYS = float(os.getenv("LLM_CACHE_TTL_DAYS", "30"))
+LLM_CACHE_MAX_MB = int(os.getenv("LLM_CACHE_MAX_MB", "256"))
+
+# 중복 제거 연결 정보 (pipline.py의 dedup.py가 쓰고 Clustering.py의 파일 투표가 읽음)
+DEDUP_LINKS_FILE = os.path.join(CACHE_DIR, "dedup_links.json")
+
 # ---------- Qdrant ----------
 QDRANT_HOST = os.getenv("QDRANT_HOST")
 QDRANT_PORT = int(os.getenv("QDRANT_PORT", "6333"))
@@ -22,6 +101,33 @@ QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
 
 
 
+# ---------- 클러스터링 ----------
+# 벡터 스냅샷(CACHE_DIR/vector_snapshot) 저장 형식: float32 또는 float16 (float16이면 디스크/메모리 절반, 정규화는 float32로 계산)
+SNAPSHOT_VECTOR_DTYPE = os.getenv("SNAPSHOT_VECTOR_DTYPE", "float32")
+# 마지막 동기화 이후 색인된 포인트가 전체의 이 비율 이하이면 그 포인트만 가져와 스냅샷 갱신 (넘으면 전체 다시 받기)
+SNAPSHOT_INCREMENTAL_MAX_RATIO = float(os.getenv("SNAPSHOT_INCREMENTAL_MAX_RATIO", "0.5"))
+# 스냅샷 scroll: 동시에 읽을 ID 구간 수 / gRPC 사용 여부(실패 시 HTTP) / gRPC 포트
+SNAPSHOT_SCROLL_WORKERS = int(os.getenv("SNAPSHOT_SCROLL_WORKERS", "4"))
+SNAPSHOT_PREFER_GRPC = os.getenv("SNAPSHOT_PREFER_GRPC", "1") == "1"
+QDRANT_GRPC_PORT = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
+# 클러스터링 후 스냅샷을 남겨 두고 다음 실행에서 재사용 (0이면 클러스터링 후 삭제)
+SNAPSHOT_KEEP = os.getenv("SNAPSHOT_KEEP", "1") == "1"
+# HDBSCAN 전 차원 축소: 방식(pca / svd / umap / none) / 목표 차원 / 이 포인트 수 이상일 때만 축소
+CLUSTER_REDUCTION = os.getenv("CLUSTER_REDUCTION", "pca")
+CLUSTER_REDUCTION_DIM = int(os.getenv("CLUSTER_REDUCTION_DIM", "64"))
+CLUSTER_REDUCTION_MIN_POINTS = int(os.getenv("CLUSTER_REDUCTION_MIN_POINTS", "2000"))
+# 클러스터링 단위: document(문서별로 청크 벡터를 모아 문서 단위로 클러스터링) / chunk(청크 전체 클러스터링 후 파일 투표)
+CLUSTERING_MODE = os.getenv("CLUSTERING_MODE", "chunk")
+# document 모드: 청크 벡터 모으는 방식(mean / attention) / 긴 문서에 추가로 남길 대표(medoid) 청크 수 / 대표 청크를 남길 최소 청크 수
+DOC_POOLING = os.getenv("DOC_POOLING", "mean")
+DOC_MEDOID_CHUNKS = int(os.getenv("DOC_MEDOID_CHUNKS", "3"))
+DOC_MEDOID_MIN_CHUNKS = int(os.getenv("DOC_MEDOID_MIN_CHUNKS", "20"))
+# 저장된 클러스터 모델로 새/수정 문서만 가장 가까운 클러스터에 배정 (0이면 매번 전체 클러스터링)
+CLUSTERING_INCREMENTAL = os.getenv("CLUSTERING_INCREMENTAL", "1") == "1"
+# 마지막 전체 클러스터링 이후 변경 문서 비율 / 노이즈 문서 비율 증가폭이 이 값을 넘으면 전체 다시 클러스터링
+CLUSTER_INCREMENTAL_MAX_RATIO = float(os.getenv("CLUSTER_INCREMENTAL_MAX_RATIO", "0.2"))
+CLUSTER_INCREMENTAL_MAX_NOISE_RISE = float(os.getenv("CLUSTER_INCREMENTAL_MAX_NOISE_RISE", "0.1"))
+
 # ---------- MySQL ----------
 MYSQL_HOST = os.getenv("MYSQL_HOST")
 MYSQL_PORT = int(os.getenv("MYSQL_PORT", "3306"))
@@ -0,0 +1,20 @@
+"""
+테스트 공통 설정.
+
+core.config는 import 시점에 환경 변수를 읽으므로, 캐시 디렉토리, 컬렉션 이름과 Upstage API 설정을
+테스트용 값으로 먼저 지정한 뒤 core 모듈을 import합니다.
+"""
+
+import os
+import sys
+import tempfile
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+os.environ["SSAG_CACHE_DIR"] = tempfile.mkdtemp(prefix="ssag-test-cache-")
+os.environ.setdefault("SOLAR_API_KEY", "test")
+os.environ.setdefault("COLLECTION_NAME", "test_collection")
+os.environ["ASYNC_PARSE_POLL_INTERVAL"] = "0.01"
+os.environ["UPSTAGE_HTTP2"] = "0"
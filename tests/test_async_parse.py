@@ -0,0 +1,186 @@
+"""
+AsyncParseQueue를 로컬 대체 서버(http.server)에 연결해 확인합니다.
+
+대체 서버는 Upstage document-parse의 async 제출 / 상태 조회 / batch 결과 다운로드와 동기 파싱 엔드포인트를 흉내 냅니다.
+- 업로드한 문서 내용에 b"FAIL"이 있으면 작업이 failed로 끝남
+- 상태 조회 첫 번째는 processing, 두 번째부터 completed (batch 2개, 두 번째 batch는 batch 기준 페이지 번호)
+"""
+
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from core.backend.common import upstageClient
+from core.backend.common.asyncParse import AsyncParseQueue
+from core.backend.common.parseCache import DOCUMENT_PARSE_OPTIONS, make_parse_cache_key, load_cached_parse
+
+
+class StandInState:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.jobs = {}            # request_id -> {"fail": bool, "polls": int, "done": bool}
+        self.submitted = 0
+        self.active = 0           # 제출되었지만 아직 완료/실패 응답을 받지 않은 작업 수
+        self.max_active = 0
+        self.sync_calls = 0
+
+
+def make_handler(state: StandInState):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send_json(self, data, status=200):
+            body = json.dumps(data).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if self.path.endswith("/document-digitization/async"):
+                with state.lock:
+                    state.submitted += 1
+                    request_id = f"req-{state.submitted}"
+                    state.jobs[request_id] = {"fail": b"FAIL" in body, "polls": 0, "done": False}
+                    state.active += 1
+                    state.max_active = max(state.max_active, state.active)
+                self._send_json({"request_id": request_id})
+            elif self.path.endswith("/document-digitization"):
+                with state.lock:
+                    state.sync_calls += 1
+                self._send_json({"elements": [{"id": 0, "page": 1, "category": "paragraph",
+                                               "content": {"html": "<p>동기 파싱</p>"}}]})
+            else:
+                self._send_json({"error": "not found"}, status=404)
+
+        def do_GET(self):
+            status_match = re.search(r"/document-digitization/requests/(req-\d+)$", self.path)
+            download_match = re.search(r"/download/(req-\d+)/(\d+)$", self.path)
+            if status_match:
+                request_id = status_match.group(1)
+                with state.lock:
+                    job = state.jobs[request_id]
+                    job["polls"] += 1
+                    if job["polls"] < 2:
+                        self._send_json({"status": "processing"})
+                        return
+                    if not job["done"]:
+                        job["done"] = True
+                        state.active -= 1
+                if job["fail"]:
+                    self._send_json({"status": "failed", "failure_message": "stand-in failure"})
+                    return
+                base = f"http://127.0.0.1:{self.server.server_port}"
+                # 결과 순서가 섞여 와도 start_page 기준으로 합쳐야 함
+                self._send_json({"status": "completed", "batches": [
+                    {"start_page": 3, "download_url": f"{base}/download/{request_id}/2"},
+                    {"start_page": 1, "download_url": f"{base}/download/{request_id}/1"},
+                ]})
+            elif download_match:
+                request_id, batch = download_match.groups()
+                if batch == "1":
+                    elements = [{"id": 0, "page": 1, "content": {"html": f"<p>{request_id} p1</p>"}},
+                                {"id": 1, "page": 2, "content": {"html": f"<p>{request_id} p2</p>"}}]
+                else:
+                    elements = [{"id": 0, "page": 1, "content": {"html": f"<p>{request_id} p3</p>"}}]
+                self._send_json({"elements": elements})
+            else:
+                self._send_json({"error": "not found"}, status=404)
+
+    return Handler
+
+
+@pytest.fixture
+def stand_in(monkeypatch):
+    state = StandInState()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(state))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    client = upstageClient.UpstageClient(api_key="test", base_url=f"http://127.0.0.1:{server.server_port}")
+    monkeypatch.setattr(upstageClient, "_client", client)
+    yield state
+    server.shutdown()
+    server.server_close()
+
+
+def make_documents(tmp_path, contents):
+    paths = []
+    for index, content in enumerate(contents):
+        path = tmp_path / f"doc{index}.pptx"
+        path.write_bytes(content)
+        paths.append(str(path))
+    return paths
+
+
+def test_submit_poll_and_cache_merged_result(stand_in, tmp_path):
+    [path] = make_documents(tmp_path, [b"slides-merge"])
+
+    queue = AsyncParseQueue([path])
+    assert stand_in.submitted == 1
+    finished = list(queue.iter_completed())
+
+    assert [(job.file_path, job.status) for job in finished] == [(path, "completed")]
+    cached = load_cached_parse(make_parse_cache_key(path, DOCUMENT_PARSE_OPTIONS))
+    # batch를 start_page 순서로 합치고 두 번째 batch의 페이지를 원본 기준으로 보정, id는 다시 매김
+    assert [element["page"] for element in cached["elements"]] == [1, 2, 3]
+    assert [element["id"] for element in cached["elements"]] == [0, 1, 2]
+
+
+def test_cached_documents_are_not_resubmitted(stand_in, tmp_path):
+    [path] = make_documents(tmp_path, [b"slides-resubmit"])
+    list(AsyncParseQueue([path]).iter_completed())
+
+    finished = list(AsyncParseQueue([path]).iter_completed())
+
+    assert stand_in.submitted == 1
+    assert [job.status for job in finished] == ["completed"]
+
+
+def test_in_flight_limit(stand_in, tmp_path):
+    paths = make_documents(tmp_path, [f"slides-limit-{index}".encode() for index in range(7)])
+
+    queue = AsyncParseQueue(paths, max_in_flight=3)
+    assert stand_in.submitted == 3
+    assert len(queue.pending) == 4
+    finished = list(queue.iter_completed())
+
+    assert stand_in.submitted == 7
+    assert stand_in.max_active <= 3
+    assert sorted(job.file_path for job in finished) == sorted(paths)
+    assert all(job.status == "completed" for job in finished)
+
+
+def test_failed_job_falls_back_to_per_file_parse(stand_in, tmp_path):
+    from core.backend.typeClass import doctype1
+
+    ok_path, failing_path = make_documents(tmp_path, [b"slides-ok", b"slides-FAIL"])
+
+    finished = {job.file_path: job for job in AsyncParseQueue([ok_path, failing_path]).iter_completed()}
+
+    assert finished[ok_path].status == "completed"
+    assert finished[failing_path].status == "failed"
+    assert "stand-in failure" in finished[failing_path].error
+    assert load_cached_parse(make_parse_cache_key(failing_path, DOCUMENT_PARSE_OPTIONS)) is None
+
+    # 실패한 문서는 doctype1이 동기 파싱으로 처리
+    parsed = doctype1.parse_whole_document_remote(failing_path)
+    assert stand_in.sync_calls == 1
+    assert parsed["elements"][0]["content"]["html"] == "<p>동기 파싱</p>"
+
+
+def test_doctype1_reads_async_result_from_parse_cache(stand_in, tmp_path):
+    from core.backend.typeClass import doctype1
+
+    [path] = make_documents(tmp_path, [b"slides-doctype1"])
+    list(AsyncParseQueue([path]).iter_completed())
+
+    parsed = doctype1.parse_whole_document_remote(path)
+
+    assert stand_in.sync_calls == 0
+    assert len(parsed["elements"]) == 3
@@ -0,0 +1,41 @@
+"""Clustering: HDBSCAN이 클러스터를 만들 수 없을 만큼 포인트가 적어도 출력 파일을 남기는지 확인합니다."""
+
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "core", "backend", "clustering"))
+
+import Clustering  # noqa: E402
+
+
+@pytest.fixture
+def in_tmp_dir(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.mark.parametrize("mode, n_chunks", [("document", 1), ("document", 3), ("chunk", 1)])
+def test_too_few_points_are_all_noise(in_tmp_dir, monkeypatch, mode, n_chunks):
+    monkeypatch.setattr(Clustering, "CLUSTERING_MODE", mode)
+    vectors = np.random.default_rng(0).normal(size=(n_chunks, 16)).astype(np.float32)
+    payloads = pd.DataFrame({
+        "doc_id": ["/docs/short.txt"] * n_chunks,
+        "page_number": [1] * n_chunks,
+        "chunk_in_page": list(range(n_chunks)),
+        "indexed_at": [1.0] * n_chunks,
+    })
+
+    assert Clustering.run_file_centric_hdbscan(vectors, payloads)
+
+    with open(in_tmp_dir / Clustering.FINAL_MAPPING_FILE, encoding="utf-8") as f:
+        mapping = json.load(f)
+    assert mapping["assigned_cluster_ids"] == []
+    assert mapping["noise_files"] == ["/docs/short.txt"]
+    assert len(np.load(in_tmp_dir / Clustering.CENTROID_VECTORS_FILE)) == 0
+    with open(in_tmp_dir / Clustering.CLUSTERING_REPORT_FILE, encoding="utf-8") as f:
+        assert json.load(f)["clusters"] == 0
@@ -0,0 +1,63 @@
+"""codeFilter: 빌드/의존성 디렉토리 판단 기준(저장소 루트 / 스캔 폴더)과 생성 파일 표시"""
+
+import pytest
+
+from core.backend.centralLogic.codeFilter import code_skip_reason, is_generated, vendored_dir_in_path
+
+
+def make_file(path, text="print('hi')\n"):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_scan_folder_under_build_dir_is_not_vendored(tmp_path):
+    scan_root = tmp_path / "build" / "notes"
+    path = make_file(scan_root / "main.py")
+
+    assert vendored_dir_in_path(path, str(scan_root)) is None
+    assert code_skip_reason(path, str(scan_root)) is None
+
+
+def test_vendored_dir_below_scan_folder(tmp_path):
+    scan_root = tmp_path / "target"
+    path = make_file(scan_root / "app" / "node_modules" / "lib" / "index.js")
+
+    assert vendored_dir_in_path(path, str(scan_root)) == "node_modules"
+
+
+def test_repo_under_build_dir_checks_from_repo_root(tmp_path):
+    repo = tmp_path / "build" / "project"
+    (repo / ".git").mkdir(parents=True)
+    kept = make_file(repo / "src" / "main.py")
+    vendored = make_file(repo / "dist" / "bundle.py")
+
+    assert vendored_dir_in_path(kept, str(tmp_path)) is None
+    assert vendored_dir_in_path(vendored, str(tmp_path)) == "dist"
+
+
+def test_without_repo_or_scan_folder_path_is_not_checked(tmp_path):
+    path = make_file(tmp_path / "target" / "analysis.py")
+
+    assert vendored_dir_in_path(path) is None
+
+
+@pytest.mark.parametrize("head", [
+    "// Code generated by protoc-gen-go. DO NOT EDIT.\npackage pb\n",
+    "# Generated by the protocol buffer compiler.  DO NOT EDIT!\n",
+    "/**\n * This file is @generated by relay-compiler\n */\n",
+    "// <auto-generated>\n//     This code was generated by a tool.\n// </auto-generated>\n",
+    "<!-- <auto-generated /> -->\n",
+])
+def test_generated_markers_in_comments(head):
+    assert is_generated("source.txt", head)
+
+
+@pytest.mark.parametrize("head", [
+    "\"\"\"Parse auto-generated reports.\"\"\"\n",
+    "AUTOGENERATED_FIELDS = ('id', 'created_at')\n",
+    "def render():\n    return 'DO NOT EDIT this template by hand'\n",
+    "# TODO: handle autogenerated ids\n",
+])
+def test_plain_mentions_are_not_generated(head):
+    assert not is_generated("source.py", head)
@@ -0,0 +1,51 @@
+"""dimReduction: 저장된 투영은 같은 데이터 버전에서만 재사용하고, 이웃 보존율이 떨어지면 다시 학습"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "core", "backend", "clustering"))
+
+import dimReduction  # noqa: E402
+
+
+@pytest.fixture
+def small_reduction(monkeypatch, tmp_path):
+    monkeypatch.setattr(dimReduction, "PROJECTION_DIR", str(tmp_path))
+    monkeypatch.setattr(dimReduction, "CLUSTER_REDUCTION", "pca")
+    monkeypatch.setattr(dimReduction, "CLUSTER_REDUCTION_MIN_POINTS", 10)
+    monkeypatch.setattr(dimReduction, "CLUSTER_REDUCTION_DIM", 4)
+
+
+def clustered_vectors(seed, n_points=300, dim=32):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(5, dim))
+    return (centers[rng.integers(0, 5, n_points)] + 0.05 * rng.normal(size=(n_points, dim))).astype(np.float32)
+
+
+def test_projection_is_reused_only_for_the_same_data_version(small_reduction):
+    vectors = clustered_vectors(0)
+
+    _, first = dimReduction.reduce_vectors(vectors, data_version="100.0:300")
+    _, same = dimReduction.reduce_vectors(vectors, data_version="100.0:300")
+    _, changed = dimReduction.reduce_vectors(vectors, data_version="200.0:300")
+
+    assert first["projection_cached"] is False
+    assert same["projection_cached"] is True
+    assert changed["projection_cached"] is False
+
+
+def test_low_neighbor_overlap_triggers_refit(small_reduction):
+    # 데이터 버전 없이 포인트 수가 비슷하면 재사용 대상이지만, 분포가 완전히 달라 이웃 보존율이 떨어짐
+    _, first = dimReduction.reduce_vectors(clustered_vectors(0, dim=32))
+    drifted = np.random.default_rng(7).normal(size=(300, 32)).astype(np.float32)
+
+    reduced, info = dimReduction.reduce_vectors(drifted)
+
+    assert first["projection_cached"] is False
+    assert info["projection_cached"] is False
+    assert info["stale_neighbor_overlap"] < first["neighbor_overlap"] - dimReduction.REFIT_OVERLAP_DROP
+    assert reduced.shape == (300, 4)
+    np.testing.assert_allclose(np.linalg.norm(reduced, axis=1), 1.0, rtol=1e-4)
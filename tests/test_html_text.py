@@ -0,0 +1,47 @@
+"""htmlText: BeautifulSoup 방식과 같은 텍스트, 빈 요소(<br>/<img>)가 많아도 선형 시간"""
+
+import time
+
+import pytest
+
+from core.backend.common.htmlText import StreamingTextExtractor, extract_text, _extract_text_with_soup
+
+
+@pytest.mark.parametrize("html_body", [
+    "<div>a<br>b</br>c<br/><img>d</img><p>e</div>",
+    "<ul><li>하나<li>둘</ul><script>var x = 1;</script><!-- 주석 --><p>끝&amp;&#65;</p>",
+    "<p>x<br>y<img src=a></p>" * 50,
+])
+def test_same_text_as_beautifulsoup(html_body):
+    assert extract_text(html_body) == _extract_text_with_soup(html_body)
+
+
+def void_heavy_html(count):
+    return "<html><body>" + "<p>줄<br>다음<img src=a.png></p>" * count + "</body></html>"
+
+
+def test_closed_empty_elements_are_counted_per_tag():
+    extractor = StreamingTextExtractor()
+    extractor.feed(void_heavy_html(20000))
+    extractor.close()
+
+    # 닫는 태그가 없는 빈 요소가 2만 개씩 남아도 태그 종류만큼의 항목만 유지
+    assert len(extractor._already_closed_empty) == 2
+    assert extractor._already_closed_empty["br"] == 20000
+
+
+def best_time(html_body, repeats=3):
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        extract_text(html_body)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def test_void_elements_scale_linearly():
+    small = best_time(void_heavy_html(5000))
+    large = best_time(void_heavy_html(20000))
+
+    # 4배 입력: 선형이면 약 4배, 닫는 태그마다 선형 탐색하던 방식은 10배 이상
+    assert large < small * 8
@@ -0,0 +1,97 @@
+"""mapReduceSummary: 페이지 요약(map / 청크 요약 재사용)과 문서 요약 reduce"""
+
+import threading
+
+import pytest
+
+from core.backend.common import mapReduceSummary
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    """프롬프트 종류별로 결정적인 요약을 돌려주고 호출한 프롬프트를 기록합니다."""
+    calls = []
+    lock = threading.Lock()
+
+    def post_summary(prompt):
+        with lock:
+            calls.append(prompt)
+        if "부분 요약:" in prompt:
+            content = prompt.split("---\n")[1].strip()
+            return f"map({content[:12]})"
+        items = [line[2:] for line in prompt.splitlines() if line.startswith("- ")]
+        return "reduce(" + "+".join(items) + ")"
+
+    monkeypatch.setattr(mapReduceSummary, "_post_summary", post_summary)
+    return calls
+
+
+def test_pages_without_chunk_summaries_are_mapped(fake_llm):
+    pages = [(1, "첫 페이지 내용"), (2, "둘째 페이지 내용")]
+
+    summaries = mapReduceSummary.summarize_pages(pages, "보고서")
+
+    assert summaries == {1: "map(첫 페이지 내용)", 2: "map(둘째 페이지 내용)"}
+    assert len(fake_llm) == 2
+
+
+def test_chunk_summaries_are_reduced_without_map(fake_llm):
+    pages = [(1, "본문"), (2, "본문2")]
+
+    summaries = mapReduceSummary.summarize_pages(pages, "보고서", {1: ["a", "b"], 2: ["c"]})
+
+    assert summaries == {1: "reduce(a+b)", 2: "c"}
+    assert len(fake_llm) == 1
+
+
+def test_long_page_is_split_then_reduced(fake_llm):
+    # 문단 하나가 SUMMARY_SEGMENT_CHARS(기본 8000자)보다 조금 짧아 문단마다 구간 하나
+    text = "\n\n".join(f"문단{index:02d} " + "내용 " * 2500 for index in range(3))
+
+    summaries = mapReduceSummary.summarize_pages([(1, text)], "보고서")
+
+    map_calls = [prompt for prompt in fake_llm if "부분 요약:" in prompt]
+    assert len(map_calls) == 3
+    assert summaries[1].startswith("reduce(map(문단00")
+
+
+def test_pages_are_sampled_evenly(fake_llm):
+    pages = [(page, f"페이지 {page}") for page in range(1, 101)]
+
+    summaries = mapReduceSummary.summarize_pages(pages, "보고서", max_pages=10)
+
+    assert len(summaries) == 10
+    assert min(summaries) == 1 and max(summaries) > 90
+
+
+def test_page_summaries_reduce_to_one_document_summary(fake_llm):
+    page_summaries = [f"p{page}" for page in range(20)]
+
+    summary = mapReduceSummary.reduce_summaries(page_summaries, "보고서", fan_in=8)
+
+    # 20 -> 3 -> 1
+    assert summary.count("reduce(") == 4
+    assert summary.startswith("reduce(reduce(p0+")
+
+
+def test_hierarchy_summaries_are_off_by_default():
+    from core import config
+
+    assert config.SUMMARY_HIERARCHY is False
+
+
+def test_doctype1_adds_page_and_document_summaries(fake_llm):
+    from core.backend.typeClass import doctype1
+
+    chunks = [
+        {"doc_id": "/docs/보고서.pdf", "page": 1, "chunk_in_page": 0, "text_for_embedding": "일"},
+        {"doc_id": "/docs/보고서.pdf", "page": 2, "chunk_in_page": 0, "text_for_embedding": "이", "summary": "s2a"},
+        {"doc_id": "/docs/보고서.pdf", "page": 2, "chunk_in_page": 1, "text_for_embedding": "이", "summary": "s2b"},
+    ]
+
+    doctype1.add_page_and_document_summaries(chunks, [(1, "첫 페이지"), (2, "둘째 페이지")], "/docs/보고서.pdf")
+
+    # 페이지 요약은 페이지의 첫 청크에만, 문서 요약은 문서의 첫 청크에만 저장
+    assert [chunk.get("page_summary") for chunk in chunks] == ["map(첫 페이지)", "reduce(s2a+s2b)", None]
+    assert [chunk.get("doc_summary") for chunk in chunks] == ["reduce(map(첫 페이지)+reduce(s2a+s2b))", None, None]
+    assert "**보고서**" in fake_llm[0]
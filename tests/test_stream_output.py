@@ -0,0 +1,38 @@
+"""JsonArrayWriter 출력과 iter_json_array 원소 단위 읽기"""
+
+import io
+import json
+
+import pytest
+
+from core.backend.common.streamOutput import JsonArrayWriter, iter_json_array
+
+ITEMS = [{"doc_id": "a", "text_for_embedding": "한글 청크 " * index, "page": index} for index in range(50)] + [12345, "끝", None]
+
+
+@pytest.mark.parametrize("read_size", [1, 7, 4096])
+def test_reads_writer_output_in_small_pieces(read_size):
+    stream = io.StringIO()
+    writer = JsonArrayWriter(stream)
+    for item in ITEMS:
+        writer.write(item)
+    writer.close()
+
+    assert list(iter_json_array(io.StringIO(stream.getvalue()), read_size=read_size)) == ITEMS
+
+
+def test_reads_pretty_printed_array():
+    text = json.dumps(ITEMS, ensure_ascii=False, indent=2)
+
+    assert list(iter_json_array(io.StringIO(text), read_size=3)) == ITEMS
+
+
+@pytest.mark.parametrize("text", ["", "  \n", "[]", "[ ]\n"])
+def test_empty_output_has_no_items(text):
+    assert list(iter_json_array(io.StringIO(text))) == []
+
+
+@pytest.mark.parametrize("text", ['{"a": 1}', "[1, 2", "[1 2]", '[{"a": '])
+def test_invalid_output_raises(text):
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.StringIO(text), read_size=2))
@@ -0,0 +1,69 @@
+"""tabletype1 블록 표본 추출: 추정 행 수가 틀려도 상한을 넘는 뒤쪽 행과 시트가 표본에서 빠지지 않는지 확인합니다."""
+
+import json
+import os
+import re
+import subprocess
+import sys
+
+import openpyxl
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+TABLETYPE1 = os.path.join(PROJECT_ROOT, "core", "backend", "typeClass", "tabletype1.py")
+MAX_BLOCK_CHUNKS = 300  # tabletype1.MAX_BLOCK_CHUNKS (모듈이 import 시 sys.argv를 읽으므로 직접 import하지 않음)
+
+
+def run_tabletype1(path):
+    env = dict(os.environ, PYTHONPATH=PROJECT_ROOT, UPSTAGE_API_BASE_URL="http://127.0.0.1:9", TOKEN_AWARE_CHUNKING="0")
+    result = subprocess.run([sys.executable, TABLETYPE1, str(path)], capture_output=True, text=True, env=env, timeout=300)
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout)
+
+
+def block_chunks(chunks):
+    return [chunk["text_for_embedding"] for chunk in chunks if "[데이터 블록" in chunk["text_for_embedding"]]
+
+
+def block_ranges(texts):
+    return [tuple(int(value) for value in re.search(r"행 (\d+)~(\d+)", text).groups()) for text in texts]
+
+
+def test_underestimated_csv_keeps_sampling_to_the_last_row(tmp_path):
+    # 앞쪽 행은 넓어서 파일 크기 기준 추정 행 수가 실제보다 훨씬 적게 나옴
+    path = tmp_path / "skewed.csv"
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("id,note\n")
+        for index in range(200):
+            f.write(f"{index},{'x' * 2000}\n")
+        for index in range(200, 200_000):
+            f.write(f"{index},y\n")
+
+    texts = block_chunks(run_tabletype1(path))
+    ranges = block_ranges(texts)
+
+    assert len(texts) <= MAX_BLOCK_CHUNKS + 1  # 시트 첫 블록 + 상한
+    assert ranges == sorted(ranges)
+    # 상한에 닿은 뒤에도 파일 끝 구간까지 표본이 남아 있어야 함
+    assert ranges[-1][1] > 190_000
+    assert texts[0].splitlines()[3] == "id,note"
+
+
+def test_every_sheet_keeps_a_block(tmp_path):
+    path = tmp_path / "sheets.xlsx"
+    workbook = openpyxl.Workbook()
+    big = workbook.active
+    big.title = "big"
+    big.append(["id", "value"])
+    for index in range(60_000):
+        big.append([index, index % 7])
+    small = workbook.create_sheet("small")
+    small.append(["name"])
+    for index in range(3):
+        small.append([f"n{index}"])
+    workbook.save(path)
+
+    texts = block_chunks(run_tabletype1(path))
+
+    assert any("[시트: small]" in text for text in texts)
+    big_ranges = block_ranges([text for text in texts if "[시트: big]" in text])
+    assert big_ranges[-1][1] > 55_000
@@ -0,0 +1,66 @@
+"""UpstageClient 재시도: POST는 429만, GET은 429/5xx 재시도"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from core.backend.common.upstageClient import UpstageClient
+
+
+@pytest.fixture
+def flaky_server():
+    """첫 요청에 지정한 상태 코드를, 그다음부터 200을 돌려주는 서버. 받은 요청 수를 기록합니다."""
+    state = {"first_status": 503, "calls": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _respond(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            state["calls"] += 1
+            status = state["first_status"] if state["calls"] == 1 else 200
+            body = b'{"ok": true}'
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            if status == 429:
+                self.send_header("Retry-After", "0")
+            self.end_headers()
+            self.wfile.write(body)
+
+        do_GET = _respond
+        do_POST = _respond
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    state["client"] = UpstageClient(api_key="test", base_url=f"http://127.0.0.1:{server.server_port}", http2=False)
+    yield state
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize("method, first_status, expected_calls, expected_status", [
+    ("POST", 503, 1, 503),   # 서버가 이미 처리했을 수 있으므로 재전송하지 않음
+    ("POST", 502, 1, 502),
+    ("POST", 429, 2, 200),
+    ("GET", 503, 2, 200),
+    ("GET", 429, 2, 200),
+])
+def test_status_retry_by_method(flaky_server, method, first_status, expected_calls, expected_status):
+    flaky_server["first_status"] = first_status
+
+    response = flaky_server["client"].request(method, "/chat/completions", timeout=5, json={})
+
+    assert response.status_code == expected_status
+    assert flaky_server["calls"] == expected_calls
+
+
+def test_only_pre_send_connection_errors_are_retried():
+    client = UpstageClient(api_key="test", base_url="http://127.0.0.1:9", http2=False)
+    retry = client.session.get_adapter("http://127.0.0.1:9").max_retries
+
+    # 연결 실패는 메서드와 무관하게 재시도, 요청 전송 후 읽기 오류/연결 끊김은 재시도하지 않음
+    assert (retry.connect, retry.read, retry.other) == (3, 0, 0)
+    assert "POST" not in retry.allowed_methods